@@ -0,0 +1,125 @@
+# =============================================================================
+# BALL LAYOUT - Cache partagé de balls_positions_table
+# =============================================================================
+# Module partagé (Text DAT 'ball_layout').
+# La disposition change ~1 fois par session mais était re-parsée (float(...val))
+# 60 fois par seconde dans plusieurs scripts. Ici, le DAT est parsé UNE fois
+# en array NumPy, avec un numéro de version.
+#
+#   import ball_layout
+#   layout = ball_layout.get(op('balls_positions_table'))
+#   layout.positions   # (N, 2) float
+#   layout.ids         # liste des ball_id
+#   layout.ok          # (N,) bool - ligne lisible
+#   layout.version     # change seulement quand le contenu change
+#   layout.centroid()  /  layout.pairwise()  /  layout.grid(480)
+#   layout.weighted_target(x, y, 480)   # cible du ghost mode
+#
+# Invalidation : DAT Execute 'balls_layout_watch' (onTableChange ->
+# ball_layout.invalidate()) ou changement du nombre de cooks du DAT.
+# =============================================================================
+
+import numpy as np
+
+
+class BallLayout:
+    """Disposition parsée + données dérivées (calculées à la demande)."""
+
+    def __init__(self, ids, positions, ok, version):
+        self.ids = ids
+        self.positions = positions
+        self.ok = ok
+        self.version = version
+        self._centroid = None
+        self._pairwise = None
+        self._grids = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def same_content(self, other):
+        return (other is not None and self.ids == other.ids
+                and np.array_equal(self.ok, other.ok)
+                and np.array_equal(self.positions, other.positions))
+
+    def centroid(self):
+        """Centre (x, y) des boules lisibles."""
+        if self._centroid is None:
+            pts = self.positions[self.ok]
+            self._centroid = pts.mean(axis=0) if len(pts) else np.zeros(2)
+        return self._centroid
+
+    def pairwise(self):
+        """Distances (N, N) entre boules."""
+        if self._pairwise is None:
+            d = self.positions[:, None, :] - self.positions[None, :, :]
+            self._pairwise = np.hypot(d[..., 0], d[..., 1])
+        return self._pairwise
+
+    def weighted_target(self, x, y, radius, limit=None, default=(540.0, 540.0)):
+        """
+        Centre des boules à <= radius de (x, y), pondéré par 1 - dist / radius
+        (cible du ghost mode). default si aucune boule n'est assez proche.
+        """
+        pos = self.positions[:limit]
+        d = np.hypot(pos[:, 0] - x, pos[:, 1] - y)
+        w = np.where(self.ok[:limit] & (d <= radius), 1.0 - d / radius, 0.0)
+        total = w.sum()
+        if total <= 0:
+            return float(default[0]), float(default[1])
+        tx, ty = (pos * w[:, None]).sum(axis=0) / total
+        return float(tx), float(ty)
+
+    def grid(self, cell_size):
+        """Index spatial proximity_engine.BallGrid (cellules de cell_size)."""
+        grid = self._grids.get(cell_size)
+        if grid is None:
+            import proximity_engine
+            grid = self._grids[cell_size] = proximity_engine.BallGrid(self.positions, cell_size, valid=self.ok)
+        return grid
+
+
+def parse(table):
+    """ids, positions (N, 2), ok (N,) depuis le DAT (header en ligne 0 : ball_id | x | y)."""
+    ids, pos, ok = [], [], []
+    for row in range(1, table.numRows):
+        try:
+            x = float(table[row, 1].val)
+            y = float(table[row, 2].val)
+            ball_id = int(table[row, 0].val)
+            ids.append(ball_id); pos.append([x, y]); ok.append(True)
+        except Exception:
+            ids.append(row - 1); pos.append([0.0, 0.0]); ok.append(False)
+    return ids, np.asarray(pos, dtype=np.float64).reshape(-1, 2), np.asarray(ok, dtype=bool)
+
+
+# --- Cache module ---
+_cache = {'path': None, 'cooks': None, 'dirty': True, 'layout': None, 'version': 0}
+
+
+def invalidate():
+    """À appeler depuis un DAT Execute (onTableChange) : re-parse au prochain get()."""
+    _cache['dirty'] = True
+
+
+def get(table):
+    """Disposition courante ; re-parse seulement après invalidate() ou un nouveau cook du DAT."""
+    if table is None:
+        return None
+    path = getattr(table, 'path', None)
+    cooks = getattr(table, 'totalCooks', None)
+    layout = _cache['layout']
+    if (layout is not None and not _cache['dirty'] and _cache['path'] == path
+            and cooks is not None and _cache['cooks'] == cooks):
+        return layout
+
+    ids, positions, ok = parse(table)
+    fresh = BallLayout(ids, positions, ok, _cache['version'])
+    if not fresh.same_content(layout):
+        _cache['version'] += 1
+        fresh.version = _cache['version']
+        _cache['layout'] = fresh
+    _cache['path'] = path
+    _cache['cooks'] = cooks
+    _cache['dirty'] = False
+    return _cache['layout']
@@ -0,0 +1,28 @@
+# =====================================================
+# DAT Execute DAT : balls_layout_watch
+# Purpose:
+#   Invalidates the shared ball_layout cache when
+#   'balls_positions_table' changes, so scripts re-parse
+#   the table once instead of every frame.
+#   DAT parameter: balls_positions_table
+#   Table Change: ON
+# =====================================================
+
+import ball_layout
+
+def onTableChange(dat):
+    ball_layout.invalidate()
+    return
+
+# --- OTHER CALLBACKS ---
+def onRowChange(dat, rows):
+    return
+
+def onColChange(dat, cols):
+    return
+
+def onCellChange(dat, cells, prev):
+    return
+
+def onSizeChange(dat):
+    return
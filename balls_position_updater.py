@@ -2,14 +2,33 @@
 # CHOP Execute DAT : balls_position_updater
 # Purpose:
 #   Updates ball positions in metaball.html from DAT Table
-#   Reads 'balls_positions_table' and sends to 'webrender1'
-#   via window.setAllBallPositions([...])
+#   Reads 'balls_positions_table' and queues the positions
+#   in render_sync; render_sync_flush sends the changed
+#   balls to 'webrender1' in the frame's window.applyState()
+#   Table parsing is shared through ball_layout (parsed
+#   once per table change).
+#   Positions go into render_sync's versioned layout store
+#   (layout_store.py): only balls that differ from what the
+#   renderer acknowledged are sent. Errors go through
+#   rate_log (no textport print on every trigger).
+#   A trigger pulse also resends the whole state
+#   (render_sync.reset()): on the executeJavaScript path
+#   there is no WebSocket join to tell TD a page was
+#   reloaded, so the pulse is how it gets resynced.
+#   Balls missing from the table are dropped from the
+#   store (not drawn by metaball_top any more).
 # =====================================================
 
+import numpy as np
+
+import ball_layout
+import rate_log
+import render_sync
+
 # --- CONFIG ---
 TABLE_DAT = 'balls_positions_table'
-WEB_RENDER = 'webrender1'
 MAX_BALLS = 5
+RESYNC_ON_PULSE = True   # pulse = full resend (reloaded page without WebSocket)
 
 # --- CALLBACKS ---
 def onValueChange(channel, sampleIndex, val, prev):
@@ -17,58 +36,40 @@ def onValueChange(channel, sampleIndex, val, prev):
     Called when the CHOP channel changes
     Configure to trigger on a CHOP that pulses when the DAT changes
     """
+    if RESYNC_ON_PULSE:
+        render_sync.reset()
     updateBallsPositions()
 
 
 def updateBallsPositions():
     """
-    Reads the DAT Table and sends positions to Web Render TOP
+    Reads the DAT Table and queues positions for the Web Render TOP
     """
 
     # Get the DAT Table
     table = op(TABLE_DAT)
 
     if not table:
-        print(f"ERROR: DAT Table '{TABLE_DAT}' not found!")
-        return
-
-    # Get the Web Render TOP
-    web = op(WEB_RENDER)
-
-    if not web:
-        print(f"ERROR: Web Render TOP '{WEB_RENDER}' not found!")
+        rate_log.log('balls_position_updater.table', f"ERROR: DAT Table '{TABLE_DAT}' not found!")
         return
 
-    # Read positions from DAT Table
+    # Read positions from the shared layout cache
     # Expected format:
     # Row 0 (header) : ball_id | x | y
     # Row 1          : 0       | 540 | 135
     # Row 2          : 1       | 925 | 415
     # etc.
+    layout = ball_layout.get(table)
+
+    n = min(len(layout), MAX_BALLS)  # 5 balls max (rows 1-5)
+    ok = layout.ok[:n]
+    positions = np.where(ok[:, None], layout.positions[:n], 500.0)  # Default value for bad rows
+    if not ok.all():
+        rows = ', '.join(str(i + 1) for i in np.flatnonzero(~ok))
+        rate_log.log('balls_position_updater.rows', f"ERROR reading row(s) {rows}")
 
-    positions = []
-
-    # Iterate through DAT rows (skip header row 0)
-    for row in range(1, min(table.numRows, MAX_BALLS + 1)):  # 5 balls max (rows 1-5)
-        try:
-            x = float(table[row, 1].val)  # Column 1 = x
-            y = float(table[row, 2].val)  # Column 2 = y
-            positions.append([x, y])
-        except:
-            print(f"ERROR reading row {row}")
-            positions.append([500, 500])  # Default value
-
-    # Build JavaScript
-    import json
-    positions_json = json.dumps(positions)
-
-    js = f"if(window.setAllBallPositions) window.setAllBallPositions({positions_json});"
-
-    try:
-        web.executeJavaScript(js)
-        print(f"Positions updated: {len(positions)} balls")
-    except Exception as e:
-        print(f"ERROR executing JavaScript: {e}")
+    # Sent once at frame end (only balls that changed since the last ack)
+    render_sync.set_balls(positions)
 
 
 # --- OTHER REQUIRED CALLBACKS ---
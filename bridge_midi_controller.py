@@ -2,12 +2,23 @@
 # BRIDGE MIDI CONTROLLER - Contrôle MIDI basé sur les bridges actifs
 # =============================================================================
 # À copier dans un Execute DAT (famille DAT)
-# Lit proximity_dat pour détecter les bridges actifs
+# Lit proximity_chop (Script CHOP numérique, un sample par boule)
+# pour détecter les bridges actifs ; avec frame_pipeline_exec, reçoit
+# directement l'array de proximity_calculator du même frame
 # Joue une note MIDI pour chaque boule avec bridge actif
 # La note est basée sur la position XY de la boule
 # =============================================================================
 
-import math
+import numpy as np
+import note_mapper
+import midi_output
+import param_sender
+import op_cache
+import midi_queue
+import frame_pipeline
+
+# Handles d'opérateurs résolus une fois (voir op_cache.py)
+ops = op_cache.OpCache(op, 'bridge_midi_controller')
 
 # --- Configuration MIDI ---
 # Chaque boule (0-4) a son propre opérateur MIDI Out CHOP
@@ -28,12 +39,21 @@ ABLETON_PARAMS = {
     4: '/project1/abletonParameter_5'
 }
 
+# Sortie numérique de proximity_calculator.py (voir proximity_chop.py)
+PROXIMITY_CHOP = 'proximity_chop'
+PROXIMITY_CHANS = ('ball_id', 'distance', 'bridge_active', 'ball_x', 'ball_y', 'angle')
+
 # Distance maximale de bridge (doit correspondre à proximity_calculator.py)
 CONNECT_DISTANCE = 480
 
 # Gamme pentatonique majeure : C, D, E, G, A
 PENTATONIC = [0, 2, 4, 7, 9]
 
+# Gamme utilisée pour les notes : liste de degrés ou nom dans note_mapper.SCALES
+# ('pentatonic', 'minor_pentatonic', 'major', 'minor', 'dorian', 'blues', 'chromatic')
+SCALE = PENTATONIC
+OCTAVE_COUNT = 3  # 3 octaves disponibles via Y
+
 # Plage de notes MIDI
 BASE_NOTE = 36   # C3
 TOP_NOTE = 96    # C8
@@ -41,35 +61,82 @@ TOP_NOTE = 96    # C8
 # Velocity neutre (ni trop fort, ni trop faible)
 DEFAULT_VELOCITY = 80
 
-# --- État global ---
-# Dictionnaire pour tracker les notes actives par ball_id
-# Format: {ball_id: note_midi}
-active_notes = {}
+# --- Anti-flood MIDI (voir midi_output.py) ---
+NOTE_HYSTERESIS_PX = 12   # changement de note accepté seulement à +/- 12 px de la frontière
+MIN_NOTE_FRAMES = 6       # durée minimale d'une note (frames) avant changement / note OFF
+MIDI_DIAG_CHOP = 'midi_diag'  # Constant CHOP optionnel :
+                              #   value0 = événements émis, value1 = événements supprimés
+
+
+# --- File de sortie MIDI horodatée (voir midi_queue.py) ---
+# 'chop'   : MIDI Out CHOPs (MIDI_OPS), envoyés depuis le thread principal (pump)
+#            -> DÉFAUT : pas de thread d'envoi, les notes partent au bord de
+#            frame (précision = 1 frame, comme avant la file)
+# 'rtmidi' : python-rtmidi (RTMIDI_PORTS), envoyés par le thread dédié à l'heure
+#            prévue -> seul mode avec timing sous-frame ; à activer ici,
+#            python-rtmidi requis (sinon retour à 'chop' avec un avertissement)
+MIDI_BACKEND = 'chop'
+RTMIDI_PORTS = {0: 'Toile 1', 1: 'Toile 2', 2: 'Toile 3', 3: 'Toile 4', 4: 'Toile 5'}
+MIDI_LATENCY = 0.0        # délai constant ajouté au timestamp (s), ex: 0.005 avec 'rtmidi'
+                          # 'rtmidi' seulement : avec 'chop' il n'y a pas de thread
+                          # d'envoi, un délai ne ferait que glisser les notes au
+                          # bord de frame suivant -> ignoré (0) avec un avertissement
+
+
+def _make_queue():
+    """File + backend ; l'ancienne file (DAT ré-exécuté) est arrêtée proprement."""
+    old = me.storage.get('midi_queue')
+    if old is not None:
+        old.stop()
+    backend = None
+    if MIDI_BACKEND == 'rtmidi' and midi_queue.rtmidi is not None:
+        try:
+            backend = midi_queue.RtMidiBackend(RTMIDI_PORTS)
+        except Exception as e:
+            debug('rtmidi indisponible, retour aux MIDI Out CHOPs :', e)
+    if backend is None:
+        backend = midi_queue.ChopBackend(ops, MIDI_OPS)
+    if MIDI_LATENCY > 0 and not backend.thread_safe:
+        debug('bridge_midi_controller: MIDI_LATENCY = {} ignoré, la planification '
+              'sous-frame demande MIDI_BACKEND = \'rtmidi\''.format(MIDI_LATENCY))
+    queue = midi_queue.MidiQueue(backend)
+    queue.start()
+    me.storage['midi_queue'] = queue
+    return queue
+
+
+# --- Envois des paramètres Ableton (voir param_sender.py) ---
+PARAM_MIN_DELTA = 0.005   # variation minimale de Valuesend pour envoyer (échelle 0-0.5)
+PARAM_MAX_RATE = 30       # envois max par seconde et par paramètre
+
+
+def _write_param(ball_id, value):
+    """Écrit réellement le paramètre "Valuesend" du CHOP de la boule."""
+    param = ops(ABLETON_PARAMS[ball_id])
+    if param is None:
+        return
+    try:
+        param.par.Valuesend = value
+    except:
+        pass
 
 
-def send_midi(ball_id, note, velocity):
-    """
-    Envoie une note MIDI à l'opérateur MIDI correspondant à la boule.
+# --- État global ---
+params = param_sender.ParamSender(_write_param, PARAM_MIN_DELTA, PARAM_MAX_RATE)
 
-    Args:
-        ball_id: ID de la boule (0-4)
-        note: Note MIDI (0-127)
-        velocity: Vélocité (0-127), 0 = Note OFF
-    """
-    # Récupérer le bon opérateur MIDI pour cette boule
-    if ball_id not in MIDI_OPS:
-        return
+midi_q = _make_queue()
+midi_latency = MIDI_LATENCY if midi_q.backend.thread_safe else 0.0
+midi_out = midi_output.MidiOutput(midi_q.sender(midi_latency), MIN_NOTE_FRAMES, DEFAULT_VELOCITY)
 
-    midi = op(MIDI_OPS[ball_id])
-    if midi is None:
-        return
+# Dictionnaire pour tracker les notes actives par ball_id
+# Format: {ball_id: note_midi}
+active_notes = midi_out.notes
 
-    note_int = int(max(0, min(127, note)))
-    vel_int = int(max(0, min(127, velocity)))
-    midi.SendMIDI('note', note_int, vel_int)
+# Boules avec bridge actif au frame précédent (reset du paramètre Ableton)
+active_bridges = set()
 
 
-def update_ableton_parameter(ball_id, distance):
+def update_ableton_parameter(ball_id, distance, force=False):
     """
     Met à jour le paramètre Ableton basé sur la distance hero-boule.
 
@@ -78,17 +145,17 @@ def update_ableton_parameter(ball_id, distance):
         - Distance loin (480) → Valeur 0.5
         - Pas de bridge → Valeur 0.0
 
+    L'écriture passe par param_sender : seulement si la valeur a bougé
+    d'au moins PARAM_MIN_DELTA, au plus PARAM_MAX_RATE fois par seconde.
+
     Args:
         ball_id: ID de la boule (0-4)
         distance: Distance en pixels (0-480)
+        force: envoi immédiat (fermeture de bridge)
     """
     if ball_id not in ABLETON_PARAMS:
         return
 
-    param = op(ABLETON_PARAMS[ball_id])
-    if param is None:
-        return
-
     # Mapper distance (0-480) sur valeur (0.0-0.5)
     # Distance 0 = très proche = valeur 0
     # Distance 480 = très loin (limite bridge) = valeur 0.5
@@ -98,75 +165,41 @@ def update_ableton_parameter(ball_id, distance):
     else:
         normalized_value = 0.0
 
-    # Modifier le paramètre "Valuesend" du CHOP
-    try:
-        param.par.Valuesend = normalized_value
-    except:
-        pass
-
-
-def quantize_to_uniform_pentatonic(val_x, val_y, max_x, max_y):
-    """
-    Mappe dynamiquement la position XY d'une boule sur une note MIDI.
-
-    Args:
-        val_x: Position X de la boule (0 à max_x)
-        val_y: Position Y de la boule (0 à max_y)
-        max_x: Résolution largeur (ex: 1920)
-        max_y: Résolution hauteur (ex: 1080)
-
-    Returns:
-        note: Note MIDI (36-96)
-    """
-
-    # Normaliser les valeurs en 0-127 pour compatibilité
-    if max_x > 0:
-        normalized_x = (val_x / max_x) * 127
-    else:
-        normalized_x = 0
-
-    if max_y > 0:
-        normalized_y = (val_y / max_y) * 127
+    if force:
+        params.flush(ball_id, normalized_value, absTime.seconds)
     else:
-        normalized_y = 0
+        params.send(ball_id, normalized_value, absTime.seconds)
 
-    # Clamp
-    normalized_x = max(0, min(127, normalized_x))
-    normalized_y = max(0, min(127, normalized_y))
 
-    # --- 1️⃣ Sélection de la note (via X)
-    note_range = TOP_NOTE - BASE_NOTE
-    f = normalized_x / 127.0
-    raw_note = BASE_NOTE + f * note_range
-    semitone = int(round(raw_note)) - BASE_NOTE
-    degree_in_octave = semitone % 12
-    closest = min(PENTATONIC, key=lambda n: abs(n - degree_in_octave))
-    note_in_scale = BASE_NOTE + closest
+def onFrameStart(frame):
+    # frame_pipeline_exec actif : exécuté par run_stage(), après proximity_calculator
+    if frame_pipeline.drives('bridge_midi_controller', absTime.frame):
+        return
+    _play(absTime.frame)
 
-    # --- 2️⃣ Sélection de l'octave (via Y)
-    octave_count = 3  # 3 octaves disponibles
-    octave = int((normalized_y / 127.0) * octave_count)  # 0-2
-    note = note_in_scale + 12 * octave
 
-    # Clamp final
-    note = max(BASE_NOTE, min(TOP_NOTE, note))
-    return note
+def run_stage(ctx):
+    """Étape de frame_pipeline : sortie de proximity_calculator du MÊME frame, en mémoire."""
+    _play(ctx['frame'], ctx.get('proximity_calculator'))
+    midi_q.pump()
 
 
-def onFrameStart(frame):
+def _play(frame, proximity=None):
     """
     Appelé à chaque frame.
-    Lit proximity_dat et joue les notes MIDI pour chaque bridge actif.
+    Lit la proximité (array (6, N) de proximity_calculator, sinon proximity_chop)
+    et joue les notes MIDI pour chaque bridge actif.
     """
-    global active_notes
 
-    # Récupérer proximity_dat
-    proximity_dat = op('proximity_dat')
-    if not proximity_dat or proximity_dat.numRows < 2:
-        return
+    if proximity is None:
+        # Récupérer proximity_chop (valeurs numériques, pas de parsing)
+        proximity_chop = ops(PROXIMITY_CHOP)
+        if not proximity_chop or proximity_chop.numChans < len(PROXIMITY_CHANS):
+            return
+        proximity = [np.asarray(proximity_chop[name].vals) for name in PROXIMITY_CHANS[:5]]
 
     # Récupérer la résolution dynamique
-    resolution_chop = op('webrender_resolution')
+    resolution_chop = ops('webrender_resolution')
     if not resolution_chop or resolution_chop.numChans < 2:
         return
 
@@ -177,61 +210,58 @@ def onFrameStart(frame):
     except:
         return
 
+    # Une ligne par channel (ordre PROXIMITY_CHANS), un sample par boule
+    ball_ids, distances, bridges, balls_x, balls_y = proximity[:5]
+
     # Set pour tracker quelles boules ont un bridge actif ce frame
     current_active_balls = set()
 
-    # Parcourir proximity_dat (skip header row 0)
-    for row in range(1, proximity_dat.numRows):
-        try:
-            ball_id = int(proximity_dat[row, 0].val)
-            distance = float(proximity_dat[row, 1].val)
-            bridge_active = int(proximity_dat[row, 2].val)
-            ball_x = float(proximity_dat[row, 3].val)
-            ball_y = float(proximity_dat[row, 4].val)
-
-            if bridge_active == 1:
-                # Bridge actif pour cette boule
-                current_active_balls.add(ball_id)
-
-                # Mettre à jour le paramètre Ableton basé sur la distance
-                update_ableton_parameter(ball_id, distance)
-
-                # Calculer la note basée sur la position de la boule
-                new_note = quantize_to_uniform_pentatonic(ball_x, ball_y, res_w, res_h)
-
-                # Vérifier si cette boule joue déjà une note
-                if ball_id in active_notes:
-                    old_note = active_notes[ball_id]
-
-                    # Si la note a changé, stop l'ancienne et joue la nouvelle
-                    if old_note != new_note:
-                        send_midi(ball_id, old_note, 0)
-                        send_midi(ball_id, new_note, DEFAULT_VELOCITY)
-                        active_notes[ball_id] = new_note
-                else:
-                    # Nouvelle boule avec bridge, jouer la note
-                    send_midi(ball_id, new_note, DEFAULT_VELOCITY)
-                    active_notes[ball_id] = new_note
+    # Notes de toutes les boules actives en un seul index dans la table,
+    # avec le masque d'hystérésis autour des frontières de notes
+    active_idx = np.flatnonzero(bridges >= 0.5)
+    mapper = note_mapper.get_mapper(res_w, res_h, SCALE, BASE_NOTE, TOP_NOTE, OCTAVE_COUNT)
+    notes, stable = midi_output.hysteresis_notes(
+        mapper, balls_x[active_idx], balls_y[active_idx], NOTE_HYSTERESIS_PX)
 
-        except Exception as e:
-            continue
+    # Parcourir seulement les boules avec bridge actif
+    for i in active_idx.tolist():
+        ball_id = int(ball_ids[i])
+        current_active_balls.add(ball_id)
+
+        # Mettre à jour le paramètre Ableton basé sur la distance
+        update_ableton_parameter(ball_id, float(distances[i]))
+
+    # Notes ON / changements / OFF, horodatés dans la file (un lot par device)
+    midi_out.update(frame, ball_ids[active_idx].astype(int).tolist(), notes.tolist(), stable)
+    midi_q.pump()   # backend CHOP : envoi immédiat depuis le thread principal
+    _write_diag()
 
-    # --- Note OFF pour les boules qui n'ont plus de bridge ---
-    balls_to_stop = []
-    for ball_id, note in active_notes.items():
-        if ball_id not in current_active_balls:
-            # Cette boule n'a plus de bridge actif
-            send_midi(ball_id, note, 0)
-            update_ableton_parameter(ball_id, 0)  # Remettre le paramètre à 0
-            balls_to_stop.append(ball_id)
+    # Remettre à 0 le paramètre des boules qui n'ont plus de bridge (envoi forcé)
+    for ball_id in active_bridges - current_active_balls:
+        update_ableton_parameter(ball_id, 0, force=True)
+    active_bridges.clear()
+    active_bridges.update(current_active_balls)
 
-    # Nettoyer le dictionnaire
-    for ball_id in balls_to_stop:
-        del active_notes[ball_id]
+    # Valeurs retenues par la limite de débit dont la fenêtre est ouverte
+    params.tick(absTime.seconds)
+
+
+def _write_diag():
+    d = ops(MIDI_DIAG_CHOP)
+    if not d:
+        return
+    # écrire seulement si un compteur a bougé (évite un cook par frame)
+    if d.par.value0 != midi_out.stats['emitted']:
+        d.par.value0 = midi_out.stats['emitted']
+    if d.par.value1 != midi_out.stats['suppressed']:
+        d.par.value1 = midi_out.stats['suppressed']
 
 
 def onFrameEnd(frame):
-    pass
+    if frame_pipeline.drives('bridge_midi_controller', absTime.frame):
+        return    # pompé par run_stage()
+    # Événements dus pendant le frame (backend 'chop' : envoyés ici, sur le thread principal)
+    midi_q.pump()
 
 
 # =============================================================================
@@ -245,12 +275,19 @@ def onFrameEnd(frame):
 # 2. Configurez-le :
 #    - Parameters → Execute
 #    - Frame Start: ON ✓
+#    - Frame End: ON ✓ (envoi des événements dus, backend 'chop')
+#    (avec frame_pipeline_exec, ces callbacks ne font rien : le pipeline
+#    appelle run_stage() après proximity_calculator)
 #
 # 3. Copiez ce code dans le Execute DAT
 #
 # 4. Vérifiez que vous avez :
-#    - proximity_dat (Table DAT avec colonnes: ball_id, distance, bridge_active, ball_x, ball_y, angle)
+#    - proximity_chop (Script CHOP, callbacks proximity_chop.py, channels:
+#      ball_id, distance, bridge_active, ball_x, ball_y, angle - un sample par boule)
 #    - webrender_resolution (Constant CHOP avec channels: resolutionw, resolutionh)
+#    - midi_output, midi_queue, note_mapper (Text DAT - modules partagés)
+#    - python-rtmidi (optionnel, MIDI_BACKEND = 'rtmidi')
+#    - midi_diag (optionnel, Constant CHOP : value0 = émis, value1 = supprimés)
 #
 #    MIDI Out CHOPs (5 opérateurs) :
 #    - /project1/Tda_MIDI_1 (pour boule 0)
@@ -0,0 +1,35 @@
+# =====================================================
+# Script CHOP : bump_out
+# Purpose:
+#   Publishes the validated bumps computed by bump_validation
+#   in ONE cook per frame (instead of per-parameter writes on
+#   four Constant CHOPs).
+#   bump_validation stores a (channels, slots) float32 array in
+#   its storage['out'] and force-cooks this CHOP when it changes.
+#
+# Output: one sample per slot (MAX_BUMPS)
+#   x, y          : normalized position, -1 for empty slots
+#   age           : bump life in frames, 0 for empty slots
+#   stability     : 1.0 = no dust overlap, 0 for empty slots
+#   dust_x, dust_y: dust positions, -1 for empty slots
+# =====================================================
+
+VALIDATION_DAT = 'bump_validation'   # Execute DAT running bump_validation.py
+CHANS = ('x','y','age','stability','dust_x','dust_y')
+
+def setupParameters(scriptOp):
+    return
+
+def onPulse(par):
+    return
+
+def cook(scriptOp):
+    scriptOp.clear()
+    src = op(VALIDATION_DAT)
+    arr = src.storage.get('out') if src else None
+    if arr is None:
+        return
+    scriptOp.numSamples = arr.shape[1]
+    for name, vals in zip(CHANS, arr):
+        scriptOp.appendChan(name).vals = vals
+    return
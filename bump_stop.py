@@ -7,8 +7,22 @@
 #     - dust_stop   : freeze if dust exists AND no bump exists
 #     - double_stop : freeze only if both bump AND dust exist
 #   Priority: double_stop > bump_stop > dust_stop
+#   Presence comes from the detector's bump_count/dust_count
+#   channels when available (O(1)), else from the shared
+#   per-frame blob_snapshot (Info DATs parsed once per frame).
+#   Hysteresis: presence is debounced and each freeze/unfreeze
+#   state is held a minimum number of frames, so flickering
+#   detection does not re-capture the caches every frame.
+#   Event-driven: returns immediately when neither the snapshot
+#   version / count channels nor the gate CHOPs' cook counts
+#   changed and no hold or debounce is pending.
+#   Runs as the 'bump_stop' stage of frame_pipeline_exec
+#   (after bump_validation) when that DAT is active.
 # =====================================================
 
+import blob_snapshot   # shared per-frame parse of the Info DATs
+import frame_pipeline  # single ordered per-frame pass (frame_pipeline_exec)
+
 # --- CONFIG (rename if needed) ---
 INFO_BUMP_DAT = 'info_bumpblob'            # Info DAT from bump Blob Track
 INFO_DUST_DAT = 'info_dustblob'            # Info DAT from dust Blob Track
@@ -18,6 +32,26 @@ BUMP_GATE     = 'bump_stop'                # Null CHOP 1/0
 DUST_GATE     = 'dust_stop'                # Null CHOP 1/0
 DOUBLE_GATE   = 'double_stop'              # Null CHOP 1/0 (NEW)
 
+COUNT_CHOP    = ''                         # optional: detector CHOP with bump_count/dust_count
+                                           # (e.g. 'bump_detection'); '' = use Info DATs
+BUMP_COUNT_CH = 'bump_count'
+DUST_COUNT_CH = 'dust_count'
+
+# --- HYSTERESIS (frames) ---
+PRESENCE_DEBOUNCE_FRAMES = 2               # presence must be stable this long to count
+MIN_FREEZE_FRAMES        = 15              # stay frozen at least this long
+MIN_UNFREEZE_FRAMES      = 10              # stay live at least this long
+
+DIAG_CHOP     = 'freeze_diag'              # optional Constant CHOP:
+                                           #   value0 = transitions, value1 = frozen (1/0)
+
+# --- STATE ---
+def _fsm():
+    if 'fsm' not in me.storage:
+        me.storage['fsm'] = {'frozen': None, 'since': 0, 'transitions': 0, 'presence': {},
+                             'key': None, 'pending': True, 'gates': {}}
+    return me.storage['fsm']
+
 # --- HELPERS ---
 def _gate_on(chop_name):
     c = op(chop_name)
@@ -28,26 +62,65 @@ def _gate_on(chop_name):
     except:
         return bool(c[0])
 
-def _has_any(dat_op):
-    """True if Info DAT has at least one row with usable X/Y or U/V."""
-    d = op(dat_op)
-    if not d or d.numRows <= 1:
-        return False
-    headers = [c.val for c in d.row(0)]
-    def _get(row, keys):
-        for k in keys:
-            if k in headers:
-                v = d[row, headers.index(k)].val
-                if v != '' and v is not None:
-                    try: return float(v)
-                    except: pass
+def _cooks(name):
+    c = op(name)
+    return getattr(c, 'totalCooks', None) if c else None
+
+def _gates(st, cooks):
+    """Gate values, re-evaluated only for gates that re-cooked."""
+    out = []
+    for name, n in zip((BUMP_GATE, DUST_GATE, DOUBLE_GATE), cooks):
+        cached = st['gates'].get(name)
+        if n is None or cached is None or cached[0] != n:
+            cached = st['gates'][name] = (n, _gate_on(name))
+        out.append(cached[1])
+    return out
+
+def _count_presence(chan_name):
+    """True/False from the detector count channel, None if unavailable."""
+    if not COUNT_CHOP:
+        return None
+    c = op(COUNT_CHOP)
+    if not c:
+        return None
+    ch = c.chan(chan_name)
+    if ch is None:
         return None
-    for r in range(1, d.numRows):
-        x = _get(r, ('x','u','tx','cx','centerx','minx','left'))
-        y = _get(r, ('y','v','ty','cy','centery','miny','top'))
-        if x is not None and y is not None:
-            return True
-    return False
+    return ch.eval() > 0
+
+def _presence():
+    """(has_bump, has_dust, key) - count channels first, snapshot as fallback.
+    key changes only when the presence inputs changed."""
+    has_bump = _count_presence(BUMP_COUNT_CH)
+    has_dust = _count_presence(DUST_COUNT_CH)
+    key = (has_bump, has_dust)
+    if has_bump is None or has_dust is None:
+        snap = blob_snapshot.get(op(INFO_BUMP_DAT), op(INFO_DUST_DAT), absTime.frame)
+        key = key + (snap.version,)
+        if has_bump is None: has_bump = snap.has_bump
+        if has_dust is None: has_dust = snap.has_dust
+    return has_bump, has_dust, key
+
+def _debounced(st, key, raw, frame):
+    """Presence value that only changes after PRESENCE_DEBOUNCE_FRAMES stable frames."""
+    p = st['presence'].get(key)
+    if p is None:
+        p = st['presence'][key] = {'val': raw, 'cand': raw, 'since': frame}
+    if raw != p['cand']:
+        p['cand'] = raw; p['since'] = frame
+    if p['cand'] != p['val'] and (frame - p['since']) >= PRESENCE_DEBOUNCE_FRAMES - 1:
+        p['val'] = p['cand']
+    return p['val']
+
+def _debounce_pending(st):
+    return any(p['cand'] != p['val'] for p in st['presence'].values())
+
+def _write_diag(st):
+    d = op(DIAG_CHOP)
+    if not d:
+        return
+    d.par.value0 = st['transitions']
+    d.par.value1 = 1 if st['frozen'] else 0
 
 def _set_caches_active(active_bool):
     want = 1 if active_bool else 0
@@ -61,20 +134,55 @@ def _set_caches_active(active_bool):
 
 # --- MAIN (runs each frame) ---
 def onFrameEnd(execDAT):
-    has_bump = _has_any(INFO_BUMP_DAT)
-    has_dust = _has_any(INFO_DUST_DAT)
+    if frame_pipeline.drives('bump_stop', absTime.frame):
+        return    # frame_pipeline_exec runs run_stage()
+    _update()
+    return
 
-    bump_gate   = _gate_on(BUMP_GATE)
-    dust_gate   = _gate_on(DUST_GATE)
-    double_gate = _gate_on(DOUBLE_GATE)
+def run_stage(ctx):
+    # frame_pipeline stage: current frozen state
+    _update()
+    return _fsm()['frozen']
+
+def _update():
+    st = _fsm()
+    frame = absTime.frame
+    raw_bump, raw_dust, pkey = _presence()
+    gate_cooks = (_cooks(BUMP_GATE), _cooks(DUST_GATE), _cooks(DOUBLE_GATE))
+    key = (pkey, gate_cooks)
+    if key == st['key'] and not st['pending']:
+        return    # steady state: nothing upstream changed
+    st['key'] = key
+
+    has_bump = _debounced(st, 'bump', raw_bump, frame)
+    has_dust = _debounced(st, 'dust', raw_dust, frame)
+
+    bump_gate, dust_gate, double_gate = _gates(st, gate_cooks)
 
     # Priority:
     if double_gate and has_bump and has_dust:
-        _set_caches_active(False)   # both present → freeze
+        want_frozen = True    # both present → freeze
     elif bump_gate and has_bump:
-        _set_caches_active(False)   # bump mode → freeze
+        want_frozen = True    # bump mode → freeze
     elif dust_gate and has_dust and not has_bump:
-        _set_caches_active(False)   # dust-only mode → freeze
+        want_frozen = True    # dust-only mode → freeze
     else:
-        _set_caches_active(True)    # otherwise → unfreeze
+        want_frozen = False   # otherwise → unfreeze
+
+    if st['frozen'] is None:
+        # first run: take the wanted state without hold
+        st['frozen'] = want_frozen; st['since'] = frame
+        _set_caches_active(not want_frozen)
+        _write_diag(st)
+        st['pending'] = _debounce_pending(st)
+        return
+
+    if want_frozen != st['frozen']:
+        hold = MIN_FREEZE_FRAMES if st['frozen'] else MIN_UNFREEZE_FRAMES
+        if (frame - st['since']) >= hold:
+            st['frozen'] = want_frozen; st['since'] = frame
+            st['transitions'] += 1
+            _set_caches_active(not want_frozen)
+            _write_diag(st)
+    st['pending'] = (want_frozen != st['frozen']) or _debounce_pending(st)
     return
@@ -2,16 +2,29 @@
 # Execute DAT : Bump Validation (age gate + -1 fill)
 # =====================================================
 
+import numpy as np
+import blob_snapshot   # shared per-frame parse of the Info DATs
+import frame_pipeline  # single ordered per-frame pass (frame_pipeline_exec)
+import op_cache        # operator handles resolved once
+
+ops = op_cache.OpCache(op, 'bump_validation')
+
 # ---------------- CONFIG ----------------
 BUMP_INFO_OP = 'info_bumpblob'
 DUST_INFO_OP = 'info_dustblob'
 OUT_DAT_OP   = 'bump_checked'
 DEBUG_DAT_OP = 'bump_dust_debug'   # optional
 
+OUT_CHOP_OP = 'bump_out'  # Script CHOP (bump_out_chop.py): one sample per slot
+                          # channels x, y, age, stability, dust_x, dust_y
+
+# legacy Constant CHOPs: still written next to OUT_CHOP_OP for one release
+# (networks reading bump_x[0]... keep working), and always if it is missing
 BUMP_X_OP = 'bump_x'
 BUMP_Y_OP = 'bump_y'
 DUST_X_OP = 'dust_x'
 DUST_Y_OP = 'dust_y'
+LEGACY_CONSTANTS = True   # False = bump_out only (debug once if the Constants still exist)
 
 # ---- Kinematic (anti fast / tiny) ----
 FAST_WINDOW         = 3
@@ -46,7 +59,8 @@ MIN_BUMP_AGE           = 8       # NEW: must be at least this old (frames) to be
 # ---- Output slots ----
 MAX_BUMPS              = 4
 MAX_DUSTS              = 4
-EMPTY_FILL             = -1.0    # NEW: fill unused slots with -1
+EMPTY_FILL             = -1.0    # NEW: fill unused slots with -1 (x/y; age/stability -> 0)
+OUT_CHANS              = ('x','y','age','stability','dust_x','dust_y')
 
 # housekeeping
 STALE_FRAMES           = 60
@@ -65,27 +79,9 @@ def _pub_state():
     if 'pub' not in me.storage: me.storage['pub'] = {}
     return me.storage['pub']      # per-bump publish debounce
 
-# ----------------- DAT helpers --------------
-def _headers(dat):
-    return [c.val for c in dat.row(0)] if dat and dat.numRows>0 else []
-
-def _rows(dat):
-    if dat is None or dat.numRows <= 1: return []
-    heads = _headers(dat); out=[]
-    for r in range(1, dat.numRows):
-        d={}
-        for c in range(min(dat.numCols,len(heads))):
-            d[heads[c]] = dat[r,c].val
-        out.append(d)
-    return out
-
-_DEF = {
-    'id': ('id','ID','index','blobid'),
-    'x':  ('x','tx','cx','centerx','minx','left','u'),
-    'y':  ('y','ty','cy','centery','miny','top','v'),
-    'w':  ('w','width','tw'),
-    'h':  ('h','height','th'),
-}
+# ----------------- row helpers --------------
+# (Info DAT parsing lives in blob_snapshot, same alias table)
+_DEF = blob_snapshot.ALIASES
 
 def _pick(row, keys, default=None, cast=float):
     for k in keys:
@@ -119,7 +115,7 @@ def _iou_stats(a,b):
 
 # ----------------- outputs helpers -----------------
 def _update_constant(op_name, values, maxn, fill):
-    ch = op(op_name)
+    ch = ops(op_name)
     if not ch: return
     for i in range(maxn):
         v = values[i] if i < len(values) else fill
@@ -128,8 +124,49 @@ def _update_constant(op_name, values, maxn, fill):
             if abs(par.eval() - v) > 1e-9:
                 par.val = v
 
+def _publish_legacy(valid_rows, dusts):
+    _update_constant(BUMP_X_OP, [b['x'] for b in valid_rows], MAX_BUMPS, EMPTY_FILL)
+    _update_constant(BUMP_Y_OP, [b['y'] for b in valid_rows], MAX_BUMPS, EMPTY_FILL)
+    _update_constant(DUST_X_OP, [_pick(d,_DEF['x'],EMPTY_FILL) for d in dusts], MAX_DUSTS, EMPTY_FILL)
+    _update_constant(DUST_Y_OP, [_pick(d,_DEF['y'],EMPTY_FILL) for d in dusts], MAX_DUSTS, EMPTY_FILL)
+
+def _skip_legacy():
+    # LEGACY_CONSTANTS off: say once if something may still read the Constants
+    if me.storage.get('legacy_skipped'): return
+    me.storage['legacy_skipped'] = True
+    left = [n for n in (BUMP_X_OP, BUMP_Y_OP, DUST_X_OP, DUST_Y_OP) if ops(n)]
+    if left:
+        debug('bump_validation: LEGACY_CONSTANTS off, {} no longer written (read {})'.format(
+            ', '.join(left), OUT_CHOP_OP))
+
+def _publish(valid_rows, dusts):
+    """One array for all slots, one cook of OUT_CHOP_OP per change."""
+    out = ops(OUT_CHOP_OP)
+    if not out or LEGACY_CONSTANTS:
+        _publish_legacy(valid_rows, dusts)
+    else:
+        _skip_legacy()
+    if not out:
+        return
+    n = max(MAX_BUMPS, MAX_DUSTS)
+    arr = np.full((len(OUT_CHANS), n), EMPTY_FILL, dtype=np.float32)
+    arr[2:4] = 0.0
+    k = min(len(valid_rows), MAX_BUMPS)
+    if k:
+        # stability: 1.0 = no dust overlap, drops with each confirm frame
+        arr[0:4, :k] = np.array([[r['x'], r['y'], r['life'], 1.0 - r['confirm']/float(CONFIRM_FRAMES)]
+                                 for r in valid_rows[:k]], dtype=np.float32).T
+    j = min(len(dusts), MAX_DUSTS)
+    if j:
+        arr[4:6, :j] = np.array([[_pick(d,_DEF['x'],EMPTY_FILL), _pick(d,_DEF['y'],EMPTY_FILL)]
+                                 for d in dusts[:j]], dtype=np.float32).T
+    prev = me.storage.get('out')
+    if prev is None or prev.shape != arr.shape or not np.array_equal(prev, arr):
+        me.storage['out'] = arr
+        out.cook(force=True)
+
 def _write_out(rows):
-    out = op(OUT_DAT_OP)
+    out = ops(OUT_DAT_OP)
     if not out: return
     out.clear()
     out.appendRow(['id','valid','reason','iou','overlapSmall','distNorm','areaRatio',
@@ -141,7 +178,7 @@ def _write_out(rows):
             f"{r['x']:.4f}", f"{r['y']:.4f}", str(r.get('confirm',0)), str(r.get('pub_ok',0)), str(r.get('life',0))])
 
 def _write_debug(rows):
-    dbg = op(DEBUG_DAT_OP)
+    dbg = ops(DEBUG_DAT_OP)
     if not dbg: return
     dbg.clear()
     dbg.appendRow(['bump_id','dust_id','iou','overlapSmall','distNorm','areaRatio','dx','dy','uvDist','confirm','life'])
@@ -223,12 +260,14 @@ def _purge_kin(seen_ids, frame, ttl=90):
 
 # ------------------ per-frame core ------------------
 def _process_frame():
-    bumps_dat=op(BUMP_INFO_OP); dust_dat=op(DUST_INFO_OP)
+    bumps_dat=ops(BUMP_INFO_OP); dust_dat=ops(DUST_INFO_OP)
     if not bumps_dat or not dust_dat: return
-    bumps=_rows(bumps_dat); dusts=_rows(dust_dat)
+    frame=absTime.frame
+    snap=blob_snapshot.get(bumps_dat, dust_dat, frame)
+    bumps=snap.bumps; dusts=snap.dusts
 
     S=_state(); kin=_kin_state(); pub=_pub_state()
-    frame=absTime.frame; seen=set()
+    seen=set()
     results=[]; valid_bumps_rows=[]; debug_rows=[]
 
     for b in bumps:
@@ -303,11 +342,8 @@ def _process_frame():
     _write_out(results)
     _write_debug(debug_rows)
 
-    # Prepare CHOP values; empty slots filled with -1
-    _update_constant(BUMP_X_OP, [b['x'] for b in valid_bumps_rows], MAX_BUMPS, EMPTY_FILL)
-    _update_constant(BUMP_Y_OP, [b['y'] for b in valid_bumps_rows], MAX_BUMPS, EMPTY_FILL)
-    _update_constant(DUST_X_OP, [_pick(d,_DEF['x'],EMPTY_FILL) for d in dusts], MAX_DUSTS, EMPTY_FILL)
-    _update_constant(DUST_Y_OP, [_pick(d,_DEF['y'],EMPTY_FILL) for d in dusts], MAX_DUSTS, EMPTY_FILL)
+    # CHOP values (single batched cook); empty slots filled with -1
+    _publish(valid_bumps_rows, dusts)
 
 # -------------- callbacks (run once per frame) --------------
 def _run_once_per_frame():
@@ -316,8 +352,16 @@ def _run_once_per_frame():
         _process_frame()
         me.storage['last_run_frame']=f
 
+def run_stage(ctx):
+    # frame_pipeline stage: validated bumps (channels, slots) array
+    _run_once_per_frame()
+    return me.storage.get('out')
+
+# own callbacks only when frame_pipeline_exec is not driving this script
 def onFrameStart(execDAT):
+    if frame_pipeline.drives('bump_validation', absTime.frame): return
     _run_once_per_frame(); return
 
 def onFrameEnd(execDAT):
+    if frame_pipeline.drives('bump_validation', absTime.frame): return
     _run_once_per_frame(); return
@@ -0,0 +1,607 @@
+# =============================================================================
+# DEPTH RECORDER - Enregistrement / relecture des images brutes de la détection
+# =============================================================================
+# Module partagé (Text DAT 'depth_recorder'), utilisé par l'Execute DAT
+# depth_recorder_exec.py ; exécutable seul pour relire un enregistrement.
+#
+# Rien ne gardait l'entrée que voit bump_detection.cook : un problème de
+# perf ou de détection vu en spectacle ne se reproduisait pas. Ici :
+#   - null_Kinect, null_dust, cache_null écrits dans des fichiers .npy en
+#     memmap (np.lib.format.open_memmap), PRÉALLOUÉS une fois : un anneau de
+#     CAPACITY images par source, plus anciennes écrasées en premier
+#   - index.npy : une ligne par frame (seq, frame, seconds, wall) + le numéro
+#     d'écriture de chaque source ; meta.json : formes, dtypes, capacités
+#   - cache_null (image de référence) n'est écrit que quand il change : son
+#     anneau est petit, l'index pointe sur la dernière version
+#   - relecture : DepthReplay ouvre les fichiers en lecture (mmap_mode='r') ;
+#     une image servie est une vue du memmap, sans copie ni chargement en
+#     RAM : des heures de capteur se relisent page par page
+#   - Player : temps réel (horodatage enregistré / speed), aussi vite que
+#     possible, ou image par image ; les images passent par des TOP td_shim
+#     (numpyArray()), bump_detection.py tourne dessus sans modification
+#
+#   import depth_recorder
+#   rec = depth_recorder.DepthRecorder('recordings/show1', dtype='float16', channels=1)
+#   rec.create({'null_Kinect': arr, ...})   # préallocation (onStart), place vérifiée
+#   rec.record(absTime.frame, absTime.seconds, {'null_Kinect': arr, ...})
+#   rec.close()
+#
+#   replay = depth_recorder.DepthReplay('recordings/show1')
+#   replay.arrays(0)                  # {source: vue memmap ou None}
+#   depth_recorder.Player(replay, env, mode='realtime').play()
+#
+# Hors TouchDesigner :
+#   python depth_recorder.py                            # auto-test
+#   python depth_recorder.py recordings/show1 --info
+#   python depth_recorder.py recordings/show1 --mode fast      # bump_detection.py, ms/frame
+#   python depth_recorder.py recordings/show1 --mode step --start 1200
+# =============================================================================
+
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+SOURCES = ('null_Kinect', 'null_dust', 'cache_null')
+CHANGES_ONLY = ('cache_null',)   # écrites seulement quand l'image change
+CAPACITY = 3600                  # images par source (1 min à 60 fps)
+REF_CAPACITY = 16                # anneau des sources CHANGES_ONLY
+RESERVE = 2 * 10 ** 9            # octets laissés libres sur le disque après préallocation
+
+INDEX_FILE = 'index.npy'
+META_FILE = 'meta.json'
+FORMAT = 1
+
+MODES = ('realtime', 'fast', 'step')
+
+
+def index_dtype(sources):
+    """Ligne d'index : seq, frame, seconds, wall + numéro d'écriture par source (-1 = absente)."""
+    return np.dtype([('seq', '<i8'), ('frame', '<i8'), ('seconds', '<f8'), ('wall', '<f8')]
+                    + [(src, '<i8') for src in sources])
+
+
+def estimate_bytes(shape, dtype, capacity):
+    """Taille disque d'un anneau (octets)."""
+    return int(np.prod(shape)) * np.dtype(dtype).itemsize * int(capacity)
+
+
+def free_bytes(directory):
+    """Espace libre (octets) du disque qui recevra directory (premier parent existant)."""
+    path = os.path.abspath(directory)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return shutil.disk_usage(path).free
+
+
+def _npy(directory, source):
+    return os.path.join(directory, source + '.npy')
+
+
+# =============================================================================
+# ENREGISTREMENT
+# =============================================================================
+
+class DepthRecorder:
+    """
+    Args:
+        directory: dossier de l'enregistrement (créé si besoin)
+        capacity: images gardées par source (anneau)
+        sources: noms des TOP enregistrés
+        changes_only: sources écrites seulement quand l'image change
+        ref_capacity: taille de l'anneau des sources changes_only
+        dtype: dtype stocké (None = celui de la source ; 'float16' divise
+               la taille par 2, relecture alors convertie par _get_gray)
+        channels: canaux gardés (None = tous ; 1 = premier canal seulement)
+        reserve: octets qui doivent rester libres après la préallocation
+                 (sinon create() refuse avec OSError)
+
+    Les fichiers sont créés quand TOUTES les sources ont livré une image
+    (formes connues alors) : jusque-là record() n'écrit rien et self.missing
+    nomme les sources attendues (TOP pas encore cuit, op absent). Une source
+    absente à la création n'aurait sinon ni anneau ni colonne d'index pour
+    tout l'enregistrement. Un dossier existant de même format est repris à
+    la suite (anneau conservé).
+    """
+
+    def __init__(self, directory, capacity=CAPACITY, sources=SOURCES, changes_only=CHANGES_ONLY,
+                 ref_capacity=REF_CAPACITY, dtype=None, channels=None, reserve=RESERVE):
+        self.directory = directory
+        self.capacity = int(capacity)
+        self.sources = tuple(sources)
+        self.changes_only = tuple(s for s in changes_only if s in self.sources)
+        self.ref_capacity = int(ref_capacity)
+        self.dtype = None if dtype is None else np.dtype(dtype)
+        self.channels = channels
+        self.reserve = int(reserve)
+        self.meta = None
+        self.rings = {}        # source -> memmap (capacité, *forme)
+        self.index = None      # memmap (capacity,) index_dtype
+        self.seq = 0           # prochaine ligne d'index
+        self.written = {}      # source -> nombre d'écritures
+        self.missing = ()      # sources attendues avant la création des fichiers
+        self.stats = {'frames': 0, 'writes': 0, 'unchanged': 0, 'mismatch': 0, 'waiting': 0,
+                      'seconds': 0.0}
+        if os.path.exists(os.path.join(directory, META_FILE)):
+            self._resume()
+
+    # --- fichiers ---
+
+    def _capacity(self, source):
+        return self.ref_capacity if source in self.changes_only else self.capacity
+
+    def _prepare(self, arr, batch=False):
+        if arr is None:
+            return None
+        arr = np.asarray(arr)
+        if self.channels is not None and arr.ndim == (4 if batch else 3):
+            arr = arr[..., :self.channels]
+        return arr
+
+    def _missing(self, arrays):
+        return tuple(src for src in self.sources if arrays.get(src) is None)
+
+    def required_bytes(self, arrays):
+        """Taille disque que créerait create(arrays) (anneaux + index)."""
+        total = estimate_bytes((), index_dtype(self.sources), self.capacity)
+        for src in self.sources:
+            arr = self._prepare(arrays.get(src))
+            if arr is not None:
+                total += estimate_bytes(arr.shape, self.dtype or arr.dtype, self._capacity(src))
+        return total
+
+    def create(self, arrays):
+        """
+        Préalloue les fichiers d'après une image par source (à appeler hors
+        du chemin d'une frame : onStart). ValueError si une source manque,
+        OSError si le disque garderait moins de reserve octets libres.
+        Retourne la taille préallouée (octets).
+        """
+        if self.index is not None or self.meta is not None:
+            return self.size_bytes()
+        self._create({src: self._prepare(arrays.get(src)) for src in self.sources})
+        return self.size_bytes()
+
+    def _create(self, arrays):
+        missing = self._missing(arrays)
+        if missing:
+            raise ValueError('%s : sources sans image : %s' % (self.directory, ', '.join(missing)))
+        needed, free = self.required_bytes(arrays), free_bytes(self.directory)
+        if needed + self.reserve > free:
+            raise OSError('%s : %.1f Go à préallouer, %.1f Go libres (réserve %.1f Go)'
+                          % (self.directory, needed / 1e9, free / 1e9, self.reserve / 1e9))
+        os.makedirs(self.directory, exist_ok=True)
+        meta = {'format': FORMAT, 'capacity': self.capacity, 'created': time.time(), 'sources': {}}
+        for src in self.sources:
+            arr = arrays[src]
+            dtype = self.dtype or arr.dtype
+            cap = self._capacity(src)
+            self.rings[src] = np.lib.format.open_memmap(
+                _npy(self.directory, src), mode='w+', dtype=dtype, shape=(cap,) + arr.shape)
+            self.written[src] = 0
+            meta['sources'][src] = {'shape': list(arr.shape), 'dtype': np.dtype(dtype).str,
+                                    'capacity': cap, 'changes_only': src in self.changes_only}
+        names = list(meta['sources'])
+        self.index = np.lib.format.open_memmap(
+            os.path.join(self.directory, INDEX_FILE), mode='w+',
+            dtype=index_dtype(names), shape=(self.capacity,))
+        self.index['seq'] = -1
+        self.seq = 0
+        self.missing = ()
+        with open(os.path.join(self.directory, META_FILE), 'w') as fh:
+            json.dump(meta, fh, indent=1)
+        self.meta = meta
+
+    def _resume(self):
+        with open(os.path.join(self.directory, META_FILE)) as fh:
+            meta = json.load(fh)
+        if meta.get('format') != FORMAT:
+            raise ValueError('%s: format %s, attendu %s' % (self.directory, meta.get('format'), FORMAT))
+        self.meta = meta
+        self.capacity = meta['capacity']
+        self.index = np.load(os.path.join(self.directory, INDEX_FILE), mmap_mode='r+')
+        self.seq = int(self.index['seq'].max()) + 1
+        for src, info in meta['sources'].items():
+            self.rings[src] = np.load(_npy(self.directory, src), mmap_mode='r+')
+            self.written[src] = int(self.index[src].max()) + 1
+
+    # --- écriture ---
+
+    def record(self, frame, seconds, arrays, wall=None):
+        """
+        Ajoute une frame. arrays : {source: array (h, w[, c]) ou None}.
+        Retourne le numéro de ligne (seq), None tant qu'une source n'a jamais
+        livré d'image (fichiers pas encore créés, voir self.missing).
+        """
+        t0 = time.perf_counter()
+        arrays = {src: self._prepare(arrays.get(src)) for src in self.sources}
+        if self.index is None:
+            if self.meta is not None:
+                self._resume()          # rouvert après close()
+            else:
+                self.missing = self._missing(arrays)
+                if self.missing:
+                    self.stats['waiting'] += 1
+                    return None
+                self._create(arrays)
+        seq = self.seq
+        row = np.zeros((), dtype=self.index.dtype)
+        row['seq'] = seq
+        row['frame'] = frame
+        row['seconds'] = seconds
+        row['wall'] = time.time() if wall is None else wall
+        for src, ring in self.rings.items():
+            row[src] = self._write(src, ring, arrays.get(src))
+        self.index[seq % self.capacity] = row
+        self.seq += 1
+        self.stats['frames'] += 1
+        self.stats['seconds'] += time.perf_counter() - t0
+        return seq
+
+    def _write(self, src, ring, arr):
+        """Écrit arr dans l'anneau de src ; numéro d'écriture (-1 = absente)."""
+        if arr is None:
+            return -1
+        if arr.shape != ring.shape[1:]:
+            # résolution changée en cours d'enregistrement : image ignorée
+            self.stats['mismatch'] += 1
+            return -1
+        n = self.written[src]
+        cap = len(ring)
+        if src in self.changes_only and n:
+            if np.array_equal(ring[(n - 1) % cap], arr.astype(ring.dtype, copy=False)):
+                self.stats['unchanged'] += 1
+                return n - 1
+        ring[n % cap] = arr
+        self.written[src] = n + 1
+        self.stats['writes'] += 1
+        return n
+
+    def record_batch(self, frames, seconds, arrays, still=None, wall=None):
+        """
+        Ajoute n frames d'un coup (générateur synthétique, conversion) : une
+        écriture par source au lieu de n.
+
+        Args:
+            frames, seconds: (n,) numéros de frame et temps
+            arrays: {source: array (n, h, w[, c])} une image par frame
+            still: {source: array (h, w[, c])} même image pour les n frames
+                   (ex: cache_null), écrite une fois si elle a changé
+        Toutes les sources doivent être fournies au premier lot (ValueError).
+        Retourne le seq de la première frame.
+        """
+        t0 = time.perf_counter()
+        frames = np.asarray(frames, dtype=np.int64)
+        n = len(frames)
+        batch = {src: self._prepare(a, batch=True) for src, a in arrays.items() if src in self.sources}
+        still = {src: self._prepare(a) for src, a in (still or {}).items() if src in self.sources}
+        if self.index is None:
+            if self.meta is not None:
+                self._resume()
+            else:
+                first = dict(still)
+                first.update({src: a[0] for src, a in batch.items() if a is not None})
+                self._create(first)
+        seq0 = self.seq
+        # plus de frames que l'anneau : seules les capacity dernières restent
+        skip = max(0, n - self.capacity)
+        keep = slice(skip, n)
+        rows = np.zeros(n - skip, dtype=self.index.dtype)
+        rows['seq'] = seq0 + np.arange(skip, n)
+        rows['frame'] = frames[keep]
+        rows['seconds'] = np.asarray(seconds, dtype=np.float64)[keep]
+        rows['wall'] = time.time() if wall is None else wall
+        for src, ring in self.rings.items():
+            if src in still:
+                rows[src] = self._write(src, ring, still[src])
+                continue
+            arr = batch.get(src)
+            if arr is None:
+                rows[src] = -1
+            elif arr.shape[1:] != ring.shape[1:]:
+                self.stats['mismatch'] += n
+                rows[src] = -1
+            else:
+                first = self.written[src] + skip
+                slots = np.arange(first, self.written[src] + n) % len(ring)
+                ring[slots] = arr[keep]
+                rows[src] = np.arange(first, self.written[src] + n)
+                self.written[src] += n
+                self.stats['writes'] += n - skip
+        self.index[rows['seq'] % self.capacity] = rows
+        self.seq += n
+        self.stats['frames'] += n
+        self.stats['seconds'] += time.perf_counter() - t0
+        return seq0
+
+    def flush(self):
+        """Écrit les pages modifiées sur disque (index en dernier)."""
+        for ring in self.rings.values():
+            ring.flush()
+        if self.index is not None:
+            self.index.flush()
+
+    def close(self):
+        self.flush()
+        self.rings = {}
+        self.index = None
+
+    def size_bytes(self):
+        """Taille disque de l'enregistrement préalloué."""
+        if self.meta is None:
+            return 0
+        return sum(estimate_bytes(s['shape'], s['dtype'], s['capacity'])
+                   for s in self.meta['sources'].values())
+
+
+# =============================================================================
+# RELECTURE
+# =============================================================================
+
+class DepthReplay:
+    """
+    Enregistrement ouvert en lecture seule (memmap) ; frames dans l'ordre
+    d'écriture, les plus anciennes écrasées par l'anneau exclues.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE)) as fh:
+            self.meta = json.load(fh)
+        self.sources = tuple(self.meta['sources'])
+        self.rings = {src: np.load(_npy(directory, src), mmap_mode='r') for src in self.sources}
+        index = np.load(os.path.join(directory, INDEX_FILE), mmap_mode='r')
+        used = index[index['seq'] >= 0]
+        self.index = np.sort(used, order='seq')     # copie : une ligne par frame, petite
+        # numéro d'écriture le plus récent par source : les plus anciennes ont été écrasées
+        self.head = {src: int(self.index[src].max()) if len(self.index) else -1 for src in self.sources}
+
+    def __len__(self):
+        return len(self.index)
+
+    def row(self, i):
+        return self.index[i]
+
+    def array(self, source, i):
+        """Image de source à la frame i : vue du memmap (pas de copie), ou None."""
+        ring = self.rings.get(source)
+        if ring is None:
+            return None                 # source absente de l'enregistrement
+        n = int(self.index[source][i])
+        if n < 0 or n <= self.head[source] - len(ring):
+            return None
+        return ring[n % len(ring)]
+
+    def arrays(self, i):
+        return {src: self.array(src, i) for src in self.sources}
+
+    def attach(self, env):
+        """TOP td_shim nommés comme les sources (créés si absents) ; {source: TOP}."""
+        tops = {}
+        for src in self.sources:
+            tops[src] = env.op(src) or env.top(src)
+        return tops
+
+    def info(self):
+        """Résumé : frames, durée, numéros de frame, sources."""
+        if not len(self):
+            return {'frames': 0}
+        first, last = self.index[0], self.index[-1]
+        return {'frames': len(self),
+                'frame_range': (int(first['frame']), int(last['frame'])),
+                'seconds': float(last['seconds'] - first['seconds']),
+                'sources': {src: dict(self.meta['sources'][src], writes=self.head[src] + 1)
+                            for src in self.sources}}
+
+
+class Player:
+    """
+    Rejoue un DepthReplay dans un td_shim.Env : chaque frame, les TOP
+    servent les vues memmap puis l'Env cuit la frame au numéro enregistré.
+
+    Args:
+        mode: 'realtime' (horodatage enregistré / speed), 'fast' ou 'step'
+        speed: facteur de vitesse en temps réel
+        wait: mode step, appelée avant chaque frame (défaut : attendre Entrée)
+    """
+
+    def __init__(self, replay, env, mode='fast', speed=1.0, wait=None):
+        if mode not in MODES:
+            raise ValueError('mode inconnu : %s' % mode)
+        self.replay = replay
+        self.env = env
+        self.mode = mode
+        self.speed = float(speed)
+        self.wait = wait or (lambda i, row: input())
+        self.tops = replay.attach(env)
+        self.cook_times = []
+
+    def _serve(self, i):
+        for src, top in self.tops.items():
+            top.set(self.replay.array(src, i))
+
+    def play(self, start=0, count=None, each=None):
+        """Frames start .. start+count ; each(env, i, row) après chaque frame. Nombre de frames jouées."""
+        replay = self.replay
+        stop = len(replay) if count is None else min(len(replay), start + count)
+        clock = time.perf_counter
+        t0, s0 = clock(), None
+        played = 0
+        for i in range(start, stop):
+            row = replay.row(i)
+            if self.mode == 'realtime':
+                if s0 is None:
+                    s0 = float(row['seconds'])
+                delay = t0 + (float(row['seconds']) - s0) / self.speed - clock()
+                if delay > 0:
+                    time.sleep(delay)
+            elif self.mode == 'step':
+                if self.wait(i, row) is False:
+                    break
+            self._serve(i)
+            c0 = clock()
+            self.env.cook_frame(int(row['frame']))
+            self.cook_times.append(clock() - c0)
+            played += 1
+            if each is not None:
+                each(self.env, i, row)
+        return played
+
+
+# =============================================================================
+# AUTO-TEST / CLI (hors TouchDesigner)
+# =============================================================================
+
+def _selfcheck():
+    import shutil
+    import tempfile
+    ok = True
+
+    def check(name, cond):
+        print('%-52s %s' % (name, 'OK' if cond else 'FAIL'))
+        return bool(cond)
+
+    tmp = tempfile.mkdtemp(prefix='depth_rec_')
+    try:
+        h, w = 24, 32
+        ref = np.full((h, w, 4), 0.8, dtype=np.float32)
+        rec = DepthRecorder(tmp, capacity=8, ref_capacity=2)
+        waiting = rec.record(99, 99 / 60.0, {'null_Kinect': ref, 'cache_null': ref})
+        ok &= check('files wait for every source',
+                    waiting is None and rec.index is None and rec.missing == ('null_dust',)
+                    and not os.path.exists(os.path.join(tmp, META_FILE)))
+        for f in range(12):
+            depth = np.full((h, w, 4), 0.8, dtype=np.float32)
+            depth[f % h, f % w] = 0.1 + f * 0.01
+            if f == 6:
+                ref = ref * 0.9           # nouvelle référence
+            rec.record(100 + f, (100 + f) / 60.0, {'null_Kinect': depth, 'cache_null': ref,
+                                                    'null_dust': None if f == 3 else depth[..., :1]})
+        ok &= check('reference written only when it changes',
+                    rec.written['cache_null'] == 2 and rec.stats['unchanged'] == 10)
+        rec.close()
+
+        replay = DepthReplay(tmp)
+        ok &= check('ring keeps the last capacity frames',
+                    len(replay) == 8 and replay.row(0)['frame'] == 104 and replay.row(7)['frame'] == 111)
+        a = replay.array('null_Kinect', 7)
+        ok &= check('frames served as memmap views (no copy)',
+                    isinstance(a, np.memmap) and a.base is not None and abs(a[11, 11, 0] - 0.21) < 1e-6)
+        ok &= check('reference follows the index',
+                    abs(replay.array('cache_null', 1)[0, 0, 0] - 0.8) < 1e-6
+                    and abs(replay.array('cache_null', 2)[0, 0, 0] - 0.72) < 1e-6)
+
+        # reprise : même dossier, l'anneau continue
+        rec = DepthRecorder(tmp)
+        rec.record(112, 112 / 60.0, {'null_Kinect': np.zeros((h, w, 4), np.float32),
+                                     'null_dust': np.zeros((h, w, 1), np.float32), 'cache_null': ref})
+        rec.close()
+        replay = DepthReplay(tmp)
+        ok &= check('resumed recording appends to the ring',
+                    len(replay) == 8 and replay.row(7)['frame'] == 112 and replay.head['cache_null'] == 1)
+
+        # place disque : refus avant toute préallocation
+        full_dir = os.path.join(tmp, 'full')
+        full = DepthRecorder(full_dir, capacity=8, reserve=free_bytes(tmp))
+        try:
+            full.create({src: ref for src in SOURCES})
+            refused = False
+        except OSError:
+            refused = True
+        ok &= check('refuses to preallocate past the free disk space',
+                    refused and not os.path.exists(full_dir)
+                    and full.required_bytes({src: ref for src in SOURCES}) >= 3 * 8 * ref.nbytes)
+
+        # écriture par lots : même contenu qu'image par image
+        batch_dir = os.path.join(tmp, 'batch')
+        rec = DepthRecorder(batch_dir, capacity=8, ref_capacity=2, sources=('null_Kinect', 'cache_null'))
+        depth = np.random.default_rng(0).random((10, h, w), dtype=np.float32)
+        rec.record_batch(np.arange(10), np.arange(10) / 60.0, {'null_Kinect': depth},
+                         still={'cache_null': ref[..., 0]})
+        rec.record_batch([10, 11], [10 / 60.0, 11 / 60.0], {'null_Kinect': depth[:2]},
+                         still={'cache_null': ref[..., 0]})
+        rec.close()
+        b = DepthReplay(batch_dir)
+        ok &= check('record_batch: ring, index and still sources',
+                    len(b) == 8 and b.row(7)['frame'] == 11
+                    and np.array_equal(b.array('null_Kinect', 5), depth[9])
+                    and np.array_equal(b.array('null_Kinect', 7), depth[1])
+                    and b.head['cache_null'] == 0 and b.sources == ('null_Kinect', 'cache_null'))
+
+        # relecture dans td_shim, frames au numéro enregistré
+        import td_shim
+        env = td_shim.Env()
+        seen = []
+        player = Player(replay, env, mode='step', wait=lambda i, row: i < 3)
+        player.play(each=lambda env, i, row: seen.append(
+            (env.absTime.frame, env.op('null_Kinect').numpyArray() is not None)))
+        ok &= check('step mode, recorded frame numbers, numpyArray()',
+                    seen == [(105, True), (106, True), (107, True)])
+        t0 = time.perf_counter()
+        Player(replay, env, mode='realtime', speed=4.0).play(count=5)
+        ok &= check('realtime mode follows the timestamps',
+                    time.perf_counter() - t0 >= 4 / 60.0 / 4.0 * 0.9)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    print('OK' if ok else 'FAIL')
+    return 0 if ok else 1
+
+
+def run_detection(directory, mode='fast', speed=1.0, start=0, count=None,
+                  script='bump_detection.py', distance=150.0):
+    """Rejoue un enregistrement à travers bump_detection.py (td_shim) ; (env, player)."""
+    import td_shim
+    td_shim.reset_modules()
+    env = td_shim.Env()
+    replay = DepthReplay(directory)
+    env.chop('distance_mini', {'v': [distance]})
+    player = Player(replay, env, mode=mode, speed=speed,
+                    wait=lambda i, row: print('frame %d  (%d/%d) [Enter]' % (row['frame'], i + 1, len(replay)))
+                    or input() != 'q')
+    env.load(script, kind='chop', name='bump_detection', inputs=['distance_mini'])
+    return env, player
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description='Replay a depth recording (memmap) through bump_detection.py.')
+    ap.add_argument('directory', nargs='?', help='recording directory (meta.json, index.npy, <source>.npy)')
+    ap.add_argument('--info', action='store_true', help='print the recording summary and exit')
+    ap.add_argument('--mode', choices=MODES, default='fast')
+    ap.add_argument('--speed', type=float, default=1.0, help='realtime speed factor')
+    ap.add_argument('--start', type=int, default=0, help='first frame (index in the recording)')
+    ap.add_argument('--count', type=int, default=None)
+    ap.add_argument('--script', default='bump_detection.py', help='Script CHOP callbacks to run')
+    ap.add_argument('--distance', type=float, default=150.0, help='distance_mini value')
+    ap.add_argument('--check', action='store_true', help='self-check (default without arguments)')
+    args = ap.parse_args(argv)
+    if args.check or not args.directory:
+        return _selfcheck()
+    if args.info:
+        print(json.dumps(DepthReplay(args.directory).info(), indent=1))
+        return 0
+    env, player = run_detection(args.directory, args.mode, args.speed, args.start, args.count,
+                                args.script, args.distance)
+    counts = []
+    det = env.op('bump_detection')
+    t0 = time.perf_counter()
+    played = player.play(args.start, args.count, each=lambda env, i, row: counts.append(det['bump_count'].eval()))
+    wall = time.perf_counter() - t0
+    if not played:
+        print('no frame played')
+        return 1
+    ms = np.asarray(player.cook_times) * 1e3
+    print('Frames : %d  (%s, %.1f s)' % (played, args.mode, wall))
+    print('Cook   : %.3f ms avg, %.3f ms p95, %.3f ms max  (%.1f FPS)'
+          % (ms.mean(), np.percentile(ms, 95), ms.max(), 1e3 / ms.mean()))
+    print('Bumps  : %.2f avg per frame, %d frames with a bump' % (np.mean(counts), np.count_nonzero(counts)))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
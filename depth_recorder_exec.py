@@ -0,0 +1,118 @@
+# =====================================================
+# Execute DAT : depth_recorder_exec
+# Purpose:
+#   Records the raw frames bump_detection.cook reads
+#   (null_Kinect, null_dust, cache_null) into a
+#   preallocated memmap ring on disk (depth_recorder.py),
+#   with a frame / timestamp index. cache_null is only
+#   written when it changes.
+#   One new recording directory per start, under
+#   project.folder/RECORD_DIR. Replay it outside
+#   TouchDesigner:
+#     python depth_recorder.py <dir> --mode realtime
+#   The rings are preallocated in onStart, not inside a
+#   frame. The free disk space is checked first and the
+#   recording is refused (debug) if it would leave less
+#   than RESERVE_GB. A source not cooked yet at start is
+#   reported; the rings are then created on the first
+#   frame where every source delivers.
+#   Size per source = width x height x CHANNELS x dtype
+#   x CAPACITY: 640x576, 1 channel float16, 3600 frames
+#   = 2.7 GB (RGBA float32 would be 8x that).
+#   Re-executing the DAT keeps the running recording.
+#   Enabled after project start: run
+#     op('depth_recorder_exec').module.onStart()
+#   Turn the DAT off to stop recording (files stay
+#   valid: the index is flushed every FLUSH_EVERY frames
+#   and on exit).
+#   Cost: one extra numpyArray() download per source
+#   and frame, plus the copy into the ring.
+#   Start: ON, Frame End: ON
+# =====================================================
+
+import os
+import time
+import depth_recorder
+import op_cache
+
+# --- CONFIG ---
+RECORD_DIR  = 'recordings'               # relative to project.folder
+SOURCES     = depth_recorder.SOURCES     # null_Kinect, null_dust, cache_null
+CAPACITY    = 3600                       # frames kept (1 min at 60 fps), oldest overwritten
+EVERY       = 1                          # record one frame every EVERY frames
+DTYPE       = 'float16'                  # None = as delivered (float32, 2x the size)
+CHANNELS    = 1                          # depth TOPs are gray: first channel only (None = all)
+RESERVE_GB  = 2.0                        # disk space left free after preallocation
+FLUSH_EVERY = 600                        # frames between index flushes
+
+ops = op_cache.OpCache(op, 'depth_recorder_exec')
+
+def _arrays():
+    arrays = {}
+    for name in SOURCES:
+        top = ops(name)
+        arrays[name] = top.numpyArray() if top else None
+    return arrays
+
+def _create(rec, arrays):
+    # Preallocates the rings once every source delivers; True when recording
+    missing = [name for name in SOURCES if arrays.get(name) is None]
+    if missing:
+        if missing != me.storage.get('missing'):
+            me.storage['missing'] = missing
+            debug('depth_recorder: waiting for {}'.format(', '.join(missing)))
+        return False
+    try:
+        size = rec.create(arrays)
+    except OSError as e:
+        # not enough disk: refused for this run, not retried every frame
+        me.storage['recorder'] = None
+        debug('depth_recorder: not recording, {}'.format(e))
+        return False
+    debug('depth_recorder: {} ({:.1f} GB preallocated)'.format(rec.directory, size / 1e9))
+    return True
+
+def _start():
+    old = me.storage.get('recorder')
+    if old is not None:
+        old.close()
+    base = os.path.join(project.folder, RECORD_DIR, time.strftime('depth_%Y%m%d_%H%M%S'))
+    path, n = base, 1
+    while os.path.exists(path):
+        # restarted within the same second: never resume someone else's ring
+        path, n = '{}_{}'.format(base, n), n + 1
+    rec = depth_recorder.DepthRecorder(path, capacity=CAPACITY, sources=SOURCES, dtype=DTYPE,
+                                       channels=CHANNELS, reserve=RESERVE_GB * 1e9)
+    me.storage['recorder'] = rec
+    me.storage['missing'] = None
+    _create(rec, _arrays())
+    return rec
+
+def onStart():
+    _start()
+    return
+
+def onFrameEnd(frame):
+    rec = me.storage.get('recorder')
+    if rec is None:
+        return
+    f = absTime.frame
+    if f % EVERY:
+        return
+    arrays = _arrays()
+    if rec.index is None and rec.meta is None and not _create(rec, arrays):
+        return
+    rec.record(f, absTime.seconds, arrays)
+    if rec.seq % FLUSH_EVERY == 0:
+        rec.flush()
+    return
+
+# --- OTHER CALLBACKS ---
+def onExit():
+    rec = me.storage.pop('recorder', None)
+    if rec is not None:
+        rec.close()
+    return
+
+def onFrameStart(frame):
+    return
@@ -0,0 +1,242 @@
+# =============================================================================
+# FRAME PIPELINE - Étapes du frame ordonnées, exécutées en une passe
+# =============================================================================
+# Module partagé (Text DAT 'frame_pipeline'), piloté par l'Execute DAT
+# frame_pipeline_exec.py.
+#
+# bump_validation, bump_stop, proximity_calculator, bridge_midi_controller
+# et render_sync_flush avaient chacun leurs onFrameStart / onFrameEnd, dans
+# un ordre non défini : bridge_midi_controller pouvait lire proximity_chop
+# du frame précédent, la validation tournait depuis les deux callbacks
+# (garde last_run_frame). Ici :
+#   - étapes enregistrées avec leurs dépendances (after=...)
+#   - ordre topologique (stable : ordre d'enregistrement entre étapes libres),
+#     cycle ou dépendance inconnue -> ValueError à la construction
+#   - une seule passe par frame ; chaque étape reçoit ctx (dict partagé) et
+#     sa valeur de retour y est rangée sous son nom : les données passent en
+#     mémoire, pas par un CHOP / DAT relu
+#   - temps de chaque étape (dernier, moyenne, max) ; une étape en erreur est
+#     signalée (rate_log) et les étapes qui en dépendent sont sautées ce frame
+#
+#   import frame_pipeline
+#   p = frame_pipeline.Pipeline()
+#   p.add('bump_validation', fn)                       # fn(ctx) -> valeur
+#   p.add('proximity', fn2, after=('bump_validation',))
+#   frame_pipeline.install(p)      # les scripts pilotés sautent leurs callbacks
+#   p.run(absTime.frame)           # une fois par frame
+#
+# Dans un script piloté :
+#   if frame_pipeline.drives('bump_validation', absTime.frame):
+#       return                     # le pipeline l'exécute déjà
+# Si le pipeline ne tourne plus (DAT supprimé / désactivé), drives() redevient
+# faux au frame suivant et les scripts reprennent leurs propres callbacks.
+#
+# Auto-test hors TouchDesigner : python frame_pipeline.py
+# =============================================================================
+
+import time
+import traceback
+
+import rate_log
+
+REPORT_HEADER = ['stage', 'after', 'calls', 'last_ms', 'avg_ms', 'max_ms', 'skipped', 'errors']
+
+
+class Stage:
+    def __init__(self, name, fn, after):
+        self.name = name
+        self.fn = fn
+        self.after = tuple(after)
+        self.stats = {'calls': 0, 'total': 0.0, 'last': 0.0, 'max': 0.0, 'skipped': 0, 'errors': 0}
+
+
+class Pipeline:
+    """Étapes avec dépendances, exécutées une fois par frame dans l'ordre topologique."""
+
+    def __init__(self, log=None):
+        self.stages = {}       # nom -> Stage (ordre d'enregistrement)
+        self._order = None
+        self.last_frame = None
+        self.ctx = {}
+        self.log = log or rate_log.log
+        self.stats = {'runs': 0, 'repeats': 0, 'total': 0.0, 'last': 0.0}
+
+    def add(self, name, fn, after=()):
+        """Enregistre une étape ; after : noms des étapes à exécuter avant."""
+        if name in self.stages:
+            raise ValueError('étape déjà enregistrée : %s' % name)
+        self.stages[name] = Stage(name, fn, after)
+        self._order = None
+        return self
+
+    def order(self):
+        """Noms des étapes, dépendances d'abord (Kahn, stable)."""
+        if self._order is not None:
+            return self._order
+        for st in self.stages.values():
+            for dep in st.after:
+                if dep not in self.stages:
+                    raise ValueError('%s dépend de %s, non enregistrée' % (st.name, dep))
+        done, order = set(), []
+        pending = list(self.stages)
+        while pending:
+            ready = [n for n in pending if all(d in done for d in self.stages[n].after)]
+            if not ready:
+                raise ValueError('cycle de dépendances : %s' % ', '.join(pending))
+            # une seule à la fois : la première enregistrée passe en premier
+            name = ready[0]
+            order.append(name)
+            done.add(name)
+            pending.remove(name)
+        self._order = order
+        return order
+
+    def run(self, frame):
+        """Exécute toutes les étapes une fois pour ce frame ; ctx du frame (ou None si déjà fait)."""
+        if frame == self.last_frame:
+            self.stats['repeats'] += 1
+            return None
+        self.last_frame = frame
+        ctx = {'frame': frame}
+        failed = set()
+        t_run = time.perf_counter()
+        for name in self.order():
+            st = self.stages[name]
+            if failed.intersection(st.after):
+                st.stats['skipped'] += 1
+                failed.add(name)
+                continue
+            t0 = time.perf_counter()
+            try:
+                ctx[name] = st.fn(ctx)
+            except Exception:
+                st.stats['errors'] += 1
+                failed.add(name)
+                self.log('frame_pipeline.' + name, 'frame_pipeline: stage {} failed\n{}'.format(
+                    name, traceback.format_exc()))
+            dt = time.perf_counter() - t0
+            s = st.stats
+            s['calls'] += 1
+            s['total'] += dt
+            s['last'] = dt
+            s['max'] = max(s['max'], dt)
+        self.stats['runs'] += 1
+        self.stats['last'] = time.perf_counter() - t_run
+        self.stats['total'] += self.stats['last']
+        self.ctx = ctx
+        return ctx
+
+    def report(self):
+        """Lignes [stage, after, calls, last_ms, avg_ms, max_ms, skipped, errors] dans l'ordre d'exécution."""
+        rows = []
+        for name in self.order():
+            st = self.stages[name]
+            s = st.stats
+            avg = s['total'] / s['calls'] if s['calls'] else 0.0
+            rows.append([name, ' '.join(st.after), s['calls'], round(s['last'] * 1e3, 3),
+                         round(avg * 1e3, 3), round(s['max'] * 1e3, 3), s['skipped'], s['errors']])
+        return rows
+
+    def write_report(self, table):
+        """Écrit report() dans un Table DAT (en-tête REPORT_HEADER)."""
+        if table is None:
+            return
+        rows = self.report()
+        table.clear()
+        table.appendRow(REPORT_HEADER)
+        for row in rows:
+            table.appendRow(row)
+
+
+# --- Pipeline installé (un par projet) ---
+_installed = [None]
+
+
+def install(pipeline):
+    """Déclare le pipeline qui pilote les scripts (remplace le précédent)."""
+    _installed[0] = pipeline
+    return pipeline
+
+
+def uninstall():
+    _installed[0] = None
+
+
+def installed():
+    return _installed[0]
+
+
+def drives(name, frame):
+    """
+    True si le pipeline installé exécute l'étape name et a tourné au frame
+    courant ou précédent : le script doit alors sauter son propre callback.
+    Faux tant que le pipeline n'a jamais tourné (DAT installé mais Frame End
+    inactif, ou frame d'installation) : les scripts gardent leurs callbacks.
+    """
+    p = _installed[0]
+    if p is None or name not in p.stages or p.last_frame is None:
+        return False
+    return frame - p.last_frame <= 1
+
+
+# =============================================================================
+# AUTO-TEST (hors TouchDesigner)
+# =============================================================================
+
+def _selfcheck():
+    ok = True
+
+    def check(name, cond):
+        print('%-52s %s' % (name, 'OK' if cond else 'FAIL'))
+        return bool(cond)
+
+    calls = []
+    p = Pipeline(log=lambda key, msg: calls.append(('log', key)))
+    # enregistrées dans le désordre : l'ordre vient des dépendances
+    p.add('midi', lambda ctx: calls.append('midi') or ctx['proximity'] * 2, after=('proximity',))
+    p.add('bump_stop', lambda ctx: calls.append('bump_stop'), after=('bump_validation',))
+    p.add('bump_validation', lambda ctx: calls.append('bump_validation') or 3)
+    p.add('proximity', lambda ctx: calls.append('proximity') or ctx['bump_validation'] + 1,
+          after=('bump_validation',))
+    p.add('render', lambda ctx: calls.append('render'), after=('proximity',))
+    ok &= check('topological order', p.order() == ['bump_validation', 'bump_stop', 'proximity', 'midi', 'render'])
+    ctx = p.run(10)
+    ok &= check('data passes in memory through ctx', ctx['proximity'] == 4 and ctx['midi'] == 8)
+    ok &= check('once per frame', p.run(10) is None and calls.count('midi') == 1)
+
+    install(Pipeline().add('proximity', lambda ctx: None))
+    ok &= check('drives() off until the pipeline has run', not drives('proximity', 11))
+    install(p)
+    ok &= check('drives() for registered stages while running',
+                drives('proximity', 11) and not drives('hero_control', 11))
+    ok &= check('drives() off once the pipeline stops', not drives('proximity', 13))
+    uninstall()
+    ok &= check('drives() off when uninstalled', not drives('proximity', 11))
+
+    # erreur : l'étape et ses dépendantes sautent, les autres tournent
+    def boom(ctx):
+        raise RuntimeError('boom')
+    q = Pipeline(log=lambda key, msg: calls.append(('log', key)))
+    q.add('a', boom).add('b', lambda ctx: 1, after=('a',)).add('c', lambda ctx: 2)
+    ctx = q.run(1)
+    ok &= check('failed stage skips its dependents', 'b' not in ctx and ctx['c'] == 2
+                and q.stages['a'].stats['errors'] == 1 and q.stages['b'].stats['skipped'] == 1
+                and ('log', 'frame_pipeline.a') in calls)
+
+    for bad, msg in ((lambda r: r.add('x', boom, after=('y',)).add('y', boom, after=('x',)), 'cycle'),
+                     (lambda r: r.add('x', boom, after=('missing',)), 'missing dependency')):
+        r = Pipeline()
+        bad(r)
+        try:
+            r.order()
+            ok &= check(msg + ' rejected', False)
+        except ValueError:
+            ok &= check(msg + ' rejected', True)
+    rows = p.report()
+    ok &= check('report rows per stage', [r[0] for r in rows] == p.order() and rows[3][2] == 1)
+    print('OK' if ok else 'FAIL')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(_selfcheck())
@@ -0,0 +1,70 @@
+# =====================================================
+# Execute DAT : frame_pipeline_exec
+# Purpose:
+#   Runs the per-frame scripts ONCE, in dependency order,
+#   from this single callback (frame_pipeline.py):
+#     bump_validation -> bump_stop
+#     bump_validation -> proximity_calculator
+#         -> bridge_midi_controller
+#         -> render_sync_flush
+#   Each stage calls run_stage(ctx) in its script's
+#   Execute DAT module (bump_stop.py runs in the DAT
+#   'execute_freeze_manager'). Results pass in ctx:
+#   the proximity array goes straight to
+#   bridge_midi_controller, no proximity_chop read of
+#   the previous frame.
+#   While this DAT runs, the scripts skip their own
+#   onFrameStart / onFrameEnd. Per-stage timings go to
+#   the optional 'frame_pipeline_report' Table DAT.
+#   Frame End: ON
+# =====================================================
+
+import frame_pipeline
+import op_cache
+
+# --- CONFIG ---
+# (stage, Execute DAT running the script, stages it runs after)
+STAGES = [
+    ('bump_validation',        'bump_validation',        ()),
+    ('bump_stop',              'execute_freeze_manager', ('bump_validation',)),
+    ('proximity_calculator',   'proximity_calculator',   ('bump_validation',)),
+    ('bridge_midi_controller', 'bridge_midi_controller', ('proximity_calculator',)),
+    ('render_sync_flush',      'render_sync_flush',      ('proximity_calculator',)),
+]
+REPORT_DAT   = 'frame_pipeline_report'   # optional Table DAT
+REPORT_EVERY = 60                        # frames between report writes
+
+ops = op_cache.OpCache(op, 'frame_pipeline_exec')
+
+def _stage(dat_name):
+    def run(ctx):
+        return ops(dat_name).module.run_stage(ctx)
+    return run
+
+def _build():
+    pipeline = frame_pipeline.Pipeline()
+    for name, dat_name, after in STAGES:
+        pipeline.add(name, _stage(dat_name), after)
+    pipeline.order()   # cycle / unknown stage -> error now, not every frame
+    return pipeline
+
+pipeline = frame_pipeline.install(_build())
+
+def onFrameEnd(frame):
+    f = absTime.frame
+    pipeline.run(f)
+    if f % REPORT_EVERY == 0:
+        pipeline.write_report(ops(REPORT_DAT))
+    return
+
+# --- OTHER CALLBACKS ---
+def onStart():
+    return
+
+def onExit():
+    # scripts go back to their own callbacks
+    frame_pipeline.uninstall()
+    return
+
+def onFrameStart(frame):
+    return
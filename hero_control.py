@@ -1,19 +1,94 @@
 # Contrôle Hero avec Debug Method Tracking + FSM Hand Active
 # Configuré sur le CHOP 'hero_control'
 
+import op_cache
+import render_sync
+import ball_layout
+import hero_predict
+
+# Handles d'opérateurs résolus une fois (voir op_cache.py)
+ops = op_cache.OpCache(op, 'hero_control')
+
+# --- Ghost mode (main MediaPipe perdue) ---
+# Le hero glisse vers le centre pondéré des boules proches puis les bridges
+# se rétractent. Python calcule la cible UNE fois et l'envoie avec
+# window.animateHeroTo ; l'interpolation est faite par la page (onFrame).
+GHOST_MODE = False
+GHOST_DURATION_MS = 1200
+GHOST_EASING = 'easeOutExpo'   # proche de l'ancien pas GHOST_SPEED = 0.08 par frame
+CONNECT_DISTANCE = 480
+MAX_BALLS = 5
+
+# --- Prédiction (compensation de latence, voir hero_predict.py) ---
+# Latence bout-en-bout par méthode (0 = bump, 1 = mediapipe), en ms.
+# VALEURS PROVISOIRES, NON MESURÉES : estimées (~3-4 frames à 60 fps), à
+# remplacer par une mesure sur l'installation :
+#   1. PREDICT = False (hero affiché sans avance)
+#   2. filmer la main et l'écran dans le même plan au ralenti (240 fps)
+#   3. geste brusque puis arrêt net ; compter les images entre l'arrêt de
+#      la main et l'arrêt du hero : latence = images / 240 * 1000
+#   4. refaire pour chaque méthode (toile pour bump, main en l'air pour
+#      mediapipe), garder la médiane de ~10 gestes
+# 0 = lissage de Kalman seul (position filtrée), sans extrapolation.
+PREDICT = True
+PREDICT_LATENCY_MS = {0: 50, 1: 70}   # provisoire, voir ci-dessus
+PREDICT_MAX_LEAD = hero_predict.MAX_LEAD   # avance maximale (px)
+
+predictor = hero_predict.HeroPredictor(max_lead=PREDICT_MAX_LEAD)
+predict_method = None   # méthode de la dernière mesure (changement -> reset)
+
 # Globals pour FSM hand_active
 last_hand_active = 0
 last_hero_x = 540
 last_hero_y = 540
+last_present_x = 540   # dernière position avec main présente (départ du ghost)
+last_present_y = 540
+ghost_active = False
+
+
+def _start_ghost(x, y):
+    """Cible pondérée calculée une fois, animation envoyée une fois."""
+    global ghost_active
+    layout = ball_layout.get(ops('balls_positions_table'))
+    if layout is not None:
+        tx, ty = layout.weighted_target(x, y, CONNECT_DISTANCE, MAX_BALLS)
+    else:
+        tx, ty = 540.0, 540.0
+    # à l'arrivée la page appelle retractBridges(x, y) elle-même
+    render_sync.call('animateHeroTo', tx, ty, GHOST_DURATION_MS, GHOST_EASING, 'retractBridges')
+    ghost_active = True
+
+
+def _on_ghost_end(msg):
+    """Animation terminée ou interrompue (message de la page via WebSocket)."""
+    global ghost_active
+    ghost_active = False
+
+
+render_sync.on_event('heroAnimDone', _on_ghost_end)
+render_sync.on_event('heroAnimInterrupted', _on_ghost_end)
+
+
+def _predict(method, x, y):
+    """Position affichée : mesure lissée + avance de la latence de la méthode."""
+    global predict_method
+    if not PREDICT:
+        return x, y
+    if method != predict_method:
+        # autre source : l'historique de l'ancienne ne s'applique pas
+        predictor.reset()
+        predict_method = method
+    predictor.latency = PREDICT_LATENCY_MS.get(method, 0) / 1000.0
+    return predictor.update(absTime.seconds, x, y)
 
 def onValueChange(channel, sampleIndex, val, prev):
     """
     Appelé quand n'importe quel channel du CHOP change de valeur
     """
-    global last_hand_active, last_hero_x, last_hero_y
+    global last_hand_active, last_hero_x, last_hero_y, last_present_x, last_present_y, ghost_active
 
     # Récupérer le CHOP hero_control
-    hero_chop = op('hero_control')
+    hero_chop = ops('hero_control')
     if not hero_chop or hero_chop.numChans < 2:
         return
 
@@ -21,69 +96,78 @@ def onValueChange(channel, sampleIndex, val, prev):
     x = float(hero_chop[0].eval())
     y = float(hero_chop[1].eval())
 
-    # Sauvegarder la dernière position
-    last_hero_x = x
-    last_hero_y = y
-
     # Lire la méthode de détection (0 = bump, 1 = mediapipe)
     method = 0
-    detection_methode = op('detection_methode')
+    detection_methode = ops('detection_methode')
     if detection_methode:
         try:
             method = int(detection_methode['method'][0])
 
             # Debug tracking
-            debug_constant = op('constant_debug_method_tracking')
+            debug_constant = ops('constant_debug_method_tracking')
             if debug_constant:
                 debug_constant.par.value0 = method
         except:
             pass
 
-    # Détection des bords (désactiver connexions)
+    # Détection des bords (désactiver connexions) : sur la mesure brute
     at_edge = (x <= 0 or x >= 1080 or y <= 0 or y >= 1080)
-    js_distance = "CONNECT_DISTANCE = 0;" if at_edge else "CONNECT_DISTANCE = 480;"
+    render_sync.set_connect_distance(0 if at_edge else 480)
 
-    # Récupérer le Web Render TOP
-    web = op('webrender1')
-    if not web:
-        return
+    # L'état est seulement déposé ici ; render_sync_flush l'envoie à
+    # webrender1 en un seul window.applyState() en fin de frame
 
     # === FSM HAND ACTIVE (MediaPipe uniquement) ===
 
     # Mode bump (0) → Toujours envoyer la position
     if method == 0:
-        hand_js = "if(window.setHandActive) window.setHandActive(true);"
-        js = hand_js + js_distance + "if(window.setHeroPosition) window.setHeroPosition({}, {});".format(x, y)
-        web.executeJavaScript(js)
+        last_hero_x, last_hero_y = _predict(method, x, y)
+        render_sync.set_hand_active(True)
+        render_sync.set_hero(last_hero_x, last_hero_y)
         last_hand_active = 0  # Reset FSM
         return
 
     # Mode MediaPipe (1) → FSM hand_active
     hand_active = 0
-    select_mediapipe = op('select_all_mediapipe')
+    select_mediapipe = ops('select_all_mediapipe')
     if select_mediapipe:
         try:
             hand_active = int(select_mediapipe['h1:hand_active'][0])
         except:
             hand_active = 0
 
+    # Main perdue : la prochaine main repart sans historique (pas
+    # d'extrapolation depuis l'ancienne position)
+    if hand_active == 0 and last_hand_active > 0:
+        predictor.reset()
+
     # Main présente (hand_active > 0)
     if hand_active > 0:
         # Si on revient d'une disparition → réafficher le hero
         if last_hand_active == 0:
-            web.executeJavaScript("if(window.showHero) window.showHero();")
+            render_sync.call('showHero')
 
         # Envoyer état main active + position normalement
-        hand_js = "if(window.setHandActive) window.setHandActive(true);"
-        js = hand_js + js_distance + "if(window.setHeroPosition) window.setHeroPosition({}, {});".format(x, y)
-        web.executeJavaScript(js)
+        # (setHeroPosition interrompt une animation ghost en cours)
+        last_hero_x, last_hero_y = _predict(method, x, y)
+        render_sync.set_hand_active(True)
+        render_sync.set_hero(last_hero_x, last_hero_y)
+        last_present_x = x
+        last_present_y = y
+        ghost_active = False
+
+    # Main absente (hand_active == 0), ghost mode
+    elif GHOST_MODE:
+        # Premier appel sans main : une seule commande d'animation ;
+        # ensuite rien à envoyer, la page interpole
+        if last_hand_active > 0 and not ghost_active:
+            _start_ghost(last_present_x, last_present_y)
 
     # Main absente (hand_active == 0)
     else:
-        # Désactiver état main + garder hero à dernière position
-        hand_js = "if(window.setHandActive) window.setHandActive(false);"
-        js = hand_js + js_distance + "if(window.setHeroPosition) window.setHeroPosition({}, {});".format(last_hero_x, last_hero_y)
-        web.executeJavaScript(js)
+        # Désactiver état main + garder hero à dernière position affichée
+        render_sync.set_hand_active(False)
+        render_sync.set_hero(last_hero_x, last_hero_y)
 
     # Mettre à jour l'état
     last_hand_active = hand_active
@@ -124,6 +208,15 @@ def afterCook(channel, sampleIndex, val, prev):
 #    - Main disparaît → window.retractBridges(lastX, lastY) UNE FOIS
 #    - Main réapparaît → window.showHero() + setHeroPosition(x, y)
 # 4. Détection bords: Si x/y = 0 ou 1080, désactive les connexions
-# 5. Contrôle HTML: Envoie position au hero ball via JavaScript
+# 5. GHOST_MODE (optionnel): main perdue → cible pondérée (ball_layout)
+#    calculée une fois, window.animateHeroTo(x, y, durée, easing,
+#    'retractBridges') ; retour heroAnimDone / heroAnimInterrupted
+# 6. Prédiction (PREDICT): position lissée (Kalman à vitesse constante) et
+#    avancée de PREDICT_LATENCY_MS[méthode] (hero_predict.py, latences
+#    provisoires à mesurer) ; bords testés sur la mesure brute ; reset au
+#    changement de méthode / main perdue
+# 7. Contrôle HTML: Dépose position / main / distance dans render_sync ;
+#    render_sync_flush (Execute DAT, Frame End) envoie un seul
+#    window.applyState() par frame avec les champs modifiés
 #
 # =============================================================================
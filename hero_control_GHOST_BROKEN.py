@@ -2,6 +2,8 @@
 # Configuré sur le CHOP 'hero_control'
 # Ghost mode: anime le hero vers les boules quand main disparaît
 
+import ball_layout
+
 def onValueChange(channel, sampleIndex, val, prev):
     """
     Appelé quand n'importe quel channel du CHOP change de valeur
@@ -57,30 +59,28 @@ def onValueChange(channel, sampleIndex, val, prev):
             last_x = parent_exec.fetch('lastHeroX', 540.0)
             last_y = parent_exec.fetch('lastHeroY', 540.0)
 
-            # Lire positions des boules depuis le CSV
-            balls_table = op('balls_positions_table')
-            if balls_table:
+            # Lire positions des boules depuis le cache partagé (parsé une fois)
+            layout = ball_layout.get(op('balls_positions_table'))
+            if layout is not None:
                 total_weight = 0
                 weighted_x = 0
                 weighted_y = 0
                 CONNECT_DISTANCE = 480
 
-                for row in range(1, min(balls_table.numRows, 6)):  # 5 boules
-                    try:
-                        ball_x = float(balls_table[row, 1].val)
-                        ball_y = float(balls_table[row, 2].val)
-
-                        dx = last_x - ball_x
-                        dy = last_y - ball_y
-                        dist = (dx*dx + dy*dy) ** 0.5
-
-                        if dist <= CONNECT_DISTANCE:
-                            weight = 1 - (dist / CONNECT_DISTANCE)
-                            total_weight += weight
-                            weighted_x += ball_x * weight
-                            weighted_y += ball_y * weight
-                    except:
-                        pass
+                for i in range(min(len(layout), 5)):  # 5 boules
+                    if not layout.ok[i]:
+                        continue
+                    ball_x, ball_y = layout.positions[i]
+
+                    dx = last_x - ball_x
+                    dy = last_y - ball_y
+                    dist = (dx*dx + dy*dy) ** 0.5
+
+                    if dist <= CONNECT_DISTANCE:
+                        weight = 1 - (dist / CONNECT_DISTANCE)
+                        total_weight += weight
+                        weighted_x += ball_x * weight
+                        weighted_y += ball_y * weight
 
                 if total_weight > 0:
                     target_x = weighted_x / total_weight
@@ -0,0 +1,191 @@
+# =============================================================================
+# HERO PREDICT - Prédiction du hero pour compenser la latence (Kalman)
+# =============================================================================
+# Module partagé (Text DAT 'hero_predict'), utilisé par hero_control.py
+#
+# La position du hero arrive avec plusieurs frames de retard (exposition du
+# capteur, détection, portes d'âge de la validation, rendu du navigateur).
+# Plutôt que de baisser les seuils de détection, on extrapole :
+#
+#   - Filtre de Kalman à vitesse constante par axe : position lissée sans
+#     retard à vitesse constante + vitesse estimée + variance de la vitesse
+#   - Avance = vitesse x latence (latence mesurée, par méthode de détection)
+#   - Clamp de confiance : avance x v² / (v² + k·var(v)) ; nulle sous
+#     min_speed, bornée à max_lead pixels. Vitesse incertaine (départ,
+#     changement brusque, mesures bruitées) -> peu ou pas d'avance
+#   - Trou dans les mesures (> reset_gap s) : le filtre repart de la
+#     nouvelle position, sans extrapoler
+#
+#   import hero_predict
+#   pred = hero_predict.HeroPredictor(latency=0.06)
+#   x, y = pred.update(absTime.seconds, raw_x, raw_y)
+#   pred.reset()                      # changement de source / main perdue
+#
+# Auto-test hors TouchDesigner : python hero_predict.py
+# =============================================================================
+
+import math
+
+# Modèle
+MEAS_NOISE = 2.0      # bruit de mesure (px, écart-type)
+ACCEL_NOISE = 1e4     # densité du bruit d'accélération ((px/s²)² · s) : plus haut = plus réactif, moins lissé
+
+# Clamp de confiance
+CONFIDENCE_K = 1.0    # poids de la variance de la vitesse face à v²
+MAX_LEAD = 60.0       # avance maximale (px)
+MIN_SPEED = 30.0      # px/s : en dessous, pas d'extrapolation
+RESET_GAP = 0.25      # s sans mesure -> repart sans extrapoler
+
+
+class CvKalman:
+    """Kalman 1D, état (position, vitesse), modèle à vitesse constante."""
+
+    def __init__(self, meas_noise=MEAS_NOISE, accel_noise=ACCEL_NOISE):
+        self.r = float(meas_noise) ** 2
+        self.q = float(accel_noise)
+        self.x = None
+        self.v = 0.0
+        self.p = (0.0, 0.0, 0.0)   # covariance (pxx, pxv, pvv)
+
+    def update(self, z, dt):
+        if self.x is None or dt <= 0:
+            # première mesure : position connue, vitesse inconnue
+            self.x = z
+            self.v = 0.0
+            self.p = (self.r, 0.0, 1e6)
+            return self.x, self.v
+        # prédiction
+        pxx, pxv, pvv = self.p
+        q = self.q
+        x = self.x + self.v * dt
+        pxx = pxx + 2 * dt * pxv + dt * dt * pvv + q * dt ** 3 / 3
+        pxv = pxv + dt * pvv + q * dt * dt / 2
+        pvv = pvv + q * dt
+        # correction
+        s = pxx + self.r
+        kx, kv = pxx / s, pxv / s
+        innov = z - x
+        self.x = x + kx * innov
+        self.v = self.v + kv * innov
+        self.p = ((1 - kx) * pxx, (1 - kx) * pxv, pvv - kv * pxv)
+        return self.x, self.v
+
+
+class HeroPredictor:
+    """
+    Position du hero lissée et avancée de latency secondes.
+
+    Args:
+        latency: latence à compenser (s), 0 = lissage seul
+        meas_noise, accel_noise: modèle du filtre (voir CvKalman)
+        confidence_k, max_lead, min_speed: clamp de confiance (voir en-tête)
+        bounds: (min, max) appliqué à la sortie (pixels)
+    """
+
+    def __init__(self, latency=0.0, meas_noise=MEAS_NOISE, accel_noise=ACCEL_NOISE,
+                 confidence_k=CONFIDENCE_K, max_lead=MAX_LEAD, min_speed=MIN_SPEED,
+                 reset_gap=RESET_GAP, bounds=(0.0, 1080.0)):
+        self.latency = latency
+        self.confidence_k = confidence_k
+        self.max_lead = max_lead
+        self.min_speed = min_speed
+        self.reset_gap = reset_gap
+        self.bounds = bounds
+        self.kx = CvKalman(meas_noise, accel_noise)
+        self.ky = CvKalman(meas_noise, accel_noise)
+        self.confidence = 0.0
+        self.lead = (0.0, 0.0)
+        self._t = None
+        self._saved = None
+
+    def reset(self):
+        self.kx.x = self.ky.x = None
+        self.confidence = 0.0
+        self.lead = (0.0, 0.0)
+        self._t = None
+        self._saved = None
+
+    def _state(self):
+        return ((self.kx.x, self.kx.v, self.kx.p), (self.ky.x, self.ky.v, self.ky.p), self._t)
+
+    def update(self, t, x, y):
+        """Mesure brute (x, y) au temps t (s) -> position affichée (x, y)."""
+        if self._t is not None and t == self._t and self._saved is not None:
+            # deuxième channel modifié dans le même frame : on remplace la
+            # mesure du frame au lieu d'en ajouter une (dt = 0)
+            (self.kx.x, self.kx.v, self.kx.p), (self.ky.x, self.ky.v, self.ky.p), self._t = self._saved
+        if self._t is not None and t - self._t > self.reset_gap:
+            self.reset()
+        self._saved = self._state()
+        dt = t - self._t if self._t is not None else 0.0
+        self._t = t
+
+        sx, vx = self.kx.update(x, dt)
+        sy, vy = self.ky.update(y, dt)
+
+        speed2 = vx * vx + vy * vy
+        if self.latency <= 0 or speed2 < self.min_speed ** 2:
+            self.confidence = 0.0
+        else:
+            var = self.kx.p[2] + self.ky.p[2]
+            self.confidence = speed2 / (speed2 + self.confidence_k * var)
+        lx = vx * self.latency * self.confidence
+        ly = vy * self.latency * self.confidence
+        lead = math.hypot(lx, ly)
+        if lead > self.max_lead:
+            lx *= self.max_lead / lead
+            ly *= self.max_lead / lead
+        self.lead = (lx, ly)
+
+        lo, hi = self.bounds
+        return min(hi, max(lo, sx + lx)), min(hi, max(lo, sy + ly))
+
+
+# =============================================================================
+# AUTO-TEST (hors TouchDesigner)
+# =============================================================================
+
+def _selfcheck(fps=60.0, latency=0.08, seconds=20.0):
+    """Erreur face à la position réelle : mesure retardée brute vs prédite."""
+    import random
+
+    def rms(v):
+        return math.sqrt(sum(e * e for e in v) / len(v))
+
+    ok = True
+    delay = int(round(latency * fps))
+    for noise in (0.5, 2.0, 8.0):
+        rng = random.Random(3)
+        pred = HeroPredictor(latency=latency)
+        true = []
+        err_raw, err_pred, still_raw, still_pred = [], [], [], []
+        for k in range(int(seconds * fps)):
+            t = k / fps
+            # alternance : mouvement circulaire (4 s, 240 px/s), arrêt net (1 s)
+            phase = t % 5.0
+            ang = 0.8 * (4.0 * int(t // 5.0) + min(phase, 4.0))
+            true.append((540 + 300 * math.cos(ang), 540 + 300 * math.sin(ang)))
+            if k < delay:
+                continue
+            rx, ry = true[k - delay]
+            rx += rng.gauss(0, noise)
+            ry += rng.gauss(0, noise)
+            px, py = pred.update(t, rx, ry)
+            pred.update(t, rx, ry)   # deuxième appel dans le même frame : sans effet
+            tx, ty = true[k]
+            if 0.5 < phase < 4.0:
+                err_raw.append(math.hypot(rx - tx, ry - ty))
+                err_pred.append(math.hypot(px - tx, py - ty))
+            elif phase > 4.5:
+                # arrêt établi : le bruit ne doit pas être amplifié par l'extrapolation
+                still_raw.append(math.hypot(rx - tx, ry - ty))
+                still_pred.append(math.hypot(px - tx, py - ty))
+        print('noise %4.1f px  moving: raw %6.2f -> predicted %6.2f px   still: raw %5.2f -> %5.2f px'
+              % (noise, rms(err_raw), rms(err_pred), rms(still_raw), rms(still_pred)))
+        ok &= rms(err_pred) < rms(err_raw) and rms(still_pred) <= rms(still_raw)
+    print('OK' if ok else 'FAIL')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(_selfcheck())
@@ -0,0 +1,180 @@
+# =============================================================================
+# LAYOUT STORE - Positions des boules versionnées, diff contre l'accusé du renderer
+# =============================================================================
+# Module partagé (Text DAT 'layout_store'), utilisé par render_sync.py.
+#
+# balls_position_updater renvoyait toute la liste à chaque pulse. Ici :
+#   - positions dans un array NumPy (N, 2), avec une version qui ne fait
+#     qu'augmenter (+1 par modification effective, rien si identique)
+#   - version de la dernière modification gardée par boule
+#   - le renderer confirme la version reçue ({event: 'layoutAck', version}
+#     via window.sendToTD) ; le diff se fait contre cette version CONFIRMÉE,
+#     pas contre le dernier envoi : une frame perdue (client déconnecté,
+#     page rechargée) est renvoyée
+#   - envoi : les boules modifiées depuis le dernier envoi ; sans accusé
+#     après RESEND_AFTER secondes, toutes celles modifiées depuis l'accusé
+#   - set() donne la disposition complète : les boules au-delà de la
+#     nouvelle liste sont retirées (nouvelle version), snapshot() et
+#     metaball_top ne dessinent plus de boule disparue
+#
+#   import layout_store
+#   store = layout_store.LayoutStore()
+#   store.set([[x, y], ...])           # ou store.set_ball(i, x, y)
+#   idx = store.pending(now)           # index à envoyer
+#   store.mark_sent(now)               # après l'envoi de idx
+#   store.ack(version)                 # accusé du renderer
+#   store.reset()                      # nouveau renderer : tout renvoyer
+#
+# Auto-test hors TouchDesigner : python layout_store.py
+# =============================================================================
+
+import numpy as np
+
+DECIMALS = 2          # arrondi des positions (pixels) : pas de renvoi de bruit flottant
+RESEND_AFTER = 0.5    # s sans accusé -> renvoi des boules non confirmées
+
+
+class LayoutStore:
+    """
+    Args:
+        resend_after: secondes d'attente d'un accusé avant renvoi
+        decimals: arrondi des positions
+    """
+
+    def __init__(self, resend_after=RESEND_AFTER, decimals=DECIMALS):
+        self.resend_after = resend_after
+        self.decimals = decimals
+        self.positions = np.zeros((0, 2))
+        self.changed = np.zeros(0, dtype=np.int64)   # version de la dernière modification, par boule
+        self.version = 0      # version courante
+        self.sent = 0         # dernière version envoyée
+        self.acked = 0        # dernière version confirmée par le renderer
+        self.sent_time = None
+        self.stats = {'versions': 0, 'resends': 0, 'acks': 0, 'removed': 0}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _grow(self, n):
+        if n > len(self.positions):
+            extra = n - len(self.positions)
+            self.positions = np.vstack([self.positions, np.full((extra, 2), np.nan)])
+            self.changed = np.concatenate([self.changed, np.zeros(extra, dtype=np.int64)])
+
+    def set(self, positions):
+        """
+        Disposition complète : boules 0..n-1, celles d'index >= n sont retirées.
+        Nombre de boules modifiées ou retirées (0 = pas de nouvelle version).
+        """
+        pos = np.round(np.asarray(positions, dtype=np.float64).reshape(-1, 2), self.decimals)
+        n = len(pos)
+        removed = max(0, len(self.positions) - n)
+        if removed:
+            self.positions = self.positions[:n].copy()
+            self.changed = self.changed[:n].copy()
+            self.stats['removed'] += removed
+        self._grow(n)
+        diff = np.any(self.positions[:n] != pos, axis=1)   # NaN (nouvelle boule) != tout
+        count = int(diff.sum())
+        if count or removed:
+            self.version += 1
+            self.stats['versions'] += 1
+            self.positions[:n][diff] = pos[diff]
+            self.changed[:n][diff] = self.version
+        return count + removed
+
+    def set_ball(self, index, x, y):
+        """Position d'une seule boule ; True si elle a changé."""
+        self._grow(index + 1)
+        p = np.round([float(x), float(y)], self.decimals)
+        if np.array_equal(self.positions[index], p):
+            return False
+        self.version += 1
+        self.stats['versions'] += 1
+        self.positions[index] = p
+        self.changed[index] = self.version
+        return True
+
+    def unacked(self):
+        """True si une version envoyée attend encore son accusé."""
+        return self.acked < self.sent
+
+    def pending(self, now):
+        """Index des boules à envoyer maintenant (array, vide si rien). Ne modifie pas l'état."""
+        since = self.sent
+        if self.unacked() and (self.sent_time is None or now - self.sent_time >= self.resend_after):
+            since = self.acked
+        return np.flatnonzero(self.changed > since)
+
+    def mark_sent(self, now):
+        """Le résultat de pending() est parti : la version courante attend son accusé."""
+        if self.pending(now).size and self.sent == self.version:
+            self.stats['resends'] += 1
+        self.sent = self.version
+        self.sent_time = now
+
+    def ack(self, version):
+        """Accusé du renderer (version reçue) ; ignoré s'il est plus ancien ou jamais envoyé."""
+        try:
+            version = int(version)
+        except (TypeError, ValueError):
+            return False
+        if version <= self.acked or version > self.sent:
+            return False
+        self.acked = version
+        self.stats['acks'] += 1
+        return True
+
+    def reset(self):
+        """Nouveau renderer / page rechargée : toutes les boules connues repartent."""
+        self.sent = self.acked = 0
+        self.sent_time = None
+
+
+# =============================================================================
+# AUTO-TEST (hors TouchDesigner)
+# =============================================================================
+
+def _selfcheck():
+    ok = True
+
+    def check(name, cond):
+        print('%-48s %s' % (name, 'OK' if cond else 'FAIL'))
+        return bool(cond)
+
+    s = LayoutStore(resend_after=0.5)
+    layout = [[540, 135], [925, 415], [778, 868], [302, 868], [155, 415]]
+    ok &= check('first set: 5 changed, version 1', s.set(layout) == 5 and s.version == 1)
+    ok &= check('same positions: no new version', s.set(layout) == 0 and s.version == 1)
+    ok &= check('all pending before the first send', list(s.pending(0.0)) == [0, 1, 2, 3, 4])
+    s.mark_sent(0.0)
+    ok &= check('nothing pending right after the send', s.pending(0.1).size == 0)
+
+    layout[2] = [780, 860]
+    s.set(layout)
+    ok &= check('one moved ball -> only that index', list(s.pending(0.2)) == [2])
+    s.mark_sent(0.2)
+    # aucun accusé : au bout de resend_after, tout ce qui n'est pas confirmé repart
+    ok &= check('no ack: resend after the timeout', s.pending(0.6).size == 0
+                and list(s.pending(0.75)) == [0, 1, 2, 3, 4])
+    ok &= check('ack of an unsent version ignored', not s.ack(99) and s.acked == 0)
+    ok &= check('ack of the sent version', s.ack(2) and s.acked == 2 and not s.unacked())
+    ok &= check('acked: nothing to resend', s.pending(5.0).size == 0)
+
+    # accusé partiel : version 3 confirmée, 4 perdue -> seule la boule 4 repart
+    s.set_ball(1, 0, 0)
+    s.mark_sent(6.0)
+    s.set_ball(4, 1, 1)
+    s.mark_sent(6.1)
+    s.ack(3)
+    ok &= check('partial ack: only the unacked ball resent', list(s.pending(7.0)) == [4])
+    s.reset()
+    ok &= check('reset: every ball pending again', list(s.pending(7.0)) == [0, 1, 2, 3, 4])
+    ok &= check('set_ball grows the layout', s.set_ball(7, 3, 3) and len(s) == 8
+                and np.isnan(s.positions[5]).all() and list(s.pending(7.0)) == [0, 1, 2, 3, 4, 7])
+    print('OK' if ok else 'FAIL')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(_selfcheck())
@@ -0,0 +1,347 @@
+# =============================================================================
+# METABALL FIELD - Rendu metaball par champ implicite (NumPy)
+# =============================================================================
+# Module partagé (Text DAT 'metaball_field'), utilisé par metaball_top.py
+# (Script TOP) ; exécutable seul pour les benchmarks / rendus hors ligne.
+#
+# Alternative à metaball.html : au lieu de construire des ponts de Bézier
+# paire par paire (metaballBridge / createDroplet), on évalue un champ
+# scalaire (somme de noyaux) sur une grille sous-échantillonnée, puis on
+# seuille (bord anti-aliasé) et on agrandit.
+#
+#   - Noyau de Blinn : f = exp(b * (1 - d² / r²)), iso-surface f = 1 à d = r
+#     pour une boule seule ; deux boules fusionnent en dessous de ~2.2 r (b = 3)
+#   - Séparable : exp(-b dx²/r²) * exp(-b dy²/r²) -> le champ de TOUS les
+#     noyaux est un seul produit matriciel (H x K) @ (K x W), K = nombre de
+#     noyaux : le coût croît linéairement avec le nombre de boules
+#   - Bridge hero <-> boule (distance <= CONNECT_DISTANCE) : chaîne de petits
+#     noyaux le long du segment, largeur qui diminue avec la distance et
+#     pincée au milieu (même produit matriciel)
+#   - Animation comme onFrame de la page : progression des bridges
+#     (GROWTH_SPEED_CONNECT / RETRACT) et rayon des boules (BALL_SIZE_SPEED)
+#
+#   import metaball_field
+#   field = metaball_field.MetaballField(1080, 1080)
+#   cover = field.frame(hero=(540, 540), balls=[[540, 135], ...], hand=True)
+#   img = metaball_field.to_rgba(cover)        # (H, W, 4) float32, pour copyNumpyArray
+#
+# Hors TouchDesigner :
+#   python metaball_field.py                       # auto-test
+#   python metaball_field.py --bench               # ms/frame selon le nombre de boules
+#   python metaball_field.py --render out.pgm      # une image de la disposition par défaut
+# =============================================================================
+
+import numpy as np
+
+# Mêmes valeurs que metaball.html
+CONNECT_DISTANCE = 480
+BALL_RADIUS_MIN = 38
+BALL_RADIUS_MAX = 74
+HERO_RADIUS = 54
+GROWTH_SPEED_CONNECT = 0.12   # par frame à 60 fps
+GROWTH_SPEED_RETRACT = 0.04
+BALL_SIZE_SPEED = 0.08
+DEFAULT_BALLS = [[540, 135], [925, 415], [778, 868], [302, 868], [155, 415]]
+
+# Champ
+DOWNSAMPLE = 4        # 1 échantillon du champ pour DOWNSAMPLE x DOWNSAMPLE pixels
+BLOBBINESS = 3.0      # b : plus grand = fusion plus tardive, formes plus rondes
+EDGE = 1.0            # largeur du bord anti-aliasé (pixels de sortie)
+
+# Bridges
+NECK_MIN = 0.12       # largeur du bridge à CONNECT_DISTANCE (x rayon le plus petit)
+NECK_MAX = 0.55       # largeur du bridge au contact
+PINCH = 0.35          # rétrécissement au milieu du bridge (0 = cylindre)
+FLARE = 0.6           # évasement vers chaque extrémité (x rayon de la boule / du hero)
+NECK_SPACING = 1.0    # espacement des noyaux de la chaîne (x largeur locale ; ondulation ~2 %)
+
+# Couleurs (comme la page : formes noires sur fond blanc), RGBA 0-1
+FG = (0.0, 0.0, 0.0, 1.0)
+BG = (1.0, 1.0, 1.0, 1.0)
+
+
+def _chain_gain(b, spacing):
+    """Somme des noyaux d'une chaîne infinie sur son axe (spacing : espacement / largeur)."""
+    k = np.arange(-64, 65)
+    spacing = np.asarray(spacing, dtype=np.float64)
+    return np.exp(-b * (k * spacing[..., None]) ** 2).sum(axis=-1)
+
+
+class MetaballField:
+    """
+    Champ implicite hero + boules + bridges, avec l'état d'animation de la page.
+
+    Args:
+        width, height: taille de sortie (pixels)
+        downsample: facteur de sous-échantillonnage du champ
+        blobbiness: b du noyau de Blinn
+        connect_distance: distance maximale de bridge
+        scale: facteur sur les rayons (boules, hero) et la distance de bridge,
+            pour des dispositions plus denses que la page
+    """
+
+    def __init__(self, width=1080, height=1080, downsample=DOWNSAMPLE,
+                 blobbiness=BLOBBINESS, connect_distance=CONNECT_DISTANCE, scale=1.0):
+        self.width = int(width)
+        self.height = int(height)
+        self.downsample = int(downsample)
+        self.b = float(blobbiness)
+        self.scale = float(scale)
+        self.connect_distance = float(connect_distance) * self.scale
+        self.r_min = BALL_RADIUS_MIN * self.scale
+        self.r_max = BALL_RADIUS_MAX * self.scale
+        self.r_hero = HERO_RADIUS * self.scale
+        # centres des échantillons du champ (pixels de sortie)
+        self.xs = ((np.arange(-(-self.width // self.downsample)) + 0.5) * self.downsample).astype(np.float32)
+        self.ys = ((np.arange(-(-self.height // self.downsample)) + 0.5) * self.downsample).astype(np.float32)
+        self._up = None
+        # état d'animation, une entrée par boule
+        self.progress = np.zeros(0)
+        self.radius = np.zeros(0)
+
+    # --- Animation (équivalent de onFrame dans metaball.html) ---
+    def step(self, hero, balls, hand=True, connect_distance=None, dt=1.0 / 60):
+        """Avance la progression des bridges et le rayon des boules d'un frame."""
+        balls = np.asarray(balls, dtype=np.float64).reshape(-1, 2)
+        if connect_distance is not None:
+            self.connect_distance = float(connect_distance) * self.scale
+        n = len(balls)
+        if len(self.progress) != n:
+            self.progress = np.zeros(n)
+            self.radius = np.full(n, self.r_min)
+        dist = np.hypot(balls[:, 0] - hero[0], balls[:, 1] - hero[1])
+        connect = max(self.connect_distance, 1e-6)
+        linked = (dist <= self.connect_distance) & bool(hand)
+        ratio = np.minimum(dist / connect, 1.0)
+        target_r = np.where(linked, self.r_max - ratio * (self.r_max - self.r_min), self.r_min)
+        # vitesses « par frame à 60 fps » ramenées à dt
+        frames = dt * 60.0
+        grow = 1.0 - (1.0 - GROWTH_SPEED_CONNECT) ** frames
+        shrink = 1.0 - (1.0 - GROWTH_SPEED_RETRACT) ** frames
+        size = 1.0 - (1.0 - BALL_SIZE_SPEED) ** frames
+        target = linked.astype(np.float64)
+        self.progress += (target - self.progress) * np.where(linked, grow, shrink)
+        self.radius += (target_r - self.radius) * size
+
+    # --- Noyaux ---
+    def kernels(self, hero, balls, hero_visible=True):
+        """Centres (K,), (K,), rayons (K,), gains (K,) : boules, hero et chaînes des bridges."""
+        balls = np.asarray(balls, dtype=np.float64).reshape(-1, 2)
+        n = len(balls)
+        radius = self.radius if len(self.radius) == n else np.full(n, self.r_min)
+        progress = self.progress if len(self.progress) == n else np.zeros(n)
+        cx = [balls[:, 0]]
+        cy = [balls[:, 1]]
+        r = [radius]
+        g = [np.ones(n)]
+        if hero_visible:
+            cx.append([hero[0]])
+            cy.append([hero[1]])
+            r.append([self.r_hero])
+            g.append([1.0])
+
+        # Bridges : seulement les boules dont la progression est visible
+        idx = np.flatnonzero(progress > 0.01)
+        if len(idx):
+            bx, by = balls[idx, 0], balls[idx, 1]
+            dx, dy = hero[0] - bx, hero[1] - by
+            length = np.hypot(dx, dy)
+            close = 1.0 - np.minimum(length / max(self.connect_distance, 1e-6), 1.0)
+            w0 = np.minimum(radius[idx], self.r_hero) * (NECK_MIN + (NECK_MAX - NECK_MIN) * close)
+            t = progress[idx]
+            # la chaîne part de la boule vers le hero, sur t x la longueur,
+            # noyaux espacés de NECK_SPACING x la largeur au point le plus pincé ;
+            # pas plus fin qu'une maille du champ (invisible, et coûteux)
+            w0 = np.maximum(w0 * np.sqrt(t), self.downsample / (1.0 - PINCH))
+            reach = length * t
+            count = np.ceil(reach / (w0 * (1.0 - PINCH) * NECK_SPACING)).astype(np.int64) + 1
+            count = np.maximum(count, 2)
+            owner = np.repeat(np.arange(len(idx)), count)
+            start = np.repeat(np.cumsum(count) - count, count)
+            u = (np.arange(owner.size) - start) / (count[owner] - 1) * t[owner]
+            width = w0[owner] * (1.0 - PINCH * 4.0 * u * (1.0 - u))
+            # raccord concave avec la boule et le hero (les poignées de Bézier de la page)
+            width += FLARE * (radius[idx][owner] * (1.0 - u) ** 6 + self.r_hero * u ** 6)
+            cx.append(bx[owner] + dx[owner] * u)
+            cy.append(by[owner] + dy[owner] * u)
+            r.append(width)
+            # gain de chaîne selon l'espacement local : largeur du bridge ~ width
+            step = (reach / (count - 1))[owner]
+            g.append(1.0 / _chain_gain(self.b, np.clip(step / width, 0.05, 3.0)))
+        return (np.concatenate(cx), np.concatenate(cy),
+                np.concatenate(r).astype(np.float64), np.concatenate(g))
+
+    def field(self, hero, balls, hero_visible=True):
+        """Champ (h, w) sous-échantillonné ; iso-surface à 1."""
+        cx, cy, r, g = self.kernels(hero, balls, hero_visible)
+        if not len(cx):
+            return np.zeros((len(self.ys), len(self.xs)), dtype=np.float32)
+        inv = (self.b / (r * r)).astype(np.float32)[:, None]
+        # f = e^b * g * exp(-b dx²/r²) * exp(-b dy²/r²)
+        gx = np.exp(-inv * (self.xs[None, :] - cx.astype(np.float32)[:, None]) ** 2)
+        gy = np.exp(-inv * (self.ys[None, :] - cy.astype(np.float32)[:, None]) ** 2)
+        gy *= (np.exp(self.b) * g).astype(np.float32)[:, None]
+        return gy.T @ gx
+
+    def _upsampler(self):
+        """Index / poids de l'interpolation bilinéaire champ -> sortie (calculés une fois)."""
+        if self._up is None:
+            def axis(n_out, n_in):
+                pos = (np.arange(n_out) + 0.5) / self.downsample - 0.5
+                i0 = np.clip(np.floor(pos).astype(np.int64), 0, n_in - 1)
+                i1 = np.minimum(i0 + 1, n_in - 1)
+                w = np.clip(pos - i0, 0.0, 1.0).astype(np.float32)
+                return i0, i1, w
+            self._up = (axis(self.width, len(self.xs)), axis(self.height, len(self.ys)))
+        return self._up
+
+    def coverage(self, f, upscale=True):
+        """Champ -> couverture 0-1 (bord anti-aliasé) ; upscale=False : à la résolution du champ."""
+        if upscale and self.downsample > 1:
+            (x0, x1, wx), (y0, y1, wy) = self._upsampler()
+            f = f[:, x0] * (1.0 - wx) + f[:, x1] * wx
+            f = f[y0] * (1.0 - wy)[:, None] + f[y1] * wy[:, None]
+            edge = EDGE
+        else:
+            edge = EDGE / self.downsample
+        # ln f = b (1 - d²/r²) : pente ~ 2b/r par pixel au bord, en ln pour un
+        # bord de largeur voisine quel que soit le gain
+        with np.errstate(divide='ignore'):
+            lf = np.log(np.maximum(f, 1e-30))
+        return np.clip(lf / (edge * 2.0 * self.b / self.r_hero) + 0.5, 0.0, 1.0).astype(np.float32)
+
+    def frame(self, hero, balls, hand=True, connect_distance=None, dt=1.0 / 60,
+              hero_visible=True, upscale=True):
+        """step() + champ + couverture : une image (H, W) 0-1 par appel."""
+        self.step(hero, balls, hand, connect_distance, dt)
+        return self.coverage(self.field(hero, balls, hero_visible), upscale)
+
+
+def to_rgba(cover, fg=FG, bg=BG, flip=True):
+    """
+    Couverture (H, W) -> image (H, W, 4) float32.
+    flip=True : première ligne en bas (convention des TOPs / copyNumpyArray).
+    """
+    if flip:
+        cover = cover[::-1]
+    fg = np.asarray(fg, dtype=np.float32)
+    bg = np.asarray(bg, dtype=np.float32)
+    return bg + cover[..., None] * (fg - bg)
+
+
+def write_pgm(path, cover):
+    """Image en niveaux de gris (formes noires sur blanc), sans dépendance."""
+    gray = np.round((1.0 - cover) * 255).astype(np.uint8)
+    with open(path, 'wb') as f:
+        f.write(b'P5\n%d %d\n255\n' % (gray.shape[1], gray.shape[0]))
+        f.write(gray.tobytes())
+
+
+# =============================================================================
+# HORS TOUCHDESIGNER : benchmark / rendu
+# =============================================================================
+
+def _layout(n, size, rng):
+    """n boules : la disposition de la page pour n = 5, sinon une grille bruitée."""
+    if n == len(DEFAULT_BALLS):
+        return np.asarray(DEFAULT_BALLS, dtype=np.float64)
+    side = int(np.ceil(np.sqrt(n)))
+    g = (np.arange(side) + 0.5) * size / side
+    pts = np.stack(np.meshgrid(g, g), axis=-1).reshape(-1, 2)[:n]
+    return pts + rng.normal(0, size / side * 0.1, pts.shape)
+
+
+def bench(counts=(5, 100, 1000, 5000), frames=60, size=1080, downsample=DOWNSAMPLE, upscale=True):
+    """ms/frame selon le nombre de boules ; hero en cercle, rayons à l'échelle de la densité."""
+    import time
+    rng = np.random.default_rng(0)
+    rows = []
+    for n in counts:
+        balls = _layout(n, size, rng)
+        # la page espace ~5 boules sur 1080 px : on garde ce rapport rayon / espacement
+        scale = min(1.0, np.sqrt(len(DEFAULT_BALLS) / float(n)))
+        field = MetaballField(size, size, downsample, scale=scale)
+        kernels = 0
+        t0 = time.perf_counter()
+        for k in range(frames):
+            ang = k / float(frames) * 2 * np.pi
+            hero = (size / 2 + size / 4 * np.cos(ang), size / 2 + size / 4 * np.sin(ang))
+            field.step(hero, balls)
+            cx = field.kernels(hero, balls)[0]
+            cover = field.coverage(field.field(hero, balls), upscale)
+            kernels += len(cx)
+        ms = (time.perf_counter() - t0) / frames * 1e3
+        rows.append((n, kernels // frames, ms))
+        print('balls %5d  kernels %6d  %7.2f ms/frame  (%dx%d, downsample %d, upscale %s)'
+              % (n, kernels // frames, ms, cover.shape[1], cover.shape[0], downsample, upscale))
+    return rows
+
+
+def _selfcheck():
+    """Rayon d'une boule seule, fusion, bridge (apparition / rétractation), orientation TD."""
+    ok = True
+
+    def check(name, cond):
+        print('%-44s %s' % (name, 'OK' if cond else 'FAIL'))
+        return bool(cond)
+
+    field = MetaballField(400, 400, 4)
+    far = (-1e4, -1e4)
+    # boule seule de rayon r_min en (200, 200) : bord à r_min ± 1 px
+    cover = field.frame(far, [[200, 200]], hand=False, hero_visible=False)
+    row = cover[200, 200:]
+    edge = int(np.argmax(row < 0.5))
+    ok &= check('single ball radius %d px (expected %d)' % (edge, BALL_RADIUS_MIN),
+                abs(edge - BALL_RADIUS_MIN) <= 2)
+    # deux boules éloignées restent séparées, proches fusionnent
+    apart = field.frame(far, [[100, 200], [300, 200]], hand=False, hero_visible=False)
+    close = field.frame(far, [[160, 200], [240, 200]], hand=False, hero_visible=False)
+    ok &= check('balls 200 px apart stay separate', apart[200, 200] < 0.5)
+    ok &= check('balls 80 px apart merge', close[200, 200] > 0.5)
+
+    # bridge : apparaît en connect, se rétracte main perdue
+    field = MetaballField(1080, 1080, 4)
+    hero, balls = (540, 540), [[540, 200], [540, 1040]]   # 340 px (connecté), 500 px (non)
+    for _ in range(90):
+        cover = field.frame(hero, balls)
+    ok &= check('bridge drawn within CONNECT_DISTANCE', cover[370, 540] > 0.5)
+    ok &= check('no bridge beyond CONNECT_DISTANCE', cover[790, 540] < 0.5)
+    for _ in range(240):
+        cover = field.frame(hero, balls, hand=False, hero_visible=False)
+    ok &= check('bridge retracted when the hand is lost', cover[370, 540] < 0.5)
+
+    # orientation : première ligne de l'image TD = bas de l'écran
+    img = to_rgba(field.frame(hero, [[540, 100]], hand=False, hero_visible=False))
+    ok &= check('to_rgba flips for TD (float32 RGBA)', img.dtype == np.float32 and img.shape[2] == 4
+                and img[1080 - 100, 540, 0] < 0.5 and img[100, 540, 0] > 0.5)
+    print('OK' if ok else 'FAIL')
+    return 0 if ok else 1
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description='NumPy implicit-field metaball renderer (headless).')
+    ap.add_argument('--bench', action='store_true', help='ms/frame for several ball counts')
+    ap.add_argument('--check', action='store_true', help='self-check (default without arguments)')
+    ap.add_argument('--render', help='write one frame of the default layout to this .pgm file')
+    ap.add_argument('--hero', type=float, nargs=2, default=(640.0, 420.0), help='hero position (px)')
+    ap.add_argument('--size', type=int, default=1080)
+    ap.add_argument('--downsample', type=int, default=DOWNSAMPLE)
+    ap.add_argument('--no-upscale', action='store_true', help='stay at the field resolution')
+    args = ap.parse_args(argv)
+    if args.render:
+        field = MetaballField(args.size, args.size, args.downsample)
+        for _ in range(90):   # bridges et rayons à l'équilibre
+            field.step(args.hero, DEFAULT_BALLS)
+        cover = field.coverage(field.field(args.hero, DEFAULT_BALLS), not args.no_upscale)
+        write_pgm(args.render, cover)
+        print('wrote %s (%dx%d)' % (args.render, cover.shape[1], cover.shape[0]))
+    if args.bench:
+        bench(size=args.size, downsample=args.downsample, upscale=not args.no_upscale)
+    if args.check or not (args.bench or args.render):
+        return _selfcheck()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
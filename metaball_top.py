@@ -0,0 +1,48 @@
+# =============================================================================
+# METABALL TOP - Rendu metaball NumPy dans un Script TOP
+# =============================================================================
+# À copier dans le DAT de callbacks d'un Script TOP nommé 'metaball_top'
+# (Common : Always Cook = On, pour avancer l'animation à chaque frame).
+#
+# Alternative au Web Render TOP (metaball.html) : lit l'état déposé par
+# hero_control.py / balls_position_updater.py dans render_sync (snapshot) et
+# rend le champ implicite de metaball_field.py.
+#
+#   - UPSCALE = False : image à la résolution du champ (WIDTH / DOWNSAMPLE),
+#     à agrandir par un Resolution TOP (GPU, moins cher que NumPy)
+#   - Formes noires sur fond blanc, comme la page
+# =============================================================================
+
+import metaball_field
+import render_sync
+
+# --- CONFIG ---
+WIDTH = 1080
+HEIGHT = 1080
+DOWNSAMPLE = metaball_field.DOWNSAMPLE
+UPSCALE = False
+
+field = metaball_field.MetaballField(WIDTH, HEIGHT, DOWNSAMPLE)
+
+
+def setupParameters(scriptOp):
+    return
+
+
+def onPulse(par):
+    return
+
+
+def cook(scriptOp):
+    state = render_sync.snapshot()
+    hero = state['hero']
+    if hero is None or not state['balls']:
+        # rien de déposé encore : fond seul
+        cover = field.coverage(field.field((-1e4, -1e4), [], hero_visible=False), UPSCALE)
+    else:
+        cover = field.frame(hero, state['balls'], hand=state['hand'],
+                            connect_distance=state['connect'],
+                            dt=1.0 / max(project.cookRate, 1),
+                            hero_visible=state['hand'], upscale=UPSCALE)
+    scriptOp.copyNumpyArray(metaball_field.to_rgba(cover))
+    return
@@ -0,0 +1,154 @@
+# =============================================================================
+# MIDI OUTPUT - Étage de sortie MIDI (hystérésis + regroupement par frame)
+# =============================================================================
+# Module partagé (Text DAT 'midi_output'), utilisé par bridge_midi_controller.py
+#
+# Problème : une boule dont la position tremble sur une frontière de note
+# envoie un note-off/note-on à chaque frame.
+#
+#   - Hystérésis : un changement de note n'est accepté que si la position
+#     reste dans la nouvelle note à +/- band pixels (note_mapper)
+#   - Durée minimale : une note est tenue au moins min_note_frames frames
+#     avant d'être changée ou relâchée
+#   - Regroupement : tous les événements d'un frame sont envoyés en UN seul
+#     flush par device MIDI (send_batch(device, [(note, velocity), ...]))
+#   - Compteurs : événements émis / supprimés ; un envoi différé (note
+#     tenue, hors bande) compte une fois, au moment où il est différé, pas
+#     à chaque frame où il reste en attente
+#
+#   import midi_output
+#   out = midi_output.MidiOutput(send_batch, min_note_frames=6)
+#   notes, stable = midi_output.hysteresis_notes(mapper, xs, ys, band=12)
+#   out.update(frame, ball_ids, notes, stable)
+# =============================================================================
+
+import numpy as np
+
+DEFAULT_VELOCITY = 80
+
+
+def hysteresis_notes(mapper, xs, ys, band):
+    """
+    Notes au centre + masque de stabilité.
+
+    stable[i] est True si les positions à +/- band (X et Y) donnent la
+    même note que le centre : la boule est franchement dans sa note.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    notes = mapper.map(xs, ys)
+    if band <= 0 or len(notes) == 0:
+        return notes, np.ones(len(notes), dtype=bool)
+    stable = ((mapper.map(xs - band, ys) == notes) & (mapper.map(xs + band, ys) == notes)
+              & (mapper.map(xs, ys - band) == notes) & (mapper.map(xs, ys + band) == notes))
+    return notes, stable
+
+
+class MidiOutput:
+    """
+    État des notes par boule + file d'événements du frame.
+
+    Args:
+        send_batch: fonction(device, events) - events = [(note, velocity), ...]
+        min_note_frames: durée minimale d'une note (frames)
+        velocity: vélocité des note-on
+        device_of: fonction(ball_id) -> device (par défaut : ball_id)
+    """
+
+    def __init__(self, send_batch, min_note_frames=0, velocity=DEFAULT_VELOCITY, device_of=None):
+        self.send_batch = send_batch
+        self.min_note_frames = min_note_frames
+        self.velocity = velocity
+        self.device_of = device_of or (lambda ball_id: ball_id)
+        self.notes = {}        # {ball_id: note} notes en cours
+        self.since = {}        # {ball_id: frame du dernier note-on}
+        self.stats = {'emitted': 0, 'suppressed': 0, 'flushes': 0}
+        self._queue = {}       # {device: [(note, velocity), ...]}
+        self._deferred = {}    # {ball_id: note demandée ou None (note-off)} déjà comptés
+
+    def _held(self, ball_id, frame):
+        return frame - self.since.get(ball_id, frame) < self.min_note_frames
+
+    def _defer(self, ball_id, wanted, events):
+        """Compte un envoi différé la première fois seulement (même demande ensuite = attente)."""
+        if ball_id in self._deferred and self._deferred[ball_id] == wanted:
+            return
+        self._deferred[ball_id] = wanted
+        self.stats['suppressed'] += events
+
+    def _queue_event(self, ball_id, note, velocity):
+        events = self._queue.setdefault(self.device_of(ball_id), [])
+        event = (int(note), int(velocity))
+        if event in events:
+            # doublon dans le même frame
+            self.stats['suppressed'] += 1
+            return
+        events.append(event)
+
+    def update(self, frame, ball_ids, notes, stable=None):
+        """
+        Un appel par frame avec les boules qui ont un bridge actif.
+
+        Args:
+            frame: numéro de frame
+            ball_ids: ids des boules actives
+            notes: note demandée pour chaque boule
+            stable: masque d'hystérésis (voir hysteresis_notes), None = toujours stable
+        """
+        active = set()
+        for k, (ball_id, note) in enumerate(zip(ball_ids, notes)):
+            ball_id = int(ball_id)
+            note = int(note)
+            active.add(ball_id)
+            old = self.notes.get(ball_id)
+
+            if old is None or old == note:
+                self._deferred.pop(ball_id, None)
+            if old is None:
+                # Nouvelle note
+                self._queue_event(ball_id, note, self.velocity)
+                self.notes[ball_id] = note
+                self.since[ball_id] = frame
+            elif old != note:
+                # Changement : seulement hors de la bande et après la durée minimale
+                if (stable is not None and not stable[k]) or self._held(ball_id, frame):
+                    self._defer(ball_id, note, 2)
+                    continue
+                self._deferred.pop(ball_id, None)
+                self._queue_event(ball_id, old, 0)
+                self._queue_event(ball_id, note, self.velocity)
+                self.notes[ball_id] = note
+                self.since[ball_id] = frame
+
+        # --- Note OFF pour les boules qui n'ont plus de bridge ---
+        for ball_id in list(self.notes):
+            if ball_id in active:
+                continue
+            if self._held(ball_id, frame):
+                # relâchée plus tard, une fois la durée minimale atteinte
+                self._defer(ball_id, None, 1)
+                continue
+            self._deferred.pop(ball_id, None)
+            self._queue_event(ball_id, self.notes.pop(ball_id), 0)
+            self.since.pop(ball_id, None)
+
+        self.flush()
+
+    def release_all(self):
+        """Note OFF pour toutes les notes en cours (arrêt / reset)."""
+        for ball_id, note in self.notes.items():
+            self._queue_event(ball_id, note, 0)
+        self.notes.clear()
+        self.since.clear()
+        self._deferred.clear()
+        self.flush()
+
+    def flush(self):
+        """Envoie la file du frame : un send_batch par device."""
+        queue, self._queue = self._queue, {}
+        for device, events in queue.items():
+            if not events:
+                continue
+            self.send_batch(device, events)
+            self.stats['emitted'] += len(events)
+            self.stats['flushes'] += 1
@@ -0,0 +1,317 @@
+# =============================================================================
+# MIDI QUEUE - File de sortie MIDI horodatée (thread d'envoi + backends)
+# =============================================================================
+# Module partagé (Text DAT 'midi_queue'), utilisé par bridge_midi_controller.py
+#
+# Les événements MIDI portent un timestamp (secondes, time.perf_counter).
+# Un thread dédié vide la file à l'heure prévue (attente + spin final sous
+# la milliseconde), et regroupe les événements dus en un envoi par device.
+#
+# Backends (send_batch(device, [(t, note, velocity), ...]), note / velocity
+# déjà bornés 0-127 par MidiQueue.put) :
+#   - ChopBackend    : MIDI Out CHOP de TouchDesigner (défaut en production)
+#                      PAS thread-safe -> pas de thread : envoyé depuis le
+#                      thread principal via pump() (appelé par l'Execute DAT),
+#                      donc au bord de frame, sans précision sous-frame
+#   - RtMidiBackend  : python-rtmidi (optionnel, à activer explicitement),
+#                      thread-safe -> seul backend avec le thread d'envoi
+#   - LoopbackSink   : en mémoire, enregistre l'heure réelle d'envoi pour
+#                      mesurer la latence / le jitter
+#
+#   import midi_queue
+#   q = midi_queue.MidiQueue(midi_queue.LoopbackSink())
+#   q.start()
+#   q.put(device=0, note=60, velocity=80, at=q.clock() + 0.005)
+#   ...
+#   q.pump()   # fin de frame : backends non thread-safe
+#   q.stop()
+#
+# Auto-test hors TouchDesigner : python midi_queue.py
+# =============================================================================
+
+import collections
+import heapq
+import itertools
+import threading
+import time
+
+try:
+    import rtmidi   # python-rtmidi, optionnel
+except ImportError:
+    rtmidi = None
+
+# Les événements à moins de BATCH_WINDOW de l'échéance partent dans le même envoi
+BATCH_WINDOW = 0.0005
+# Dernière portion d'attente en spin (time.sleep(0)) pour la précision sous-frame
+SPIN = 0.001
+# Attente maximale d'un coup (le thread revérifie stop / nouveaux événements)
+MAX_WAIT = 0.05
+
+
+# =============================================================================
+# BACKENDS
+# =============================================================================
+
+class ChopBackend:
+    """MIDI Out CHOPs TouchDesigner : un opérateur par device."""
+
+    thread_safe = False
+
+    def __init__(self, resolve, paths):
+        self.resolve = resolve   # op, ou un op_cache.OpCache
+        self.paths = paths       # {device: chemin du MIDI Out CHOP}
+
+    def send_batch(self, device, events):
+        path = self.paths.get(device)
+        midi = self.resolve(path) if path else None
+        if midi is None:
+            return
+        for _, note, velocity in events:
+            midi.SendMIDI('note', note, velocity)
+
+
+class RtMidiBackend:
+    """python-rtmidi : un port de sortie par device (nom ou morceau de nom)."""
+
+    thread_safe = True
+
+    def __init__(self, port_names, channel=0):
+        if rtmidi is None:
+            raise ImportError('python-rtmidi non installé')
+        self.channel = channel & 0x0F
+        self.outs = {}
+        opened = {}
+        for device, name in port_names.items():
+            if name not in opened:
+                out = rtmidi.MidiOut()
+                ports = out.get_ports()
+                match = [i for i, p in enumerate(ports) if name in p]
+                if match:
+                    out.open_port(match[0])
+                else:
+                    out.open_virtual_port(name)
+                opened[name] = out
+            self.outs[device] = opened[name]
+
+    def send_batch(self, device, events):
+        out = self.outs.get(device)
+        if out is None:
+            return
+        for _, note, velocity in events:
+            status = (0x90 if velocity > 0 else 0x80) | self.channel
+            out.send_message([status, note, velocity])
+
+    def close(self):
+        for out in set(self.outs.values()):
+            out.close_port()
+
+
+class LoopbackSink:
+    """Sink en mémoire : garde (prévu, réel, device, note, velocity) par événement."""
+
+    thread_safe = True
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.received = []
+        self.batches = 0
+        self._lock = threading.Lock()
+
+    def send_batch(self, device, events):
+        now = self.clock()
+        with self._lock:
+            self.batches += 1
+            for t, note, velocity in events:
+                self.received.append((t, now, device, note, velocity))
+
+    def latencies(self):
+        """Retard réel - prévu (secondes), un par événement."""
+        with self._lock:
+            return [real - planned for planned, real, _, _, _ in self.received]
+
+    def report(self):
+        """Résumé latence / jitter en millisecondes."""
+        lat = sorted(self.latencies())
+        if not lat:
+            return {'events': 0, 'batches': self.batches}
+        n = len(lat)
+        mean = sum(lat) / n
+        std = (sum((x - mean) ** 2 for x in lat) / n) ** 0.5
+        return {'events': n, 'batches': self.batches,
+                'mean_ms': mean * 1e3, 'std_ms': std * 1e3,
+                'p95_ms': lat[min(n - 1, int(0.95 * n))] * 1e3, 'max_ms': lat[-1] * 1e3}
+
+
+# =============================================================================
+# FILE
+# =============================================================================
+
+class MidiQueue:
+    """
+    File de priorité (timestamp, ordre d'arrivée) -> envois groupés par device.
+
+    Args:
+        backend: objet avec send_batch(device, events) et thread_safe
+        clock: horloge en secondes (time.perf_counter par défaut)
+    """
+
+    def __init__(self, backend, clock=time.perf_counter, batch_window=BATCH_WINDOW):
+        self.backend = backend
+        self.clock = clock
+        self.batch_window = batch_window
+        self.stats = {'queued': 0, 'sent': 0, 'batches': 0}
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    # --- Entrée ---
+    def put(self, device, note, velocity, at=None):
+        """
+        Ajoute un événement ; at = heure d'envoi (clock), None = maintenant.
+        note / velocity sont bornés ici (0-127) : les backends reçoivent des entiers valides.
+        """
+        at = self.clock() if at is None else at
+        note = int(max(0, min(127, note)))
+        velocity = int(max(0, min(127, velocity)))
+        with self._cond:
+            heapq.heappush(self._heap, (at, next(self._seq), device, note, velocity))
+            self.stats['queued'] += 1
+            self._cond.notify()
+
+    def sender(self, delay=0.0):
+        """Adaptateur send_batch(device, [(note, velocity), ...]) pour midi_output.MidiOutput."""
+        def send_batch(device, events):
+            at = self.clock() + delay
+            for note, velocity in events:
+                self.put(device, note, velocity, at)
+        return send_batch
+
+    def pending(self):
+        with self._cond:
+            return len(self._heap)
+
+    # --- Sortie ---
+    def _pop_due(self, now):
+        """Événements dus (<= now + batch_window), groupés par device dans l'ordre."""
+        batches = collections.OrderedDict()
+        limit = now + self.batch_window
+        while self._heap and self._heap[0][0] <= limit:
+            at, _, device, note, velocity = heapq.heappop(self._heap)
+            batches.setdefault(device, []).append((at, note, velocity))
+        return list(batches.items())
+
+    def _send(self, batches):
+        for device, events in batches:
+            self.backend.send_batch(device, events)
+            self.stats['sent'] += len(events)
+            self.stats['batches'] += 1
+
+    def pump(self, now=None):
+        """
+        Envoie depuis le thread appelant ce qui est dû.
+        À appeler par l'Execute DAT : backends non thread-safe (pas de thread
+        d'envoi) ; sans effet quand le thread tourne.
+        """
+        if self._running:
+            return 0
+        with self._cond:
+            batches = self._pop_due(self.clock() if now is None else now)
+        self._send(batches)
+        return len(batches)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and not self._heap:
+                    self._cond.wait(MAX_WAIT)
+                if not self._running:
+                    return
+                # échéance lue sous le verrou : put() / stop() modifient le tas
+                due = self._heap[0][0]
+                wait = due - self.clock()
+                if wait > SPIN:
+                    # attente longue : réveillé si un événement plus tôt arrive
+                    self._cond.wait(min(wait - SPIN, MAX_WAIT))
+                    continue
+            # spin final hors verrou, sur l'échéance copiée (pas de lecture du tas) ;
+            # un événement arrivé entre-temps part avec le lot s'il est dû
+            while self.clock() < due:
+                time.sleep(0)
+            with self._cond:
+                batches = self._pop_due(self.clock())
+            self._send(batches)
+
+    def start(self):
+        """Démarre le thread d'envoi (daemon) ; backends non thread-safe : pump() seulement."""
+        if not getattr(self.backend, 'thread_safe', False):
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='midi_queue', daemon=True)
+        self._thread.start()
+
+    def stop(self, flush=True):
+        """Arrête le thread ; flush=True envoie tout ce qui reste immédiatement."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+        if flush:
+            with self._cond:
+                batches = self._pop_due(float('inf'))
+            self._send(batches)
+
+
+# =============================================================================
+# AUTO-TEST (hors TouchDesigner)
+# =============================================================================
+
+def _selfcheck(events=2000, spread=0.002, frame=1.0 / 60):
+    """Compare le jitter : envoi au bord de frame vs thread d'envoi (loopback)."""
+    import random
+    rng = random.Random(1)
+    offsets = sorted(rng.uniform(0, spread * events) for _ in range(events))
+
+    # 1) Envoi synchrone au début du frame suivant (comportement d'origine)
+    sink = LoopbackSink()
+    q = MidiQueue(sink)
+    t0 = q.clock() + 0.01
+    for k, off in enumerate(offsets):
+        q.put(k % 5, 60, 80, t0 + off)
+    end = t0 + offsets[-1] + frame
+    while q.pending():
+        now = q.clock()
+        next_frame = t0 + (int((now - t0) / frame) + 1) * frame
+        time.sleep(max(0.0, next_frame - now))
+        q.pump()
+        if q.clock() > end + 1.0:
+            break
+    sync = sink.report()
+
+    # 2) Thread d'envoi
+    sink = LoopbackSink()
+    q = MidiQueue(sink)
+    q.start()
+    t0 = q.clock() + 0.01
+    for k, off in enumerate(offsets):
+        q.put(k % 5, 60, 80, t0 + off)
+    time.sleep(offsets[-1] + 0.05)
+    q.stop()
+    threaded = sink.report()
+
+    for name, rep in (('frame', sync), ('thread', threaded)):
+        print('%-7s events %5d  batches %5d  mean %6.3f ms  std %6.3f ms  p95 %6.3f ms  max %6.3f ms'
+              % (name, rep['events'], rep['batches'], rep['mean_ms'], rep['std_ms'],
+                 rep['p95_ms'], rep['max_ms']))
+    ok = threaded['events'] == events and threaded['p95_ms'] < sync['p95_ms']
+    print('OK' if ok else 'FAIL')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(_selfcheck())
@@ -0,0 +1,135 @@
+# =============================================================================
+# NOTE MAPPER - Table de correspondance position -> note MIDI
+# =============================================================================
+# Module partagé (Text DAT 'note_mapper'), utilisé par bridge_midi_controller.py
+#
+# Même logique que l'ancien quantize_to_uniform_pentatonic (calcul par
+# position, supprimé de bridge_midi_controller) :
+#   - X choisit le degré de la gamme (note la plus proche dans la gamme)
+#   - Y choisit l'octave (octave_count octaves)
+# mais précalculée UNE fois par (gamme, résolution, plage de notes) sur une
+# grille de bins X/Y. Le mapping d'un array de positions est ensuite un seul
+# index NumPy : lut[yi, xi].
+#
+# Différence avec le calcul par position : une position prend la note du
+# bord gauche / haut de son bin (1 pixel). Près d'une frontière de note, elle
+# peut donc tomber sur la note voisine : ~0,3-0,6 % des positions en
+# pentatonique (jusqu'à ~2 % en majeure à 1080), toujours la note qu'aurait
+# donnée le calcul exact à un bin près (vérifié par tests/test_behaviour.py).
+#
+#   import note_mapper
+#   mapper = note_mapper.get_mapper(1920, 1080, 'pentatonic')
+#   notes = mapper.map(xs, ys)          # arrays -> array de notes
+# =============================================================================
+
+import numpy as np
+
+# Gammes disponibles (degrés en demi-tons dans l'octave)
+SCALES = {
+    'pentatonic':       [0, 2, 4, 7, 9],        # pentatonique majeure : C, D, E, G, A
+    'minor_pentatonic': [0, 3, 5, 7, 10],
+    'major':            [0, 2, 4, 5, 7, 9, 11],
+    'minor':            [0, 2, 3, 5, 7, 8, 10],
+    'dorian':           [0, 2, 3, 5, 7, 9, 10],
+    'blues':            [0, 3, 5, 6, 7, 10],
+    'chromatic':        list(range(12)),
+}
+
+# Plage de notes MIDI par défaut
+BASE_NOTE = 36   # C3
+TOP_NOTE = 96    # C8
+OCTAVE_COUNT = 3
+
+# Nombre maximal de bins par axe (1 bin = 1 pixel jusqu'à cette résolution)
+MAX_BINS = 2048
+
+
+def _scale_degrees(scale):
+    if isinstance(scale, str):
+        return SCALES[scale]
+    return list(scale)
+
+
+class NoteMapper:
+    """
+    Table de correspondance (bins_y + 1, bins_x + 1) -> note MIDI.
+
+    Args:
+        res_w, res_h: résolution (resolutionw / resolutionh)
+        scale: nom dans SCALES ou liste de degrés (0-11)
+        base_note, top_note: plage de notes MIDI
+        octave_count: nombre d'octaves sélectionnables via Y
+    """
+
+    def __init__(self, res_w, res_h, scale='pentatonic', base_note=BASE_NOTE,
+                 top_note=TOP_NOTE, octave_count=OCTAVE_COUNT, max_bins=MAX_BINS):
+        self.res_w = float(res_w)
+        self.res_h = float(res_h)
+        self.scale = _scale_degrees(scale)
+        self.base_note = base_note
+        self.top_note = top_note
+        self.octave_count = octave_count
+
+        self.bins_x = int(min(max(self.res_w, 1), max_bins))
+        self.bins_y = int(min(max(self.res_h, 1), max_bins))
+        # position -> index de bin (0 si résolution nulle, comme l'original)
+        self._sx = self.bins_x / self.res_w if self.res_w > 0 else 0.0
+        self._sy = self.bins_y / self.res_h if self.res_h > 0 else 0.0
+
+        # Positions échantillonnées : bord gauche de chaque bin + bord final
+        xs = np.arange(self.bins_x + 1) * (self.res_w / self.bins_x)
+        ys = np.arange(self.bins_y + 1) * (self.res_h / self.bins_y)
+        self.lut = self._build(xs, ys)
+
+    def _fraction(self, val, max_val):
+        # Normalisation 0-127 puis clamp, comme l'ancien calcul par position
+        if max_val <= 0:
+            return np.zeros_like(val)
+        return np.clip(val / max_val * 127, 0, 127) / 127.0
+
+    def _build(self, xs, ys):
+        # --- 1) Degré dans la gamme (via X)
+        note_range = self.top_note - self.base_note
+        fx = self._fraction(xs, self.res_w)
+        raw_note = self.base_note + fx * note_range
+        semitone = np.round(raw_note).astype(np.int64) - self.base_note
+        degree = semitone % 12
+        scale = np.asarray(self.scale)
+        # note la plus proche ; argmin garde la première en cas d'égalité (comme min())
+        closest = scale[np.argmin(np.abs(scale[None, :] - degree[:, None]), axis=1)]
+        note_x = self.base_note + closest
+
+        # --- 2) Octave (via Y)
+        fy = self._fraction(ys, self.res_h)
+        octave = (fy * self.octave_count).astype(np.int64)
+
+        lut = note_x[None, :] + 12 * octave[:, None]
+        return np.clip(lut, self.base_note, self.top_note).astype(np.uint8)
+
+    def map(self, xs, ys):
+        """Notes MIDI pour des arrays de positions (un seul index NumPy)."""
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        xi = np.clip((xs * self._sx).astype(np.int64), 0, self.bins_x)
+        yi = np.clip((ys * self._sy).astype(np.int64), 0, self.bins_y)
+        return self.lut[yi, xi]
+
+    def map_one(self, x, y):
+        """Note MIDI (int) pour une position."""
+        return int(self.map(x, y))
+
+
+# --- Cache : une table par (résolution, gamme, plage) ---
+_mappers = {}
+
+
+def get_mapper(res_w, res_h, scale='pentatonic', base_note=BASE_NOTE, top_note=TOP_NOTE,
+               octave_count=OCTAVE_COUNT):
+    """NoteMapper partagé ; reconstruit seulement si un paramètre change."""
+    key = (float(res_w), float(res_h), tuple(_scale_degrees(scale)), base_note, top_note, octave_count)
+    mapper = _mappers.get(key)
+    if mapper is None:
+        if len(_mappers) > 8:
+            _mappers.clear()
+        mapper = _mappers[key] = NoteMapper(res_w, res_h, scale, base_note, top_note, octave_count)
+    return mapper
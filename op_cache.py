@@ -0,0 +1,110 @@
+# =============================================================================
+# OP CACHE - Cache des handles d'opérateurs (op('...'))
+# =============================================================================
+# Module partagé (Text DAT 'op_cache'), utilisé par les Execute DAT.
+#
+# Chaque script appelait op('chemin') pour ses chemins fixes à chaque frame.
+# Ici le handle est résolu UNE fois puis réutilisé ; on vérifie seulement
+# handle.valid (opérateur supprimé / renommé -> re-résolution).
+#
+#   import op_cache
+#   ops = op_cache.OpCache(op, 'bridge_midi_controller')   # au niveau module
+#   midi = ops('/project1/Tda_MIDI_1')                     # comme op(...)
+#
+# op() est relatif au DAT appelant : chaque script passe sa propre fonction
+# op et a son propre cache (nommé pour le rapport).
+#
+# Rapport : op_cache.report() -> lignes (cache, chemin, appels, lookups, manqués)
+#           op_cache.write_report(op('op_cache_report'))  (Table DAT)
+# =============================================================================
+
+# Un chemin introuvable est re-cherché au plus une fois tous les MISS_RETRY appels
+MISS_RETRY = 60
+
+# Registre global : {nom: OpCache}
+_registry = {}
+
+
+class OpCache:
+    """
+    Args:
+        resolve: fonction op du script appelant
+        name: nom du cache dans le rapport (ex: nom du DAT)
+    """
+
+    def __init__(self, resolve, name):
+        self.resolve = resolve
+        self.name = name
+        self.handles = {}   # {chemin: handle ou None}
+        self.counts = {}    # {chemin: [appels, lookups, manqués]}
+        self._retry = {}    # {chemin: appels restants avant nouvel essai}
+        _registry[name] = self
+
+    def __call__(self, path):
+        if not path:
+            return None
+        count = self.counts.get(path)
+        if count is None:
+            count = self.counts[path] = [0, 0, 0]
+        count[0] += 1
+
+        handle = self.handles.get(path)
+        if handle is not None:
+            if _valid(handle):
+                return handle
+        elif path in self.handles:
+            # introuvable au dernier essai : attendre avant de re-chercher
+            wait = self._retry.get(path, 0)
+            if wait > 0:
+                self._retry[path] = wait - 1
+                return None
+
+        # (Re)résolution
+        count[1] += 1
+        handle = self.resolve(path)
+        self.handles[path] = handle
+        if handle is None:
+            count[2] += 1
+            self._retry[path] = MISS_RETRY
+        return handle
+
+    def clear(self):
+        """Oublie tous les handles (re-résolus au prochain appel)."""
+        self.handles.clear()
+        self._retry.clear()
+
+
+def _valid(handle):
+    try:
+        return bool(handle.valid)
+    except Exception:
+        # pas d'attribut valid (ou opérateur détruit) : re-résoudre
+        return False
+
+
+def get(name):
+    """Cache enregistré sous ce nom (ou None)."""
+    return _registry.get(name)
+
+
+def clear_all():
+    for cache in _registry.values():
+        cache.clear()
+
+
+def report():
+    """Lignes (cache, chemin, appels, lookups, manqués), lookups les plus fréquents d'abord."""
+    rows = [(cache.name, path, c[0], c[1], c[2])
+            for cache in _registry.values() for path, c in cache.counts.items()]
+    rows.sort(key=lambda r: (-r[3], -r[2]))
+    return rows
+
+
+def write_report(dat):
+    """Écrit report() dans un Table DAT."""
+    if dat is None:
+        return
+    dat.clear()
+    dat.appendRow(['cache', 'path', 'calls', 'lookups', 'misses'])
+    for row in report():
+        dat.appendRow(list(row))
@@ -0,0 +1,72 @@
+# =============================================================================
+# PARAM SENDER - Envois de paramètres Ableton filtrés (delta + débit max)
+# =============================================================================
+# Module partagé (Text DAT 'param_sender'), utilisé par bridge_midi_controller.py
+#
+# update_ableton_parameter écrivait param.par.Valuesend pour chaque boule
+# active à chaque frame, même sans changement. Ici :
+#   - dernière valeur envoyée gardée par clé (ball_id)
+#   - envoi seulement si |nouvelle - dernière| >= min_delta
+#   - au plus max_rate envois par seconde et par paramètre ; la dernière
+#     valeur bloquée reste en attente et part dès que la fenêtre s'ouvre (tick)
+#   - flush(key, value) : envoi forcé (fermeture de bridge)
+#
+#   import param_sender
+#   sender = param_sender.ParamSender(write, min_delta=0.005, max_rate=30)
+#   sender.send(ball_id, value, absTime.seconds)
+#   sender.tick(absTime.seconds)               # une fois par frame
+#   sender.flush(ball_id, 0.0, absTime.seconds)
+# =============================================================================
+
+
+class ParamSender:
+    """
+    Args:
+        write: fonction(key, value) qui écrit réellement le paramètre
+        min_delta: variation minimale pour envoyer
+        max_rate: envois maximum par seconde et par clé (0 = illimité)
+    """
+
+    def __init__(self, write, min_delta=0.0, max_rate=0):
+        self.write = write
+        self.min_delta = min_delta
+        self.interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self.last = {}       # {key: dernière valeur envoyée}
+        self.last_time = {}  # {key: temps du dernier envoi (s)}
+        self.pending = {}    # {key: valeur en attente de la fenêtre de débit}
+        self.stats = {'sent': 0, 'skipped': 0, 'deferred': 0}
+
+    def _write(self, key, value, now):
+        self.write(key, value)
+        self.last[key] = value
+        self.last_time[key] = now
+        self.pending.pop(key, None)
+        self.stats['sent'] += 1
+
+    def send(self, key, value, now):
+        """Envoie value si elle a assez changé et si la fenêtre de débit est ouverte."""
+        last = self.last.get(key)
+        if last is not None and abs(value - last) < self.min_delta:
+            # retour vers la valeur déjà envoyée : l'attente devient inutile
+            self.pending.pop(key, None)
+            self.stats['skipped'] += 1
+            return False
+        if now - self.last_time.get(key, now - self.interval) < self.interval:
+            self.pending[key] = value
+            self.stats['deferred'] += 1
+            return False
+        self._write(key, value, now)
+        return True
+
+    def tick(self, now):
+        """Envoie les valeurs en attente dont la fenêtre de débit est ouverte."""
+        for key in [k for k in self.pending if now - self.last_time.get(k, now) >= self.interval]:
+            self._write(key, self.pending[key], now)
+
+    def flush(self, key, value, now):
+        """Envoi forcé (ignore delta et débit) ; rien si la valeur est déjà envoyée."""
+        if self.last.get(key) == value:
+            self.pending.pop(key, None)
+            return False
+        self._write(key, value, now)
+        return True
@@ -1,175 +1,262 @@
-﻿# =============================================================================
-# PROXIMITY CALCULATOR - Calcul distances Hero ↔ Boules
-# =============================================================================
-# À copier dans un Execute DAT (famille DAT)
-# Calcule la distance entre le hero et chaque boule stationnaire
-# Output dans un DAT Table nommé 'proximity_dat'
-#
-# LOGIQUE :
-# - Si distance <= 320 pixels (CONNECT_DISTANCE) → bridge actif → affiche distance
-# - Si distance > 320 pixels → pas de bridge → affiche 0
-# =============================================================================
-
-import math
-
-# Distance maximale pour créer un bridge (même valeur que dans metaball.html)
-CONNECT_DISTANCE = 480  # 1.5x plus loin (était 320)
-
-def onFrameStart(frame):
-    """
-    Calculé à chaque frame
-    """
-
-    # Récupérer le CHOP hero_control
-    hero_chop = op('hero_control')
-    if not hero_chop or hero_chop.numChans < 2:
-        return
-
-    # Récupérer le DAT Table des positions des boules
-    balls_table = op('balls_positions_table')
-    if not balls_table:
-        return
-
-    # Récupérer le DAT de sortie
-    proximity_dat = op('proximity_dat')
-    if not proximity_dat:
-        return
-
-    # Lire position du hero
-    hero_x = hero_chop[0].eval()
-    hero_y = hero_chop[1].eval()
-
-    # Configurer le DAT de sortie (header + 5 lignes)
-    if proximity_dat.numRows < 6:
-        proximity_dat.clear()
-        proximity_dat.appendRow(['ball_id', 'distance', 'bridge_active', 'ball_x', 'ball_y', 'angle'])
-
-    # Calculer distances pour chaque boule
-    distances = []
-
-    for row in range(1, min(balls_table.numRows, 6)):  # 5 boules (rows 1-5)
-        try:
-            ball_x = float(balls_table[row, 1].val)
-            ball_y = float(balls_table[row, 2].val)
-
-            # Calcul de la distance euclidienne
-            dx = ball_x - hero_x
-            dy = ball_y - hero_y
-            distance = math.sqrt(dx * dx + dy * dy)
-
-            ball_id = int(balls_table[row, 0].val)
-
-            # Calcul de l'angle (en degrés 0-360) entre hero et boule
-            # atan2(dy, dx) donne l'angle en radians, on le convertit en degrés
-            if distance <= CONNECT_DISTANCE:
-                angle_rad = math.atan2(dy, dx)
-                angle_deg = math.degrees(angle_rad)
-                # Normaliser de -180/180 vers 0/360
-                if angle_deg < 0:
-                    angle_deg += 360
-                angle = angle_deg
-            else:
-                angle = 0  # Pas d'angle si pas de bridge
-
-            # Détection de bridge : si distance <= 320, bridge actif
-            if distance <= CONNECT_DISTANCE:
-                bridge_active = 1
-                output_distance = distance
-            else:
-                bridge_active = 0
-                output_distance = 0
-
-            distances.append([ball_id, output_distance, bridge_active, ball_x, ball_y, angle])
-
-        except Exception as e:
-            distances.append([row - 1, 0, 0, 0, 0, 0])
-
-    # Remplir le DAT de sortie
-    proximity_dat.clear()
-    proximity_dat.appendRow(['ball_id', 'distance', 'bridge_active', 'ball_x', 'ball_y', 'angle'])
-
-    for ball_id, dist, bridge, bx, by, ang in distances:
-        proximity_dat.appendRow([
-            str(ball_id), 
-            '{:.2f}'.format(dist), 
-            str(bridge),
-            '{:.2f}'.format(bx),
-            '{:.2f}'.format(by),
-            '{:.1f}'.format(ang)
-        ])
-
-
-def onFrameEnd(frame):
-    pass
-
-
-# =============================================================================
-# ALTERNATIVE : Version optimisée avec mise à jour sélective
-# =============================================================================
-
-def onFrameStart_OPTIMIZED(frame):
-    """
-    Version qui ne met à jour que si les positions ont changé
-    """
-
-    hero_chop = op('hero_control')
-    balls_table = op('balls_positions_table')
-    proximity_dat = op('proximity_dat')
-
-    if not all([hero_chop, balls_table, proximity_dat]):
-        return
-
-    if hero_chop.numChans < 2:
-        return
-
-    hero_x = hero_chop[0].eval()
-    hero_y = hero_chop[1].eval()
-
-    # Initialiser le header si nécessaire
-    if proximity_dat.numRows == 0:
-        proximity_dat.appendRow(['ball_id', 'distance', 'bridge_active', 'ball_x', 'ball_y', 'angle'])
-
-    # Calculer et mettre à jour
-    for i, row in enumerate(range(1, min(balls_table.numRows, 6)), start=1):
-        try:
-            ball_x = float(balls_table[row, 1].val)
-            ball_y = float(balls_table[row, 2].val)
-
-            dx = ball_x - hero_x
-            dy = ball_y - hero_y
-            distance = math.sqrt(dx * dx + dy * dy)
-
-            ball_id = balls_table[row, 0].val
-
-            # Calcul de l'angle (en degrés 0-360)
-            if distance <= CONNECT_DISTANCE:
-                angle_rad = math.atan2(dy, dx)
-                angle_deg = math.degrees(angle_rad)
-                if angle_deg < 0:
-                    angle_deg += 360
-                angle = angle_deg
-                bridge_active = 1
-            else:
-                angle = 0
-                bridge_active = 0
-
-            # Créer la ligne si elle n'existe pas
-            if proximity_dat.numRows <= i:
-                proximity_dat.appendRow([
-                    ball_id, 
-                    '{:.2f}'.format(distance), 
-                    str(bridge_active),
-                    '{:.2f}'.format(ball_x),
-                    '{:.2f}'.format(ball_y),
-                    '{:.1f}'.format(angle)
-                ])
-            else:
-                proximity_dat[i, 0] = ball_id
-                proximity_dat[i, 1] = '{:.2f}'.format(distance)
-                proximity_dat[i, 2] = str(bridge_active)
-                proximity_dat[i, 3] = '{:.2f}'.format(ball_x)
-                proximity_dat[i, 4] = '{:.2f}'.format(ball_y)
-                proximity_dat[i, 5] = '{:.1f}'.format(angle)
-
-        except Exception as e:
-            pass
+﻿# =============================================================================
+# PROXIMITY CALCULATOR - Calcul distances Hero ↔ Boules
+# =============================================================================
+# À copier dans un Execute DAT (famille DAT)
+# Calcule la distance entre le(s) hero(s) et chaque boule stationnaire
+# (NumPy, via proximity_engine : N boules x M heros en une passe)
+# Output numérique : Script CHOP 'proximity_chop' (proximity_chop.py), un
+# sample par boule, lu directement par bridge_midi_controller.py
+# + DAT Table 'proximity_dat' optionnel (affichage, une ligne par boule,
+# hero le plus proche) + 'proximity_pairs' optionnel (paires actives)
+# Avec frame_pipeline_exec : étape 'proximity_calculator' (après
+# bump_validation), l'array de sortie passe en mémoire à bridge_midi_controller
+#
+# LOGIQUE :
+# - Si distance <= 320 pixels (CONNECT_DISTANCE) → bridge actif → affiche distance
+# - Si distance > 320 pixels → pas de bridge → affiche 0
+# =============================================================================
+
+import numpy as np
+import proximity_engine
+import ball_layout     # balls_positions_table parsé une fois (cache partagé)
+import op_cache        # handles d'opérateurs résolus une fois
+import render_sync     # état des bridges vers le renderer (frame binaire / applyState)
+import frame_pipeline  # passe unique ordonnée (frame_pipeline_exec)
+
+ops = op_cache.OpCache(op, 'proximity_calculator')
+
+# Distance maximale pour créer un bridge (même valeur que dans metaball.html)
+CONNECT_DISTANCE = proximity_engine.CONNECT_DISTANCE  # 480 = 1.5x plus loin (était 320)
+
+# Multi-contact : chaque bump validé agit comme un hero supplémentaire
+# '' = désactivé (un seul hero : hero_control)
+MULTI_HERO_CHOP = ''        # ex: 'bump_out' (channels x, y normalisés, -1 = slot vide)
+MULTI_HERO_SCALE = 1080     # normalisé (0-1) -> pixels
+
+# DAT optionnel : une ligne par paire (hero, boule) avec bridge actif
+PAIRS_DAT = 'proximity_pairs'
+
+# Index spatial (grille de cellules CONNECT_DISTANCE) à partir de ce nombre
+# de boules ; en dessous, le calcul dense NumPy est plus rapide
+GRID_MIN_BALLS = 256
+
+# Mise à jour seulement si un hero a bougé de plus de HERO_EPSILON pixels
+# (ou si la disposition des boules a changé)
+HERO_EPSILON = 0.5
+
+HEADER = ['ball_id', 'distance', 'bridge_active', 'ball_x', 'ball_y', 'angle']
+PAIRS_HEADER = ['hero_id', 'ball_id', 'distance', 'angle']
+
+# Sortie numérique (même ordre que HEADER) : me.storage['out'] (6, N) float
+# + cook forcé du Script CHOP quand les valeurs changent
+PROXIMITY_CHOP = 'proximity_chop'
+
+# Lignes de out recalculées quand un hero bouge (ids / positions : à la
+# construction seulement, quand la disposition change)
+DYNAMIC = (1, 2, 5)   # distance, bridge_active, angle
+
+
+def _state():
+    if 'prox' not in me.storage:
+        me.storage['prox'] = {'heroes': None, 'version': None, 'rows': [], 'pairs': None,
+                              'out': None, 'active': np.zeros(0, dtype=np.int64)}
+    return me.storage['prox']
+
+
+def _unchanged(st, heroes, version):
+    """True si rien n'a bougé depuis la dernière publication."""
+    last = st['heroes']
+    if last is None or st['version'] != version or last.shape != heroes.shape:
+        return False
+    return bool(np.all(np.abs(heroes - last) <= HERO_EPSILON))
+
+
+def _base_out(ids, balls, ok):
+    """Sortie (6, N) d'une nouvelle disposition : ids / positions, aucun bridge."""
+    out = np.zeros((len(HEADER), len(ids)), dtype=np.float64)
+    out[0] = ids
+    out[3:5] = balls.T
+    out[3:5, ~ok] = 0.0
+    return out
+
+
+def _row(out, ids, i):
+    return [
+        str(ids[i]),
+        '{:.2f}'.format(out[1, i]),
+        str(int(out[2, i])),
+        '{:.2f}'.format(out[3, i]),
+        '{:.2f}'.format(out[4, i]),
+        '{:.1f}'.format(out[5, i])
+    ]
+
+
+def _write_rows(proximity_dat, st, out, ids, idx=None):
+    """
+    Écriture en place des lignes des boules idx (None = toutes) : seules les
+    cellules modifiées sont écrites (pas de clear/append, pas de reconstruction
+    de toute la table quand quelques boules changent).
+    """
+    n_rows = len(ids) + 1
+    if proximity_dat.numRows != n_rows or proximity_dat.numCols != len(HEADER) \
+            or len(st['rows']) != len(ids):
+        proximity_dat.setSize(n_rows, len(HEADER))
+        for c, name in enumerate(HEADER):
+            proximity_dat[0, c] = name
+        st['rows'] = [None] * len(ids)
+        idx = None
+    rows = st['rows']
+    for i in (range(len(ids)) if idx is None else idx.tolist()):
+        row = _row(out, ids, i)
+        old = rows[i]
+        if old == row:
+            continue
+        for c, val in enumerate(row):
+            if old is None or old[c] != val:
+                proximity_dat[i + 1, c] = val
+        rows[i] = row
+
+
+def _read_heroes(hero_chop):
+    """Positions des heros (M, 2) : hero_control + bumps validés si MULTI_HERO_CHOP."""
+    heroes = [[hero_chop[0].eval(), hero_chop[1].eval()]]
+    if MULTI_HERO_CHOP:
+        multi = ops(MULTI_HERO_CHOP)
+        if multi and multi.chan('x') is not None and multi.chan('y') is not None:
+            xs = np.asarray(multi['x'].vals, dtype=np.float64)
+            ys = np.asarray(multi['y'].vals, dtype=np.float64)
+            used = (xs >= 0) & (ys >= 0)
+            for x, y in zip(xs[used], ys[used]):
+                heroes.append([x * MULTI_HERO_SCALE, y * MULTI_HERO_SCALE])
+    return proximity_engine.as_points(heroes)
+
+
+def _publish(out):
+    """Stocke les valeurs et fait cuire proximity_chop une seule fois (appelé seulement si elles ont changé)."""
+    me.storage['out'] = out
+    chop = ops(PROXIMITY_CHOP)
+    if chop:
+        chop.cook(force=True)
+
+
+def _write_pairs(st, pairs, ids):
+    pairs_dat = ops(PAIRS_DAT)
+    if not pairs_dat:
+        return
+    rows = [[str(hero_idx), str(ids[ball_idx]), '{:.2f}'.format(dist), '{:.1f}'.format(ang)]
+            for hero_idx, ball_idx, dist, ang in pairs]
+    old = st['pairs']
+    if rows == old:
+        return
+    # Taille ajustée puis cellules écrites en place (pas de clear / appendRow)
+    n_rows = len(rows) + 1
+    if old is None or pairs_dat.numRows != len(old) + 1 or pairs_dat.numCols != len(PAIRS_HEADER):
+        pairs_dat.setSize(n_rows, len(PAIRS_HEADER))
+        for c, name in enumerate(PAIRS_HEADER):
+            pairs_dat[0, c] = name
+        old = []
+    elif len(rows) != len(old):
+        pairs_dat.setSize(n_rows, len(PAIRS_HEADER))
+    for i, row in enumerate(rows):
+        prev = old[i] if i < len(old) else None
+        if prev == row:
+            continue
+        for c, val in enumerate(row):
+            if prev is None or prev[c] != val:
+                pairs_dat[i + 1, c] = val
+    st['pairs'] = rows
+
+
+def onFrameStart(frame):
+    # frame_pipeline_exec actif : exécuté par run_stage(), après bump_validation
+    if frame_pipeline.drives('proximity_calculator', absTime.frame):
+        return
+    _update()
+
+
+def run_stage(ctx):
+    """Étape de frame_pipeline : array (6, N) publié, passé tel quel à bridge_midi_controller."""
+    _update()
+    return me.storage.get('out')
+
+
+def _update():
+    """
+    Appelé à chaque frame ; ne recalcule et ne republie que si un hero a bougé
+    de plus de HERO_EPSILON ou si la disposition des boules a changé.
+    """
+
+    # Récupérer le CHOP hero_control
+    hero_chop = ops('hero_control')
+    if not hero_chop or hero_chop.numChans < 2:
+        return
+
+    # Récupérer le DAT Table des positions des boules
+    balls_table = ops('balls_positions_table')
+    if not balls_table:
+        return
+
+    # DAT de sortie (optionnel : affichage / debug)
+    proximity_dat = ops('proximity_dat')
+
+    # Lire positions (heros + boules)
+    heroes = _read_heroes(hero_chop)
+    layout = ball_layout.get(balls_table)
+    ids, balls, ok = layout.ids, layout.positions, layout.ok
+
+    st = _state()
+    if _unchanged(st, heroes, layout.version):
+        return
+    # Nouvelle disposition : sortie reconstruite une fois, tout est republié
+    full = st['out'] is None or st['version'] != layout.version
+    st['heroes'] = heroes
+    st['version'] = layout.version
+    if full:
+        st['out'] = _base_out(ids, balls, ok)
+        st['active'] = np.zeros(0, dtype=np.int64)
+    out = st['out']
+
+    if len(layout) >= GRID_MIN_BALLS:
+        # Grand nombre de boules : seulement les cellules voisines de chaque hero,
+        # et seulement les boules actives avant ou maintenant (pas d'array de taille N)
+        hi, bi, d, a = layout.grid(CONNECT_DISTANCE).query_pairs(heroes, CONNECT_DISTANCE)
+        b, _, b_dist, b_angle = proximity_engine.nearest_hero_pairs(hi, bi, d, a)
+        idx = np.union1d(st['active'], b)
+        new = np.zeros((len(DYNAMIC), len(idx)))
+        at = np.searchsorted(idx, b)
+        new[0, at] = b_dist
+        new[1, at] = 1.0
+        new[2, at] = b_angle
+        st['active'] = b
+        pairs = list(zip(hi.tolist(), bi.tolist(), d.tolist(), a.tolist()))
+    else:
+        # Matrices (M heros x N boules) en une passe NumPy
+        dist, angle, active = proximity_engine.compute(balls, heroes, CONNECT_DISTANCE)
+        active &= ok[None, :]
+        # Une ligne par boule : hero le plus proche
+        _, out_dist, bridge, out_angle = proximity_engine.nearest_hero(dist, angle, active)
+        idx = np.arange(len(ids))
+        new = np.vstack([out_dist, bridge, out_angle])
+        new[:, ~ok] = 0.0
+        pairs = proximity_engine.active_pairs(dist, angle, active)
+
+    # Boules dont la sortie a changé (comparaison limitée à idx)
+    diff = np.any(out[np.ix_(DYNAMIC, idx)] != new, axis=0)
+    changed = idx[diff]
+    if len(changed):
+        out[np.ix_(DYNAMIC, changed)] = new[:, diff]
+
+    # Publier la sortie numérique (pleine précision, pas de string)
+    if full or len(changed):
+        _publish(out)
+        render_sync.set_bridges(out[2])
+
+    _write_pairs(st, pairs, ids)
+
+    # DAT d'affichage : lignes des boules modifiées seulement
+    if proximity_dat and (full or len(changed)):
+        _write_rows(proximity_dat, st, out, ids, None if full else changed)
+
+
+def onFrameEnd(frame):
+    pass
@@ -0,0 +1,34 @@
+# =============================================================================
+# PROXIMITY CHOP - Sortie numérique de proximity_calculator
+# =============================================================================
+# À copier dans le DAT de callbacks d'un Script CHOP nommé 'proximity_chop'
+# proximity_calculator.py stocke un array (6, N) float dans son storage['out']
+# et force la cuisson de ce CHOP quand les valeurs changent.
+#
+# Sortie : un sample par boule
+#   ball_id, distance, bridge_active, ball_x, ball_y, angle
+# (pleine précision, plus d'aller-retour float -> string -> float)
+# =============================================================================
+
+PROXIMITY_DAT_EXEC = 'proximity_calculator'   # Execute DAT de proximity_calculator.py
+CHANS = ('ball_id', 'distance', 'bridge_active', 'ball_x', 'ball_y', 'angle')
+
+
+def setupParameters(scriptOp):
+    return
+
+
+def onPulse(par):
+    return
+
+
+def cook(scriptOp):
+    scriptOp.clear()
+    src = op(PROXIMITY_DAT_EXEC)
+    out = src.storage.get('out') if src else None
+    if out is None:
+        return
+    scriptOp.numSamples = out.shape[1]
+    for name, vals in zip(CHANS, out):
+        scriptOp.appendChan(name).vals = vals
+    return
@@ -0,0 +1,195 @@
+# =============================================================================
+# PROXIMITY ENGINE - Distances N boules x M heros (NumPy)
+# =============================================================================
+# Module partagé (Text DAT 'proximity_engine'), importé par proximity_calculator.py
+#
+#   import proximity_engine
+#   dist, angle, active = proximity_engine.compute(balls, heroes)
+#
+# balls  : array (N, 2) positions des boules (pixels)
+# heroes : array (M, 2) positions des heros (pixels)
+# Sorties (M, N) :
+#   dist   : distance euclidienne hero -> boule
+#   angle  : angle hero -> boule en degrés (0-360), 0 si pas de bridge
+#   active : True si distance <= CONNECT_DISTANCE (bridge actif)
+# =============================================================================
+
+import numpy as np
+
+# Distance maximale pour créer un bridge (même valeur que dans metaball.html)
+CONNECT_DISTANCE = 480
+
+
+def as_points(points):
+    """Convertit une liste de [x, y] en array float (K, 2)."""
+    return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+
+def compute(balls, heroes, connect_distance=CONNECT_DISTANCE):
+    """
+    Matrices distance / angle / bridge pour chaque paire (hero, boule).
+
+    Args:
+        balls: (N, 2) positions des boules
+        heroes: (M, 2) positions des heros
+        connect_distance: distance maximale de bridge
+
+    Returns:
+        dist (M, N), angle (M, N) en degrés 0-360, active (M, N) bool
+    """
+    balls = as_points(balls)
+    heroes = as_points(heroes)
+
+    # dx/dy = boule - hero (même convention que proximity_calculator)
+    dx = balls[None, :, 0] - heroes[:, None, 0]
+    dy = balls[None, :, 1] - heroes[:, None, 1]
+    dist = np.hypot(dx, dy)
+    active = dist <= connect_distance
+
+    # atan2 -> degrés, normalisé de -180/180 vers 0/360
+    angle = np.degrees(np.arctan2(dy, dx))
+    angle = np.where(angle < 0, angle + 360.0, angle)
+    angle = np.where(active, angle, 0.0)
+    return dist, angle, active
+
+
+def nearest_hero(dist, angle, active):
+    """
+    Réduit les matrices (M, N) à une ligne par boule : le hero le plus proche.
+
+    Returns:
+        hero_idx (N,), distance (N,) (0 si pas de bridge), bridge (N,) int, angle (N,)
+    """
+    n = dist.shape[1]
+    if dist.shape[0] == 0:
+        zeros = np.zeros(n)
+        return np.full(n, -1, dtype=np.int64), zeros, zeros.astype(np.int64), zeros
+    cols = np.arange(n)
+    hero_idx = np.argmin(dist, axis=0)
+    d = dist[hero_idx, cols]
+    bridge = active[hero_idx, cols]
+    return (hero_idx, np.where(bridge, d, 0.0), bridge.astype(np.int64),
+            np.where(bridge, angle[hero_idx, cols], 0.0))
+
+
+def active_pairs(dist, angle, active):
+    """Liste des paires actives : (hero_idx, ball_idx, distance, angle)."""
+    hi, bi = np.nonzero(active)
+    return list(zip(hi.tolist(), bi.tolist(), dist[hi, bi].tolist(), angle[hi, bi].tolist()))
+
+
+# =============================================================================
+# INDEX SPATIAL - Grille uniforme (requêtes à rayon fixe)
+# =============================================================================
+# Construit UNE fois quand la disposition des boules change.
+# Taille de cellule = CONNECT_DISTANCE : un hero ne peut toucher que les
+# boules des 3x3 cellules autour de lui, quel que soit le nombre de boules.
+# =============================================================================
+
+class BallGrid:
+    """Grille uniforme sur les positions des boules (N, 2).
+
+    valid : masque (N,) optionnel - les boules False ne sont pas indexées.
+    """
+
+    def __init__(self, balls, cell_size=CONNECT_DISTANCE, valid=None):
+        self.balls = as_points(balls)
+        self.cell_size = float(cell_size)
+        self.cells = {}
+        idx = np.arange(len(self.balls))
+        if valid is not None:
+            idx = idx[np.asarray(valid, dtype=bool)]
+        if len(idx) == 0:
+            self.order = np.zeros(0, dtype=np.int64)
+            return
+        keys = np.floor(self.balls[idx] / self.cell_size).astype(np.int64)
+        # tri par cellule -> chaque cellule = une tranche de self.order
+        local = np.lexsort((keys[:, 1], keys[:, 0]))
+        self.order = idx[local]
+        sorted_keys = keys[local]
+        uniq, starts, counts = np.unique(sorted_keys, axis=0, return_index=True, return_counts=True)
+        for (cx, cy), s, c in zip(uniq.tolist(), starts.tolist(), counts.tolist()):
+            self.cells[(cx, cy)] = self.order[s:s + c]
+
+    def __len__(self):
+        return len(self.balls)
+
+    def candidates(self, x, y, radius=None):
+        """Indices des boules dans les cellules qui peuvent être à <= radius de (x, y)."""
+        radius = self.cell_size if radius is None else radius
+        reach = int(np.ceil(radius / self.cell_size))
+        cx = int(np.floor(x / self.cell_size))
+        cy = int(np.floor(y / self.cell_size))
+        found = [self.cells[(i, j)]
+                 for i in range(cx - reach, cx + reach + 1)
+                 for j in range(cy - reach, cy + reach + 1)
+                 if (i, j) in self.cells]
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(found)
+
+    def query_pairs(self, heroes, radius=CONNECT_DISTANCE):
+        """
+        Paires (hero, boule) à distance <= radius.
+
+        Returns:
+            hero_idx, ball_idx, dist, angle (0-360) - arrays de même longueur
+        """
+        heroes = as_points(heroes)
+        h_all, b_all = [], []
+        for h, (x, y) in enumerate(heroes.tolist()):
+            cand = self.candidates(x, y, radius)
+            if len(cand):
+                h_all.append(np.full(len(cand), h, dtype=np.int64))
+                b_all.append(cand)
+        if not h_all:
+            empty = np.zeros(0)
+            return empty.astype(np.int64), empty.astype(np.int64), empty, empty
+        hi = np.concatenate(h_all)
+        bi = np.concatenate(b_all)
+        dx = self.balls[bi, 0] - heroes[hi, 0]
+        dy = self.balls[bi, 1] - heroes[hi, 1]
+        dist = np.hypot(dx, dy)
+        keep = dist <= radius
+        hi, bi, dist, dx, dy = hi[keep], bi[keep], dist[keep], dx[keep], dy[keep]
+        angle = np.degrees(np.arctan2(dy, dx))
+        angle = np.where(angle < 0, angle + 360.0, angle)
+        return hi, bi, dist, angle
+
+
+def nearest_hero_pairs(hero_idx, ball_idx, dist, angle):
+    """
+    Hero le plus proche pour les seules boules qui ont au moins une paire active
+    (pas d'array de taille N : coût proportionnel au nombre de paires).
+
+    Returns:
+        ball (K,) triés, hero_idx (K,), distance (K,), angle (K,)
+    """
+    if not len(ball_idx):
+        empty = np.zeros(0)
+        return empty.astype(np.int64), empty.astype(np.int64), empty, empty
+    # tri par boule puis distance : la première paire de chaque boule est la plus proche
+    order = np.lexsort((dist, ball_idx))
+    b_sorted = ball_idx[order]
+    first = np.flatnonzero(np.r_[True, b_sorted[1:] != b_sorted[:-1]])
+    pick = order[first]
+    return ball_idx[pick], hero_idx[pick], dist[pick], angle[pick]
+
+
+def nearest_hero_sparse(n_balls, hero_idx, ball_idx, dist, angle):
+    """
+    Équivalent de nearest_hero() à partir des seules paires actives.
+
+    Returns:
+        hero_idx (N,) (-1 si aucun), distance (N,), bridge (N,) int, angle (N,)
+    """
+    best_hero = np.full(n_balls, -1, dtype=np.int64)
+    out_dist = np.zeros(n_balls)
+    bridge = np.zeros(n_balls, dtype=np.int64)
+    out_angle = np.zeros(n_balls)
+    b, h, d, a = nearest_hero_pairs(hero_idx, ball_idx, dist, angle)
+    best_hero[b] = h
+    out_dist[b] = d
+    bridge[b] = 1
+    out_angle[b] = a
+    return best_hero, out_dist, bridge, out_angle
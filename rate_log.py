@@ -0,0 +1,98 @@
+# =============================================================================
+# RATE LOG - Messages du textport limités en débit
+# =============================================================================
+# Module partagé (Text DAT 'rate_log').
+#
+# Un print dans un callback appelé à chaque frame / chaque pulse coûte cher
+# dans TouchDesigner (textport) et noie les messages utiles. Ici :
+#   - au plus un message par clé et par intervalle (INTERVAL secondes)
+#   - les messages bloqués sont comptés ; le suivant qui passe l'indique
+#     (« ... (12 similar suppressed) »)
+#
+#   import rate_log
+#   rate_log.log('balls_table', "ERROR: DAT Table 'x' not found!")
+#   rate_log.log('row', 'ERROR reading row 3', interval=10.0)
+#
+#   log = rate_log.RateLog(interval=2.0, write=debug)   # instance dédiée
+#   log('key', 'message', now=absTime.seconds)
+#
+# Auto-test hors TouchDesigner : python rate_log.py
+# =============================================================================
+
+import time
+
+INTERVAL = 5.0   # s entre deux messages d'une même clé
+
+
+class RateLog:
+    """
+    Args:
+        interval: secondes minimum entre deux messages d'une même clé
+        write: fonction(texte) qui affiche réellement (print par défaut)
+    """
+
+    def __init__(self, interval=INTERVAL, write=print):
+        self.interval = interval
+        self.write = write
+        self.last_time = {}    # {clé: temps du dernier message affiché}
+        self.suppressed = {}   # {clé: messages bloqués depuis}
+        self.stats = {'written': 0, 'suppressed': 0}
+
+    def __call__(self, key, message, now=None, interval=None):
+        """Affiche message si la fenêtre de la clé est ouverte ; True si affiché."""
+        if now is None:
+            now = time.monotonic()
+        if interval is None:
+            interval = self.interval
+        last = self.last_time.get(key)
+        if last is not None and now - last < interval:
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            self.stats['suppressed'] += 1
+            return False
+        skipped = self.suppressed.pop(key, 0)
+        if skipped:
+            message = '{} ({} similar suppressed)'.format(message, skipped)
+        self.last_time[key] = now
+        self.stats['written'] += 1
+        self.write(message)
+        return True
+
+    def reset(self, key=None):
+        """Rouvre la fenêtre d'une clé (ou de toutes)."""
+        if key is None:
+            self.last_time.clear()
+            self.suppressed.clear()
+        else:
+            self.last_time.pop(key, None)
+            self.suppressed.pop(key, None)
+
+
+_default = RateLog()
+
+
+def log(key, message, now=None, interval=None):
+    """Message limité en débit sur le logger partagé du module."""
+    return _default(key, message, now, interval)
+
+
+# =============================================================================
+# AUTO-TEST (hors TouchDesigner)
+# =============================================================================
+
+def _selfcheck():
+    out = []
+    lg = RateLog(interval=1.0, write=out.append)
+    for k in range(90):                   # 1.5 s à 60 fps
+        lg('a', 'msg a', now=k / 60.0)
+    lg('b', 'msg b', now=1.5)             # autre clé : indépendante
+    ok = out == ['msg a', 'msg a (59 similar suppressed)', 'msg b']
+    ok &= lg.stats == {'written': 3, 'suppressed': 88}
+    lg.reset('a')                         # fenêtre rouverte, compteur remis à zéro
+    ok &= lg('a', 'again', now=1.6) and out[-1] == 'again'
+    print(out)
+    print('OK' if ok else 'FAIL')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(_selfcheck())
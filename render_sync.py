@@ -0,0 +1,318 @@
+# =============================================================================
+# RENDER SYNC - État du rendu web regroupé, envoyé une fois par frame
+# =============================================================================
+# Module partagé (Text DAT 'render_sync'), utilisé par hero_control.py et
+# balls_position_updater.py ; flush par l'Execute DAT render_sync_flush.py.
+#
+# hero_control.onValueChange est appelé une fois par channel modifié (un
+# mouvement en diagonale = 2 appels), et chaque appel exécutait sa propre
+# chaîne executeJavaScript. Ici les scripts ne font que déposer l'état :
+#
+#   import render_sync
+#   render_sync.set_hero(x, y)
+#   render_sync.set_hand_active(True)
+#   render_sync.set_connect_distance(480)
+#   render_sync.set_balls([[x, y], ...])
+#   render_sync.call('showHero')            # événement ponctuel
+#   render_sync.on_event('heroAnimDone', fn) # message retour de la page
+#   render_sync.snapshot()                   # état courant (metaball_top.py)
+#
+# et en fin de frame :
+#
+#   render_sync.flush(op('webrender1'))
+#
+# -> UN seul window.applyState({...}) avec seulement les champs qui ont changé
+#    depuis le dernier envoi (delta). Rien n'est envoyé si rien n'a changé.
+#
+# Boules : layout_store.LayoutStore versionné. La page confirme chaque
+# version reçue ({event: 'layoutAck', version}) ; seules les boules modifiées
+# partent, et celles non confirmées après layout_store.RESEND_AFTER repartent.
+# Avec le repli executeJavaScript (pas de voie retour), l'envoi vaut accusé.
+#
+# Format (voir window.applyState dans metaball.html) :
+#   { events: [[nom, [args]], ...],  hand: bool,  connect: nombre,
+#     balls: {index: [x, y]},  layout: version,  hero: [x, y],
+#     bridges: [0/1 par boule] }
+#
+# Transport : si un serveur ws_server a des clients, le delta part en frame
+# binaire (pack_state) sur le WebSocket ; sinon repli executeJavaScript.
+#
+# Frame binaire (little-endian) :
+#   en-tête 12 octets : magic b'TFL1' | version u8 | flags u8 | n_balls u16 | seq u32
+#   puis float32 dans l'ordre des flags présents :
+#     FLAG_HERO (2) | FLAG_HAND (1) | FLAG_CONNECT (1) | FLAG_BALLS (2 * n) | FLAG_BRIDGES (n)
+#     | FLAG_LAYOUT (1, version des boules)
+#   boules non modifiées : NaN (ignorées par la page)
+#   (12 octets -> Float32Array(buffer, 12) directement côté JS)
+# Les événements (noms de fonctions) partent avant, en frame texte JSON.
+# =============================================================================
+
+import json
+import struct
+import time
+
+import numpy as np
+
+import layout_store
+
+# Arrondi des positions (pixels) : évite de renvoyer du bruit flottant
+POSITION_DECIMALS = layout_store.DECIMALS
+
+# Protocole binaire
+MAGIC = b'TFL1'
+VERSION = 1
+HEADER = struct.Struct('<4sBBHI')
+FLAG_HERO = 1
+FLAG_HAND = 2
+FLAG_CONNECT = 4
+FLAG_BALLS = 8
+FLAG_BRIDGES = 16
+FLAG_LAYOUT = 32
+
+_pending = {}        # champ -> valeur déposée ce frame
+_events = []         # [[nom, [args]], ...] dans l'ordre
+_sent = {}           # champ -> dernière valeur envoyée
+layout = layout_store.LayoutStore(decimals=POSITION_DECIMALS)   # boules, versionnées
+
+stats = {'flushes': 0, 'idle': 0, 'fields': 0, 'binary': 0, 'js': 0, 'ws_lost': 0}
+_seq = [0]
+
+
+def _pos(x, y):
+    return [round(float(x), POSITION_DECIMALS), round(float(y), POSITION_DECIMALS)]
+
+
+def set_hero(x, y):
+    _pending['hero'] = _pos(x, y)
+
+
+def set_hand_active(active):
+    _pending['hand'] = bool(active)
+
+
+def set_connect_distance(distance):
+    _pending['connect'] = float(distance)
+
+
+def set_balls(positions):
+    """Positions [[x, y], ...] ou array (N, 2) ; seuls les index modifiés partent au flush."""
+    layout.set(positions)
+
+
+def set_ball(index, x, y):
+    """Position d'une seule boule (animation boule par boule)."""
+    layout.set_ball(index, x, y)
+
+
+def set_bridges(bridges):
+    """Bridge actif (0/1) par boule, dans l'ordre de la disposition."""
+    _pending['bridges'] = [1 if b else 0 for b in bridges]
+
+
+def call(name, *args):
+    """Événement ponctuel (window.<name>(*args)), exécuté avant les champs."""
+    _events.append([name, list(args)])
+
+
+# --- Événements venant du renderer (window.sendToTD -> ws_server) ---
+_handlers = {}   # nom d'événement -> fonction(message dict)
+
+
+def on_event(name, handler):
+    """Enregistre handler(msg) pour {event: name, ...} envoyé par la page."""
+    _handlers[name] = handler
+
+
+def dispatch(messages):
+    """Appelle les handlers pour des messages texte JSON (server.poll())."""
+    for text in messages:
+        try:
+            msg = json.loads(text)
+        except ValueError:
+            continue
+        handler = _handlers.get(msg.get('event')) if isinstance(msg, dict) else None
+        if handler is not None:
+            handler(msg)
+
+
+def _on_layout_ack(msg):
+    layout.ack(msg.get('version'))
+
+
+on_event('layoutAck', _on_layout_ack)
+
+
+def snapshot():
+    """
+    État courant complet (déposé ce frame, sinon dernier envoyé), pour un
+    renderer local (metaball_top.py) :
+      {'hero': [x, y] | None, 'hand': bool, 'connect': nombre | None,
+       'balls': [[x, y], ...] dans l'ordre des index, 'bridges': [...] | None}
+    """
+    state = dict(_sent)
+    state.update(_pending)
+    return {
+        'hero': state.get('hero'),
+        'hand': state.get('hand', False),
+        'connect': state.get('connect'),
+        'balls': layout.positions.tolist(),
+        'bridges': state.get('bridges'),
+    }
+
+
+def build(now=None):
+    """Delta à envoyer (dict) ou None si rien n'a changé. Ne modifie pas l'état."""
+    if now is None:
+        now = time.monotonic()
+    delta = {}
+    if _events:
+        delta['events'] = list(_events)
+    for key, value in _pending.items():
+        # après un événement (showHero, retractBridges...) le hero est toujours
+        # renvoyé, comme les appels d'origine qui suivaient l'événement
+        if _sent.get(key) != value or (key == 'hero' and _events):
+            delta[key] = value
+    idx = layout.pending(now)
+    if idx.size:
+        delta['balls'] = {str(i): layout.positions[i].tolist() for i in idx}
+        delta['layout'] = layout.version
+    return delta or None
+
+
+def pack_state(delta, seq=0):
+    """Frame binaire (sans les événements) pour un delta de build()."""
+    flags = 0
+    parts = []
+    if 'hero' in delta:
+        flags |= FLAG_HERO
+        parts.append(delta['hero'])
+    if 'hand' in delta:
+        flags |= FLAG_HAND
+        parts.append([1.0 if delta['hand'] else 0.0])
+    if 'connect' in delta:
+        flags |= FLAG_CONNECT
+        parts.append([delta['connect']])
+    # boules et bridges partagent n (une entrée par boule)
+    balls = delta.get('balls') or {}
+    bridges = delta.get('bridges')
+    n = max([int(k) + 1 for k in balls] + [len(bridges) if bridges is not None else 0])
+    if balls:
+        # seulement les boules modifiées ; les autres en NaN (ignorées par la page)
+        arr = np.full((n, 2), np.nan)
+        for k, p in balls.items():
+            arr[int(k)] = p
+        flags |= FLAG_BALLS
+        parts.append(arr.ravel())
+    if bridges is not None:
+        flags |= FLAG_BRIDGES
+        parts.append(list(bridges) + [0] * (n - len(bridges)))
+    if 'layout' in delta:
+        # float32 : exact jusqu'à 2^24 versions
+        flags |= FLAG_LAYOUT
+        parts.append([delta['layout']])
+    payload = np.concatenate([np.asarray(p, dtype='<f4').ravel() for p in parts]) if parts \
+        else np.zeros(0, dtype='<f4')
+    return HEADER.pack(MAGIC, VERSION, flags, n, seq & 0xFFFFFFFF) + payload.astype('<f4').tobytes()
+
+
+def unpack_state(data):
+    """Inverse de pack_state (client de remplacement / tests)."""
+    magic, version, flags, n, seq = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('frame inconnue')
+    f = np.frombuffer(data, dtype='<f4', offset=HEADER.size)
+    out = {'seq': seq}
+    k = 0
+    if flags & FLAG_HERO:
+        out['hero'] = [float(f[k]), float(f[k + 1])]
+        k += 2
+    if flags & FLAG_HAND:
+        out['hand'] = bool(f[k])
+        k += 1
+    if flags & FLAG_CONNECT:
+        out['connect'] = float(f[k])
+        k += 1
+    if flags & FLAG_BALLS:
+        out['balls'] = f[k:k + 2 * n].reshape(n, 2).tolist()
+        k += 2 * n
+    if flags & FLAG_BRIDGES:
+        out['bridges'] = [int(v) for v in f[k:k + n]]
+        k += n
+    if flags & FLAG_LAYOUT:
+        out['layout'] = int(f[k])
+    return out
+
+
+def flush(web, server=None, now=None):
+    """
+    Envoie le delta du frame en un seul message ; vide l'état du frame.
+
+    server : ws_server.WsServer optionnel ; s'il a des clients, frame
+    binaire sur le WebSocket, sinon executeJavaScript sur web. Le delta a
+    deux parties (événements en frame texte, champs en frame binaire) : seule
+    la partie qu'aucun client n'a reçue repasse par executeJavaScript, une
+    page qui a eu les événements ne les rejoue pas. Sans renderer du tout, la
+    partie non reçue est gardée pour le frame suivant.
+    now : temps en secondes (absTime.seconds) pour le renvoi des boules
+    non confirmées ; horloge du système par défaut.
+    Retourne True si tout le delta a été livré.
+    """
+    if now is None:
+        now = time.monotonic()
+    if server is not None and server.take_joined():
+        reset()
+    delta = build(now)
+    if delta is None:
+        stats['idle'] += 1
+        _pending.clear()
+        return False
+    has_state = len(delta) > ('events' in delta)
+    rest = delta                       # parties pas encore livrées
+    if server is not None and server.has_clients():
+        # broadcast_* renvoient le nombre de clients atteints : 0 = tous
+        # déconnectés entre-temps -> cette partie seulement part en repli
+        rest = dict(delta)
+        if 'events' in delta:
+            if server.broadcast_text(json.dumps({'events': delta['events']}, separators=(',', ':'))) > 0:
+                del rest['events']
+        if has_state:
+            if server.broadcast_binary(pack_state(delta, _seq[0])) > 0:
+                rest = {'events': rest['events']} if 'events' in rest else {}
+            _seq[0] += 1
+        if rest:
+            stats['ws_lost'] += 1
+        else:
+            stats['binary'] += 1
+    via_js = False
+    if rest and web is not None:
+        js = 'if(window.applyState) window.applyState({});'.format(json.dumps(rest, separators=(',', ':')))
+        web.executeJavaScript(js)
+        stats['js'] += 1
+        via_js = 'balls' in rest
+        rest = {}
+    if 'events' not in rest:
+        del _events[:]
+    state_sent = has_state and len(rest) == ('events' in rest)
+    if state_sent:
+        if 'balls' in delta:
+            layout.mark_sent(now)
+            if via_js:
+                # executeJavaScript n'a pas de voie retour : l'envoi vaut accusé
+                layout.ack(layout.version)
+        _sent.update(_pending)
+    if not has_state or state_sent:
+        _pending.clear()
+    if len(rest) == len(delta):
+        # pas de renderer : tout est gardé pour le prochain frame
+        return False
+    stats['flushes'] += 1
+    stats['fields'] += len(delta) - len(rest)
+    return not rest
+
+
+def reset():
+    """Tout renvoyer au prochain flush (page rechargée / nouveau client) : le dernier état envoyé est redéposé."""
+    for key, value in _sent.items():
+        _pending.setdefault(key, value)
+    _sent.clear()
+    layout.reset()
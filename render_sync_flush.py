@@ -0,0 +1,76 @@
+# =====================================================
+# Execute DAT : render_sync_flush
+# Purpose:
+#   Sends the render state collected during the frame
+#   (render_sync.py) to the renderer as ONE message,
+#   changed fields only:
+#     - packed binary frame over the local WebSocket
+#       (ws_server.py) when metaball.html is connected
+#     - window.applyState({...}) via executeJavaScript
+#       on 'webrender1' otherwise (fallback)
+#   Balls are versioned (layout_store.py): the page
+#   acknowledges each version (layoutAck), unacknowledged
+#   balls are sent again.
+#   Runs as the last stage of frame_pipeline_exec
+#   (after proximity_calculator) when that DAT is active.
+#   Frame End: ON
+# =====================================================
+
+import frame_pipeline
+import render_sync
+import ws_server
+import op_cache
+
+# --- CONFIG ---
+WEB_RENDER    = 'webrender1'
+USE_WEBSOCKET = True
+WS_PORT       = ws_server.DEFAULT_PORT   # must match WS_URL in metaball.html
+
+ops = op_cache.OpCache(op, 'render_sync_flush')
+
+def _start_server():
+    # DAT re-executed: release the port held by the previous server
+    old = me.storage.get('ws_server')
+    if old is not None:
+        old.stop()
+        me.storage['ws_server'] = None
+    if not USE_WEBSOCKET:
+        return None
+    server = ws_server.WsServer(port=WS_PORT)
+    try:
+        server.start()
+    except OSError as e:
+        debug('render_sync_flush: WebSocket port {} unavailable, executeJavaScript only ({})'.format(WS_PORT, e))
+        return None
+    me.storage['ws_server'] = server
+    return server
+
+server = _start_server()
+
+def onFrameEnd(frame):
+    if frame_pipeline.drives('render_sync_flush', absTime.frame):
+        return    # frame_pipeline_exec runs run_stage()
+    run_stage(None)
+    return
+
+def run_stage(ctx):
+    if server is not None:
+        # events sent back by the page (animation done / interrupted...)
+        render_sync.dispatch(server.poll())
+    # absTime.seconds: resend timing for balls the page has not acknowledged
+    render_sync.flush(ops(WEB_RENDER), server, absTime.seconds)
+    return
+
+# --- OTHER CALLBACKS ---
+def onStart():
+    # new page / project start: resend the full state
+    render_sync.reset()
+    return
+
+def onExit():
+    if server is not None:
+        server.stop()
+    return
+
+def onFrameStart(frame):
+    return
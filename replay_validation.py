@@ -0,0 +1,319 @@
+"""
+Bump Validation Replay Harness
+==============================
+Runs bump_validation.py (or exec_blob_guardexec_blob_guard) OUTSIDE
+TouchDesigner on recorded info_bumpblob / info_dustblob streams.
+
+- Feeds each recorded frame to _process_frame through the headless
+  op() / me.storage / absTime environment of td_shim/.
+- Checks the published outputs (bump_checked rows + bump_out / Constant
+  CHOP values) against a golden file.
+- Reports frames per second and a per-stage timing breakdown.
+
+Recording formats:
+  CSV : frame,source,<blob columns...>     (source = bump | dust)
+        One line per blob. A frame with no blob for a source still
+        needs one line with only frame,source filled (empty table).
+  NPZ : frame (K,), source (K,), columns (C,), values (K, C) float
+        (NaN = empty cell)
+
+Reference capture (checked by tests/test_behaviour.py):
+  tests/data/blob_stream.csv, 120 frames: a drifting bump, a bump under
+  dust, a jumping bump, a tiny bump, empty frames. Golden outputs:
+  tests/data/blob_stream_golden.csv        (bump_validation.py)
+  tests/data/blob_stream_guard_golden.csv  (exec_blob_guardexec_blob_guard)
+  Regenerate them with --write-golden only for an intended behaviour change.
+
+Usage:
+  python replay_validation.py show.csv --write-golden show_golden.csv
+  python replay_validation.py show.csv --golden show_golden.csv
+  python replay_validation.py show.npz --script exec_blob_guardexec_blob_guard --repeat 5
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+if HERE not in sys.path:
+    sys.path.insert(0, HERE)
+
+import blob_snapshot
+import td_shim
+
+DEFAULT_SCRIPT = os.path.join(HERE, 'bump_validation.py')
+FLOAT_TOL = 1e-5
+
+# Stage name -> functions of the validation script timed under it
+# ('module.name' = attribute of a shared module, patched for the timed pass)
+STAGES = {
+    'parse':       ('blob_snapshot.get', 'blob_snapshot.BlobSnapshot'),
+    'kinematic':   ('_fast_reject',),
+    'dust_pair':   ('_best_dust_for_bump', '_candidate_reject', '_passes_size_guard'),
+    'diagnostics': ('_write_out', '_write_debug'),
+    'publish':     ('_publish', '_update_constant'),
+}
+
+
+# =============================================================================
+# Recorded streams
+# =============================================================================
+
+def load_stream(path):
+    """Returns ({frame: {'bump': [header, rows], 'dust': [header, rows]}}, frames)."""
+    if path.endswith('.npz'):
+        return _load_npz(path)
+    return _load_csv(path)
+
+
+def _add(frames, frame, source, header, row):
+    f = frames.setdefault(frame, {'bump': None, 'dust': None})
+    if f[source] is None:
+        f[source] = [header, []]
+    if row is not None:
+        f[source][1].append(row)
+
+
+def _load_csv(path):
+    frames = {}
+    with open(path, newline='') as fh:
+        reader = csv.reader(fh)
+        header = next(reader)
+        cols = header[2:]
+        for line in reader:
+            if not line:
+                continue
+            frame, source = int(line[0]), line[1].strip()
+            cells = line[2:] + [''] * (len(cols) - len(line[2:]))
+            row = cells if any(c != '' for c in cells) else None
+            _add(frames, frame, source, cols, row)
+    return frames, sorted(frames)
+
+
+def _load_npz(path):
+    import numpy as np
+    data = np.load(path, allow_pickle=False)
+    cols = [str(c) for c in data['columns']]
+    frames = {}
+    for frame, source, vals in zip(data['frame'], data['source'], data['values']):
+        cells = ['' if v != v else ('%d' % v if c in ('id', 'ID', 'index', 'blobid') else repr(float(v)))
+                 for c, v in zip(cols, vals)]
+        row = cells if any(c != '' for c in cells) else None
+        _add(frames, int(frame), str(source), cols, row)
+    return frames, sorted(frames)
+
+
+# =============================================================================
+# TouchDesigner environment (td_shim)
+# =============================================================================
+
+class ReplayEnv(td_shim.Env):
+    """td_shim.Env with the operators bump_validation.py reads and writes."""
+
+    def __init__(self, fps=60.0):
+        td_shim.Env.__init__(self, fps=fps)
+        self.me = None
+        for name in ('info_bumpblob', 'info_dustblob', 'bump_checked', 'bump_dust_debug'):
+            self.table(name)
+        self.script_chop('bump_out')
+        for name in ('bump_x', 'bump_y', 'dust_x', 'dust_y'):
+            self.constant(name)
+
+    def set_frame(self, frame, bump_table, dust_table):
+        self.absTime.set(frame)
+        self.ops['info_bumpblob'].load(bump_table)
+        self.ops['info_dustblob'].load(dust_table)
+
+
+def load_script(path, env):
+    """Executes a validation script (unmodified) in env; returns its namespace."""
+    module = env.load(path, name='bump_validation')
+    env.me = env.op('bump_validation')
+    return module.__dict__
+
+
+# =============================================================================
+# Stage timing
+# =============================================================================
+
+class StageTimer:
+    def __init__(self):
+        self.totals = {}
+        self._depth = {}
+
+    def wrap(self, stage, fn):
+        totals, depth = self.totals, self._depth
+        totals.setdefault(stage, 0.0)
+        depth.setdefault(stage, 0)
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            if depth[stage]:
+                return fn(*args, **kwargs)    # nested call, already timed
+            depth[stage] += 1
+            t0 = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                totals[stage] += clock() - t0
+                depth[stage] -= 1
+        return timed
+
+    def instrument(self, ns):
+        """Wraps the STAGES functions; returns the patched shared-module attributes."""
+        patched = []
+        for stage, names in STAGES.items():
+            for name in names:
+                if '.' in name:
+                    mod_name, attr = name.split('.', 1)
+                    mod = ns.get(mod_name)
+                    if mod is not None and callable(getattr(mod, attr, None)):
+                        # patched on the module itself: calls from inside it
+                        # (blob_snapshot.get -> BlobSnapshot) are timed too
+                        patched.append((mod, attr, getattr(mod, attr)))
+                        setattr(mod, attr, self.wrap(stage, getattr(mod, attr)))
+                elif callable(ns.get(name)):
+                    ns[name] = self.wrap(stage, ns[name])
+        return patched
+
+
+def _restore(patched):
+    for mod, attr, fn in reversed(patched):
+        setattr(mod, attr, fn)
+
+
+# =============================================================================
+# Replay
+# =============================================================================
+
+def _outputs(env, frame):
+    """Published outputs of one frame as CSV rows: frame, kind, values..."""
+    rows = []
+    for r in env.ops['bump_checked'].rows()[1:]:
+        rows.append([frame, 'checked'] + r)
+    arr = env.me.storage.get('out')
+    if arr is not None:
+        for slot in range(arr.shape[1]):
+            rows.append([frame, 'out', slot] + ['%.6f' % v for v in arr[:, slot]])
+    else:
+        n = 4
+        vals = [env.ops[k].values(n) for k in ('bump_x', 'bump_y', 'dust_x', 'dust_y')]
+        for slot in range(n):
+            rows.append([frame, 'out', slot] + ['%.6f' % v[slot] for v in vals])
+    return rows
+
+
+def replay(script, frames, order, timed=True):
+    """Runs every recorded frame once. Returns (outputs, seconds, stage totals, cooks)."""
+    blob_snapshot.reset()
+    env = ReplayEnv()
+    ns = load_script(script, env)
+    timer = StageTimer()
+    patched = timer.instrument(ns) if timed else []
+    process = ns['_process_frame']
+    outputs = []
+    empty = lambda t: t if t is not None else [[], []]
+    elapsed = 0.0
+    clock = time.perf_counter
+    try:
+        for frame in order:
+            data = frames[frame]
+            bh, brows = empty(data['bump'])
+            dh, drows = empty(data['dust'])
+            env.set_frame(frame, [bh] + brows if bh else [], [dh] + drows if dh else [])
+            t0 = clock()
+            process()
+            elapsed += clock() - t0
+            outputs.extend(_outputs(env, frame))
+    finally:
+        _restore(patched)
+    return outputs, elapsed, timer.totals, env.ops['bump_out'].cooks
+
+
+def write_golden(path, outputs):
+    with open(path, 'w', newline='') as fh:
+        csv.writer(fh).writerows(outputs)
+
+
+def compare_golden(path, outputs):
+    """Returns a list of human-readable mismatches (empty = identical)."""
+    with open(path, newline='') as fh:
+        golden = [r for r in csv.reader(fh) if r]
+    got = [[str(c) for c in r] for r in outputs]
+    problems = []
+    if len(golden) != len(got):
+        problems.append('row count: golden %d, replay %d' % (len(golden), len(got)))
+    for i, (g, o) in enumerate(zip(golden, got)):
+        if len(g) != len(o) or any(not _same(a, b) for a, b in zip(g, o)):
+            problems.append('row %d: golden %s != replay %s' % (i, g, o))
+            if len(problems) >= 20:
+                problems.append('...')
+                break
+    return problems
+
+
+def _same(a, b):
+    if a == b:
+        return True
+    try:
+        return abs(float(a) - float(b)) <= FLOAT_TOL
+    except ValueError:
+        return False
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Replay recorded blob streams through bump validation.')
+    ap.add_argument('stream', help='recorded info_bumpblob/info_dustblob stream (.csv or .npz)')
+    ap.add_argument('--script', default=DEFAULT_SCRIPT, help='validation script to run')
+    ap.add_argument('--golden', help='compare published outputs with this golden file')
+    ap.add_argument('--write-golden', help='write published outputs to this golden file')
+    ap.add_argument('--repeat', type=int, default=1, help='replay N times for throughput')
+    args = ap.parse_args(argv)
+
+    frames, order = load_stream(args.stream)
+    if not order:
+        print('No frames in %s' % args.stream)
+        return 1
+
+    # untimed pass for correctness (no wrapper overhead in outputs)
+    outputs, _, _, _ = replay(args.script, frames, order, timed=False)
+    status = 0
+    if args.write_golden:
+        write_golden(args.write_golden, outputs)
+        print('Golden written: %s (%d rows)' % (args.write_golden, len(outputs)))
+    if args.golden:
+        problems = compare_golden(args.golden, outputs)
+        if problems:
+            print('GOLDEN MISMATCH (%d)' % len(problems))
+            for p in problems:
+                print('  ' + p)
+            status = 2
+        else:
+            print('Golden OK: %s' % args.golden)
+
+    # throughput: plain passes, then one instrumented pass for the breakdown
+    total = 0.0
+    for _ in range(max(1, args.repeat)):
+        _, secs, _, cooks = replay(args.script, frames, order, timed=False)
+        total += secs
+    n = len(order) * max(1, args.repeat)
+    _, staged_secs, stages, _ = replay(args.script, frames, order, timed=True)
+
+    print('Script : %s' % os.path.basename(args.script))
+    print('Frames : %d x %d' % (len(order), max(1, args.repeat)))
+    print('FPS    : %.1f  (%.3f ms/frame)' % (n / total if total > 0 else float('inf'),
+                                              1000.0 * total / n))
+    print('Cooks  : bump_out %d' % cooks)
+    print('Stages (instrumented pass, ms/frame):')
+    for stage in STAGES:
+        if stage in stages:
+            ms = 1000.0 * stages[stage] / len(order)
+            share = 100.0 * stages[stage] / staged_secs if staged_secs > 0 else 0.0
+            print('  %-12s %8.4f  %5.1f%%' % (stage, ms, share))
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,525 @@
+# =============================================================================
+# SYNTH DEPTH - Scènes de profondeur synthétiques (charge et précision)
+# =============================================================================
+# Outil hors TouchDesigner (NumPy), pour tester bump_detection.py à des
+# nombres de bumps, résolutions et niveaux de bruit impossibles à monter
+# physiquement.
+#
+# Une scène produit, pour chaque frame, ce que voit bump_detection.cook :
+#   - null_Kinect : gris (h, w) float32, fond BASE, pression = pixels SOMBRES
+#     (bump_detection inverse le gris) ; K bumps gaussiens elliptiques
+#     (axes sx, sy) sur des trajectoires réglables : x0 + v t + a sin(w t + p),
+#     apparition / disparition avec rampe (appui / relâchement)
+#   - bruit capteur (gaussien), dropout (pixels invalides = DROPOUT_VALUE,
+#     le Kinect renvoie 0 : noir, comme une pression maximale), dérive lente
+#     du fond (sinus + pente) et inclinaison du tissu
+#   - null_dust : comme la détection de contour de poussière, anneaux NOIRS
+#     sur fond BLANC ; chaque poussière laisse aussi une petite tache sombre
+#     dans null_Kinect
+#   - cache_null : référence, fond sans bump à la première frame
+#   - vérité terrain par frame : (K, 4) présent, x, y, amplitude, en pixels
+#     de l'array (même repère que les sorties de bump_detection)
+#
+# Par lots : les noyaux étant séparables, la pression de TOUS les bumps d'un
+# lot est un seul produit matriciel (n, h, K) @ (n, K, w) (comme
+# metaball_field). Le bruit vient d'une banque pré-tirée (NOISE_BANK images
+# un peu plus grandes que la frame) : chaque frame en lit une fenêtre décalée
+# au hasard, sans tirer h x w gaussiennes (~75 % du temps sinon) ; le dropout
+# tire seulement les indices des pixels invalides. Tirages par frame (graine
+# = (seed, frame)) : une frame ne dépend que de la scène et de son numéro.
+#
+#   import synth_depth
+#   scene = synth_depth.Scene.preset('nfov_binned', bumps=3, noise=0.01)
+#   for frames, arrays, truth in scene.batches(600):
+#       arrays['null_Kinect']      # (n, h, w) float32
+#   scene.write('recordings/synth1', 3600)   # format de depth_recorder.py
+#   synth_depth.recall(scene, 600)           # bump_detection.py via td_shim
+#
+# Hors TouchDesigner :
+#   python synth_depth.py                                        # auto-test
+#   python synth_depth.py --resolution wfov_unbinned --bumps 4 --out recordings/synth_wfov --frames 3600
+#   python synth_depth.py --resolution nfov_binned --bumps 2 --noise 0.02 --recall 600
+#   python synth_depth.py --bench                                # frames/s générées par résolution
+# =============================================================================
+
+import json
+import os
+import time
+
+import numpy as np
+
+# Résolutions (largeur, hauteur) : modes de profondeur du Kinect Azure + carré de la scène
+RESOLUTIONS = {
+    'nfov_unbinned': (640, 576),
+    'nfov_binned':   (320, 288),
+    'wfov_binned':   (512, 512),
+    'wfov_unbinned': (1024, 1024),
+    'square_1080':   (1080, 1080),
+}
+
+FPS = 60.0
+BASE = 0.8             # gris du tissu au repos
+NOISE = 0.01           # écart-type du bruit capteur
+DROPOUT = 0.0          # fraction de pixels invalides par frame
+DROPOUT_VALUE = 0.0    # valeur d'un pixel invalide (Kinect : profondeur 0)
+DRIFT = 0.02           # amplitude de la dérive du fond
+DRIFT_PERIOD = 120.0   # s
+DRIFT_RATE = 0.0       # pente de la dérive (par seconde)
+TILT = 0.02            # inclinaison du tissu (écart de gris d'un bord à l'autre)
+DUST_DEPTH = 0.15      # tache d'une poussière dans null_Kinect
+DUST_EDGE = 0.75       # demi-épaisseur de l'anneau de contour (pixels)
+BATCH = 16             # frames par lot
+NOISE_BANK = 8         # images de bruit pré-tirées
+NOISE_PAD = 64         # marge de décalage de la fenêtre de bruit (pixels)
+
+# Paramètres d'une trajectoire de bump (positions en pixels, temps en secondes)
+TRACK_FIELDS = ('x0', 'y0', 'vx', 'vy', 'ax', 'ay', 'wx', 'wy', 'px', 'py',
+                'sx', 'sy', 'amp', 'start', 'end', 'ramp')
+TRACK_DTYPE = np.dtype([(f, '<f8') for f in TRACK_FIELDS])
+DUST_FIELDS = ('x', 'y', 'radius', 'start', 'end')
+DUST_DTYPE = np.dtype([(f, '<f8') for f in DUST_FIELDS])
+
+TRUTH_FILE = 'truth.npy'
+SCENE_FILE = 'scene.json'
+
+
+def track(x0, y0, vx=0.0, vy=0.0, ax=0.0, ay=0.0, wx=0.0, wy=0.0, px=0.0, py=0.0,
+          sx=8.0, sy=8.0, amp=0.4, start=0.0, end=np.inf, ramp=0.15):
+    """Une trajectoire : x(t) = x0 + vx t + ax sin(wx t + px) (idem y), sigma sx / sy, pression amp."""
+    return np.array((x0, y0, vx, vy, ax, ay, wx, wy, px, py, sx, sy, amp, start, end, ramp),
+                    dtype=TRACK_DTYPE)
+
+
+def dust(x, y, radius=4.0, start=0.0, end=np.inf):
+    return np.array((x, y, radius, start, end), dtype=DUST_DTYPE)
+
+
+def random_tracks(count, width, height, rng, duration=60.0):
+    """count trajectoires aléatoires : dérive lente + oscillation, appuis de 2 s à duration / 2."""
+    t = np.zeros(count, dtype=TRACK_DTYPE)
+    scale = width / 320.0
+    t['x0'] = rng.uniform(0.2, 0.8, count) * width
+    t['y0'] = rng.uniform(0.2, 0.8, count) * height
+    t['vx'] = rng.uniform(-0.03, 0.03, count) * width
+    t['vy'] = rng.uniform(-0.03, 0.03, count) * height
+    t['ax'] = rng.uniform(0.0, 0.12, count) * width
+    t['ay'] = rng.uniform(0.0, 0.12, count) * height
+    t['wx'] = rng.uniform(0.2, 1.2, count)
+    t['wy'] = rng.uniform(0.2, 1.2, count)
+    t['px'] = rng.uniform(0, 2 * np.pi, count)
+    t['py'] = rng.uniform(0, 2 * np.pi, count)
+    sigma = rng.uniform(6.0, 12.0, count) * scale
+    ratio = rng.uniform(0.6, 1.5, count)            # ellipse
+    t['sx'] = sigma * np.sqrt(ratio)
+    t['sy'] = sigma / np.sqrt(ratio)
+    t['amp'] = rng.uniform(0.3, 0.6, count)
+    t['start'] = rng.uniform(0.0, duration * 0.25, count)
+    t['end'] = t['start'] + rng.uniform(2.0, max(2.0, duration * 0.5), count)
+    t['ramp'] = 0.15
+    return t
+
+
+def random_dust(count, width, height, rng, duration=60.0):
+    d = np.zeros(count, dtype=DUST_DTYPE)
+    d['x'] = rng.uniform(0.05, 0.95, count) * width
+    d['y'] = rng.uniform(0.05, 0.95, count) * height
+    d['radius'] = rng.uniform(3.0, 6.0, count) * width / 320.0
+    d['start'] = rng.uniform(0.0, duration * 0.5, count)
+    d['end'] = d['start'] + rng.uniform(1.0, duration, count)
+    return d
+
+
+class Scene:
+    """
+    Args:
+        width, height: résolution (voir RESOLUTIONS / Scene.preset)
+        tracks: array TRACK_DTYPE (track(...) / random_tracks) ou None
+        bumps: nombre de trajectoires aléatoires si tracks est None
+        specks: array DUST_DTYPE ou None ; dust : nombre aléatoire sinon
+        noise, dropout, drift, tilt: défauts du module
+        duration: durée (s) sur laquelle les trajectoires aléatoires sont réparties
+        seed: graine (trajectoires, bruit)
+    """
+
+    def __init__(self, width=320, height=288, tracks=None, bumps=3, specks=None, dust=2,
+                 fps=FPS, base=BASE, noise=NOISE, dropout=DROPOUT, dropout_value=DROPOUT_VALUE,
+                 drift=DRIFT, drift_period=DRIFT_PERIOD, drift_rate=DRIFT_RATE, tilt=TILT,
+                 dust_depth=DUST_DEPTH, duration=60.0, seed=0):
+        self.width, self.height = int(width), int(height)
+        self.fps = float(fps)
+        self.base, self.noise = base, noise
+        self.dropout, self.dropout_value = dropout, dropout_value
+        self.drift, self.drift_period, self.drift_rate = drift, drift_period, drift_rate
+        self.tilt, self.dust_depth = tilt, dust_depth
+        self.duration, self.seed = duration, seed
+        rng = np.random.default_rng(seed)
+        self.tracks = np.atleast_1d(tracks) if tracks is not None \
+            else random_tracks(bumps, self.width, self.height, rng, duration)
+        self.specks = np.atleast_1d(specks) if specks is not None \
+            else random_dust(dust, self.width, self.height, rng, duration)
+        self._xs = np.arange(self.width, dtype=np.float32)
+        self._ys = np.arange(self.height, dtype=np.float32)
+        # inclinaison fixe du tissu (plan), ajoutée au fond
+        self._plane = (self.tilt * (self._xs[None, :] / max(self.width - 1, 1) - 0.5)
+                       + 0.5 * self.tilt * (self._ys[:, None] / max(self.height - 1, 1) - 0.5)).astype(np.float32)
+        self._rings = [self._ring(s) for s in self.specks]
+        self._bank = None
+
+    @classmethod
+    def preset(cls, name, **kw):
+        w, h = RESOLUTIONS[name]
+        return cls(w, h, **kw)
+
+    # --- vérité terrain ---
+
+    def seconds(self, frames):
+        return np.asarray(frames, dtype=np.float64) / self.fps
+
+    def positions(self, frames):
+        """Centres (n, K, 2) et pression courante (n, K) des bumps (0 = absent)."""
+        t = self.tracks
+        s = self.seconds(frames)[:, None]
+        x = t['x0'] + t['vx'] * s + t['ax'] * np.sin(t['wx'] * s + t['px'])
+        y = t['y0'] + t['vy'] * s + t['ay'] * np.sin(t['wy'] * s + t['py'])
+        x = np.clip(x, 0, self.width - 1)
+        y = np.clip(y, 0, self.height - 1)
+        ramp = np.maximum(t['ramp'], 1e-6)
+        env = np.clip((s - t['start']) / ramp, 0, 1) * np.clip((t['end'] - s) / ramp, 0, 1)
+        return np.stack([x, y], axis=-1), t['amp'] * env
+
+    def dust_present(self, frames):
+        s = self.seconds(frames)[:, None]
+        return (s >= self.specks['start']) & (s < self.specks['end'])
+
+    def truth(self, frames):
+        """(n, K, 4) float32 : présent, x, y, pression."""
+        xy, amp = self.positions(frames)
+        out = np.empty(amp.shape + (4,), dtype=np.float32)
+        out[..., 0] = amp > 0
+        out[..., 1:3] = xy
+        out[..., 3] = amp
+        return out
+
+    # --- images ---
+
+    def _background(self, frames):
+        s = self.seconds(frames)
+        level = self.base + self.drift * np.sin(2 * np.pi * s / self.drift_period) + self.drift_rate * s
+        return level.astype(np.float32)
+
+    def _ring(self, speck):
+        """Pixels (ys, xs) du contour d'une poussière (anneau d'épaisseur 2 DUST_EDGE)."""
+        r = speck['radius'] + DUST_EDGE + 1
+        y0, y1 = int(max(0, np.floor(speck['y'] - r))), int(min(self.height, np.ceil(speck['y'] + r) + 1))
+        x0, x1 = int(max(0, np.floor(speck['x'] - r))), int(min(self.width, np.ceil(speck['x'] + r) + 1))
+        yy, xx = np.mgrid[y0:y1, x0:x1]
+        d = np.hypot(xx - speck['x'], yy - speck['y'])
+        edge = np.abs(d - speck['radius']) <= DUST_EDGE
+        return yy[edge], xx[edge]
+
+    def _noise_bank(self):
+        if self._bank is None:
+            rng = np.random.default_rng((self.seed, 0, 1))   # graines des frames : (seed, frame)
+            bank = rng.standard_normal((NOISE_BANK, self.height + NOISE_PAD, self.width + NOISE_PAD),
+                                       dtype=np.float32)
+            bank *= self.noise
+            self._bank = bank
+        return self._bank
+
+    def _noise(self, img, frames):
+        """Bruit (fenêtre de la banque) et dropout, tirés par frame (graine (seed, frame))."""
+        if not (self.noise or self.dropout):
+            return
+        h, w = self.height, self.width
+        bank = self._noise_bank() if self.noise else None
+        drop = int(round(self.dropout * h * w))
+        for j, f in enumerate(np.asarray(frames).tolist()):
+            rng = np.random.default_rng((self.seed, f))
+            if bank is not None:
+                k, dy, dx = rng.integers((0, 0, 0), (NOISE_BANK, NOISE_PAD + 1, NOISE_PAD + 1))
+                img[j] += bank[k, dy:dy + h, dx:dx + w]
+            if drop:
+                img[j].reshape(-1)[rng.integers(0, h * w, drop)] = self.dropout_value
+
+    def render(self, frames):
+        """{'null_Kinect': (n, h, w), 'null_dust': (n, h, w)} float32 des frames données."""
+        frames = np.atleast_1d(np.asarray(frames, dtype=np.int64))
+        n = len(frames)
+        xy, amp = self.positions(frames)
+        sx = np.broadcast_to(self.tracks['sx'], amp.shape)
+        sy = np.broadcast_to(self.tracks['sy'], amp.shape)
+        present = self.dust_present(frames)
+        if len(self.specks):
+            # taches de poussière : noyaux de plus, même produit matriciel
+            dxy = np.broadcast_to(np.stack([self.specks['x'], self.specks['y']], -1), (n, len(self.specks), 2))
+            xy = np.concatenate([xy, dxy], axis=1)
+            amp = np.concatenate([amp, present * self.dust_depth], axis=1)
+            r = np.broadcast_to(self.specks['radius'] * 0.5, present.shape)
+            sx = np.concatenate([sx, r], axis=1)
+            sy = np.concatenate([sy, r], axis=1)
+        xy = xy.astype(np.float32)
+        gx = np.exp(-0.5 * ((self._xs - xy[..., 0, None]) / sx[..., None].astype(np.float32)) ** 2)
+        gy = np.exp(-0.5 * ((self._ys - xy[..., 1, None]) / sy[..., None].astype(np.float32)) ** 2)
+        gy *= amp[..., None].astype(np.float32)
+        depth = np.matmul(gy.transpose(0, 2, 1), gx)         # (n, h, w) pression
+        np.negative(depth, out=depth)
+        depth += self._background(frames)[:, None, None]
+        depth += self._plane
+        self._noise(depth, frames)
+        np.clip(depth, 0.0, 1.0, out=depth)
+
+        dust_img = np.ones((n, self.height, self.width), dtype=np.float32)
+        for d, (ys, xs) in enumerate(self._rings):
+            idx = np.flatnonzero(present[:, d])
+            if len(idx) and len(ys):
+                dust_img[idx[:, None], ys[None, :], xs[None, :]] = 0.0
+        return {'null_Kinect': depth, 'null_dust': dust_img}
+
+    def reference(self, frame=0):
+        """cache_null : fond de la frame donnée, sans bump ni poussière (bruit compris)."""
+        img = np.empty((1, self.height, self.width), dtype=np.float32)
+        img[:] = self._background([frame])[:, None, None] + self._plane
+        self._noise(img, [frame])
+        np.clip(img, 0.0, 1.0, out=img)
+        return img[0]
+
+    def batches(self, count, start=1, batch=BATCH):
+        """(frames (n,), {source: (n, h, w)}, vérité (n, K, 4)) par lots de batch frames."""
+        for first in range(start, start + count, batch):
+            frames = np.arange(first, min(first + batch, start + count), dtype=np.int64)
+            yield frames, self.render(frames), self.truth(frames)
+
+    # --- sortie ---
+
+    def describe(self):
+        return {'width': self.width, 'height': self.height, 'fps': self.fps, 'seed': self.seed,
+                'base': self.base, 'noise': self.noise, 'dropout': self.dropout,
+                'dropout_value': self.dropout_value, 'drift': self.drift,
+                'drift_period': self.drift_period, 'drift_rate': self.drift_rate, 'tilt': self.tilt,
+                'dust_depth': self.dust_depth,
+                'tracks': [dict(zip(TRACK_FIELDS, map(float, t))) for t in self.tracks.tolist()],
+                'dust': [dict(zip(DUST_FIELDS, map(float, d))) for d in self.specks.tolist()]}
+
+    def write(self, directory, count, start=1, batch=BATCH):
+        """
+        Écrit count frames au format de depth_recorder.py (null_Kinect,
+        null_dust, cache_null), la vérité terrain dans truth.npy (n, K, 4)
+        et les paramètres dans scene.json. Retourne le dossier.
+        """
+        import depth_recorder
+        rec = depth_recorder.DepthRecorder(directory, capacity=count)
+        if rec.seq:
+            raise ValueError('%s : enregistrement déjà présent' % directory)
+        os.makedirs(directory, exist_ok=True)
+        truth = np.lib.format.open_memmap(os.path.join(directory, TRUTH_FILE), mode='w+',
+                                          dtype=np.float32, shape=(count, len(self.tracks), 4))
+        ref = self.reference(start)
+        for frames, arrays, tr in self.batches(count, start, batch):
+            rec.record_batch(frames, self.seconds(frames), arrays, still={'cache_null': ref})
+            truth[frames - start] = tr
+        rec.close()
+        truth.flush()
+        meta = self.describe()
+        meta['frames'] = [int(start), int(start + count - 1)]
+        with open(os.path.join(directory, SCENE_FILE), 'w') as fh:
+            json.dump(meta, fh, indent=1)
+        return directory
+
+
+# =============================================================================
+# RAPPEL DE bump_detection.py (td_shim)
+# =============================================================================
+
+def match(truth, detected, tol):
+    """
+    Appariement glouton (plus proches d'abord) vérité (T, 2) / détections (D, 2)
+    à moins de tol pixels ; (appariés, erreurs en pixels).
+    """
+    if not len(truth) or not len(detected):
+        return 0, []
+    d = np.hypot(truth[:, None, 0] - detected[None, :, 0], truth[:, None, 1] - detected[None, :, 1])
+    errors = []
+    for flat in np.argsort(d, axis=None):
+        i, j = divmod(int(flat), d.shape[1])
+        if d[i, j] > tol:
+            break
+        if np.isfinite(d[i, j]):
+            errors.append(float(d[i, j]))
+            d[i, :] = np.inf
+            d[:, j] = np.inf
+    return len(errors), errors
+
+
+def recall(scene, count, start=1, batch=BATCH, tol=None, visible=0.25, distance=150.0,
+           script='bump_detection.py'):
+    """
+    Fait tourner bump_detection.py (Script CHOP, td_shim) sur count frames de
+    la scène, servies sans copie par des TOP en mémoire.
+
+    Args:
+        tol: distance d'appariement (pixels ; défaut 2 x sigma moyen)
+        visible: pression minimale d'un bump de la vérité pour le compter
+        distance: valeur de distance_mini (fusion des bumps)
+
+    Retourne {'frames', 'truth', 'detected', 'matched', 'recall', 'precision',
+              'error_px', 'ms_per_frame', 'fps'}.
+    """
+    import td_shim
+    td_shim.reset_modules()
+    env = td_shim.Env(fps=scene.fps)
+    env.chop('distance_mini', {'v': [distance]})
+    kinect, dust_top = env.top('null_Kinect'), env.top('null_dust')
+    env.top('cache_null', scene.reference(start))
+    env.load(script, kind='chop', name='bump_detection', inputs=['distance_mini'])
+    det = env.op('bump_detection')
+    max_peaks = env.op('bump_detection_callbacks').module.MAX_PEAKS
+    if tol is None:
+        tol = 2.0 * float(np.mean([scene.tracks['sx'], scene.tracks['sy']]))
+    w, h = scene.width, scene.height
+    stats = {'frames': 0, 'truth': 0, 'detected': 0, 'matched': 0}
+    errors, cook = [], 0.0
+    clock = time.perf_counter
+    for frames, arrays, tr in scene.batches(count, start, batch):
+        for j, f in enumerate(frames.tolist()):
+            kinect.set(arrays['null_Kinect'][j])
+            dust_top.set(arrays['null_dust'][j])
+            t0 = clock()
+            env.cook_frame(f)
+            cook += clock() - t0
+            n = int(det['bump_count'].eval())
+            found = np.array([[det['bump%d_x' % i].eval() * w - 0.5, det['bump%d_y' % i].eval() * h - 0.5]
+                              for i in range(1, min(n, max_peaks) + 1)]).reshape(-1, 2)
+            gt = tr[j][tr[j, :, 3] >= visible, 1:3]
+            m, e = match(gt, found, tol)
+            stats['frames'] += 1
+            stats['truth'] += len(gt)
+            stats['detected'] += len(found)
+            stats['matched'] += m
+            errors.extend(e)
+    stats['recall'] = stats['matched'] / stats['truth'] if stats['truth'] else float('nan')
+    stats['precision'] = stats['matched'] / stats['detected'] if stats['detected'] else float('nan')
+    stats['error_px'] = float(np.mean(errors)) if errors else float('nan')
+    stats['ms_per_frame'] = cook / max(stats['frames'], 1) * 1e3
+    stats['fps'] = stats['frames'] / cook if cook else float('nan')
+    stats['tol_px'] = tol
+    return stats
+
+
+def bench(count=256, bumps=4, batch=BATCH):
+    """Frames générées par seconde, par résolution."""
+    print('%-14s %10s %10s' % ('resolution', 'frames/s', 'ms/frame'))
+    for name in RESOLUTIONS:
+        scene = Scene.preset(name, bumps=bumps)
+        t0 = time.perf_counter()
+        for _ in scene.batches(count, batch=batch):
+            pass
+        dt = time.perf_counter() - t0
+        print('%-14s %10.0f %10.3f' % (name, count / dt, dt / count * 1e3))
+
+
+# =============================================================================
+# AUTO-TEST / CLI
+# =============================================================================
+
+def _selfcheck():
+    import shutil
+    import tempfile
+    ok = True
+
+    def check(name, cond):
+        print('%-52s %s' % (name, 'OK' if cond else 'FAIL'))
+        return bool(cond)
+
+    scene = Scene(320, 288, tracks=[track(100, 150, vx=30, sx=10, sy=6, amp=0.5, start=-1.0),
+                                    track(240, 80, amp=0.4, start=0.5)],
+                  specks=[dust(60, 250, radius=4)], noise=0.0, drift=0.0, tilt=0.0)
+    frames, arrays, tr = next(scene.batches(8, start=0, batch=8))
+    depth = arrays['null_Kinect']
+    ok &= check('batch shapes (n, h, w)', depth.shape == (8, 288, 320) and tr.shape == (8, 2, 4))
+    ok &= check('pressure = dark pixel at the bump centre',
+                abs(depth[0, 150, 100] - (BASE - 0.5)) < 1e-3 and abs(depth[0, 10, 10] - BASE) < 1e-3)
+    ok &= check('elliptical: wider along x', depth[0, 150, 112] < depth[0, 162, 100])
+    ok &= check('trajectory and ground truth agree',
+                abs(tr[6, 0, 1] - (100 + 30 * 6 / 60.0)) < 1e-4
+                and int(np.argmin(depth[6, 150])) == int(round(tr[6, 0, 1])))
+    ok &= check('bump absent before its start', tr[0, 1, 0] == 0 and depth[0, 80, 240] > BASE - 1e-3)
+    ok &= check('dust: black ring on white, speck in depth',
+                arrays['null_dust'][0, 250, 64] == 0.0 and arrays['null_dust'][0, 250, 60] == 1.0
+                and depth[0, 250, 60] < BASE - 0.1)
+    one = scene.render([5])['null_Kinect'][0]
+    ok &= check('frame independent of batching', np.array_equal(one, depth[5]))
+    noisy = Scene(64, 64, bumps=1, noise=0.05, dropout=0.01, seed=3)
+    a, b = noisy.render([10, 11])['null_Kinect'], noisy.render([10])['null_Kinect']
+    ok &= check('seeded noise / dropout per frame', np.array_equal(a[0], b[0])
+                and not np.array_equal(a[0], a[1]) and 0 < np.mean(a[0] == DROPOUT_VALUE) < 0.05)
+
+    tmp = tempfile.mkdtemp(prefix='synth_depth_')
+    try:
+        import depth_recorder
+        scene.write(tmp, 20, start=1, batch=8)
+        replay = depth_recorder.DepthReplay(tmp)
+        truth = np.load(os.path.join(tmp, TRUTH_FILE), mmap_mode='r')
+        ok &= check('written in the recorder format + truth',
+                    len(replay) == 20 and replay.row(0)['frame'] == 1
+                    and np.array_equal(replay.array('null_Kinect', 3), scene.render([4])['null_Kinect'][0])
+                    and replay.head['cache_null'] == 0 and truth.shape == (20, 2, 4)
+                    and np.array_equal(truth[3], scene.truth([4])[0]))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    # distance_mini 40 : zone d'exclusion des bumps forts (x 2.5) plus petite que l'écart des deux bumps
+    r = recall(scene, 60, start=1, distance=40)
+    ok &= check('bump_detection recall on a clean scene',
+                r['recall'] > 0.95 and r['precision'] > 0.95 and r['error_px'] < 3.0)
+    print('OK' if ok else 'FAIL')
+    return 0 if ok else 1
+
+
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description='Synthetic depth scenes for bump_detection.py load and accuracy tests.')
+    ap.add_argument('--resolution', choices=sorted(RESOLUTIONS), default='nfov_binned')
+    ap.add_argument('--bumps', type=int, default=3)
+    ap.add_argument('--dust', type=int, default=2)
+    ap.add_argument('--noise', type=float, default=NOISE)
+    ap.add_argument('--dropout', type=float, default=DROPOUT, help='fraction of invalid pixels per frame')
+    ap.add_argument('--drift', type=float, default=DRIFT)
+    ap.add_argument('--duration', type=float, default=None,
+                    help='seconds the random tracks spread over (default: the generated length)')
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--batch', type=int, default=BATCH)
+    ap.add_argument('--frames', type=int, default=600, help='frames for --out')
+    ap.add_argument('--out', help='write frames (depth_recorder format) + truth.npy + scene.json here')
+    ap.add_argument('--recall', type=int, metavar='FRAMES', help='run bump_detection.py on FRAMES frames')
+    ap.add_argument('--tol', type=float, default=None, help='match distance in pixels')
+    ap.add_argument('--distance', type=float, default=150.0, help='distance_mini value')
+    ap.add_argument('--bench', action='store_true', help='generation frames/s per resolution')
+    ap.add_argument('--check', action='store_true', help='self-check (default without arguments)')
+    args = ap.parse_args(argv)
+    duration = args.duration or max(args.frames if args.out else 0, args.recall or 0, 60) / FPS
+    scene = Scene.preset(args.resolution, bumps=args.bumps, dust=args.dust, noise=args.noise,
+                         dropout=args.dropout, drift=args.drift, duration=duration, seed=args.seed)
+    if args.out:
+        t0 = time.perf_counter()
+        scene.write(args.out, args.frames, batch=args.batch)
+        dt = time.perf_counter() - t0
+        print('wrote %s: %d frames %dx%d (%.0f frames/s)' % (args.out, args.frames, scene.width,
+                                                          scene.height, args.frames / dt))
+    if args.recall:
+        r = recall(scene, args.recall, batch=args.batch, tol=args.tol, distance=args.distance)
+        print('Frames    : %d  (%s, %d bumps, noise %.3f, dropout %.4f)'
+              % (r['frames'], args.resolution, args.bumps, args.noise, args.dropout))
+        print('Recall    : %.3f  (%d / %d visible bumps, tol %.1f px)'
+              % (r['recall'], r['matched'], r['truth'], r['tol_px']))
+        print('Precision : %.3f  (%d detections)' % (r['precision'], r['detected']))
+        print('Error     : %.2f px' % r['error_px'])
+        print('Cook      : %.3f ms/frame  (%.1f FPS)' % (r['ms_per_frame'], r['fps']))
+    if args.bench:
+        bench(batch=args.batch)
+    if args.check or not (args.out or args.recall or args.bench):
+        return _selfcheck()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,27 @@
+"""
+td_shim - run the repo's TouchDesigner scripts headless (plain Python + NumPy).
+
+    import td_shim
+    env = td_shim.Env(fps=60)
+    env.top('null_Kinect', depth)              # TOP backed by a NumPy array
+    env.load('bump_detection.py', kind='chop')  # Script CHOP 'bump_detection'
+    env.run(600)                               # deterministic frames
+    env.op('bump_detection')['bump_count'].eval()
+
+  fakes.py   Table DAT, CHOP / Constant CHOP / Script CHOP, TOP / Script TOP,
+             Web Render TOP, MIDI Out CHOP (only the API the scripts use)
+  clock.py   FrameClock (absTime) and Project (project.cookRate)
+  loader.py  Env: op() registry, per-script `me`, script loader, frame stepping
+
+Used by replay_validation.py; base for profiling and load-testing the whole
+pipeline outside TouchDesigner. Self-check: python -m td_shim
+"""
+
+from .clock import FrameClock, Project
+from .fakes import (CHOP, Cell, Channel, ConstantCHOP, MidiOutCHOP, Operator, Par,
+                    Pars, ScriptCHOP, ScriptDAT, ScriptTOP, Table, TOP, WebRender)
+from .loader import ROOT, SHARED_MODULES, Env, reset_modules
+
+__all__ = ['CHOP', 'Cell', 'Channel', 'ConstantCHOP', 'Env', 'FrameClock', 'MidiOutCHOP',
+           'Operator', 'Par', 'Pars', 'Project', 'ROOT', 'SHARED_MODULES', 'ScriptCHOP',
+           'ScriptDAT', 'ScriptTOP', 'TOP', 'Table', 'WebRender', 'reset_modules']
@@ -0,0 +1,95 @@
+"""
+Self-check: python -m td_shim
+
+Loads real scripts of the repo, unmodified, into a headless Env and checks
+what they publish.
+"""
+
+import numpy as np
+
+from . import Env, reset_modules
+
+
+def _depth(w, h, bumps, base=0.8):
+    """Gray frame (h, w): base level, one dark Gaussian per (x, y, depth, sigma)."""
+    yy, xx = np.mgrid[0:h, 0:w]
+    img = np.full((h, w), base, dtype=np.float32)
+    for x, y, depth, sigma in bumps:
+        img -= depth * np.exp(-((xx - x) ** 2 + (yy - y) ** 2) / (2.0 * sigma ** 2))
+    return img
+
+
+def _detection_env(track):
+    env = Env(fps=60)
+    w, h = 320, 288
+    env.top('cache_null', _depth(w, h, []))
+    env.top('null_dust', np.ones((h, w), dtype=np.float32))
+    kinect = env.top('null_Kinect')
+    env.chop('distance_mini', {'v': [60]})
+    env.load('bump_detection.py', kind='chop', inputs=['distance_mini'])
+    det = env.op('bump_detection')
+
+    def feed(env, frame):
+        x, y = track(frame)
+        kinect.set(_depth(w, h, [(x, y, 0.5, 8.0)]))
+    return env, det, feed
+
+
+def _selfcheck():
+    ok = True
+
+    def check(name, cond):
+        print('%-52s %s' % (name, 'OK' if cond else 'FAIL'))
+        return bool(cond)
+
+    # --- fakes ---
+    env = Env()
+    t = env.table('t', [['ball_id', 'x', 'y'], [0, 540, 135]])
+    ok &= check('Table DAT indexing', t[1, 1].val == '540' and t[1, 5].val == ''
+                and t.numRows == 2 and t.numCols == 3)
+    c = env.constant('bump_x')
+    c.par.value2 = 0.25
+    ok &= check('Constant CHOP .par -> channels', c[2].eval() == 0.25 and c.values(3) == [0, 0, 0.25])
+    arr = np.zeros((4, 4), dtype=np.float32)
+    ok &= check('TOP numpyArray() without copy', env.top('img', arr).numpyArray() is arr)
+    ok &= check('op() by name and path, None if missing',
+                env.op('t') is t and env.op('/project1/t') is t and env.op('nope') is None)
+
+    # --- bump_detection.py: Script CHOP on in-memory TOPs ---
+    reset_modules()
+    track = lambda f: (100 + 2 * f, 150)
+    env, det, feed = _detection_env(track)
+    env.run(30, each=feed)
+    x, y = track(env.absTime.frame)
+    ok &= check('bump_detection finds the synthetic bump',
+                det['bump_count'].eval() == 1
+                and abs(det['bump1_x'].eval() * 320 - x) <= 1.0
+                and abs(det['bump1_y'].eval() * 288 - y) <= 1.0)
+    ok &= check('bump age follows the frame clock', abs(det['bump1_age'].eval() - 29 / 60.0) < 1e-9)
+
+    # deterministic: same input -> same channels
+    env2, det2, feed2 = _detection_env(track)
+    env2.run(30, each=feed2)
+    ok &= check('deterministic frames', all(a.vals == b.vals for a, b in zip(det.chans(), det2.chans())))
+
+    # --- proximity_calculator.py -> proximity_chop.py (forced cook) ---
+    reset_modules()
+    env = Env()
+    hero = env.chop('hero_control', {'x': [0.0], 'y': [0.0]})
+    env.table('balls_positions_table', [['ball_id', 'x', 'y'], [0, 540, 135], [1, 925, 415]])
+    env.table('proximity_dat')
+    env.load('proximity_calculator.py')
+    env.load('proximity_chop.py', kind='chop')
+    prox = env.op('proximity_chop')
+    env.run(1)
+    ok &= check('no bridge with the hero far away', prox['bridge_active'].vals == [0.0, 0.0])
+    hero.set(x=300, y=100)
+    env.run(1)
+    ok &= check('hero moved: bridge to ball 0 only', prox['bridge_active'].vals == [1.0, 0.0]
+                and env.op('proximity_dat')[1, 2].val == '1')
+    print('OK' if ok else 'FAIL')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(_selfcheck())
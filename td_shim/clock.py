@@ -0,0 +1,49 @@
+"""
+Deterministic frame clock: absTime / project stand-ins.
+
+Time only moves when the caller steps it, so two runs over the same input
+produce the same frames, the same seconds and therefore the same outputs.
+"""
+
+
+class FrameClock:
+    """
+    absTime: .frame, .seconds (= frame / fps), .step(n).
+
+    Args:
+        fps: cook rate (project.cookRate)
+        start: first frame number
+    """
+
+    def __init__(self, fps=60.0, start=1):
+        self.fps = float(fps)
+        self.start = int(start)
+        self.frame = int(start)
+
+    @property
+    def seconds(self):
+        return self.frame / self.fps
+
+    def step(self, n=1):
+        self.frame += int(n)
+        return self.frame
+
+    def set(self, frame):
+        self.frame = int(frame)
+        return self.frame
+
+    def reset(self):
+        self.frame = self.start
+
+
+class Project:
+    """project: .cookRate follows the clock, .name for messages, .folder."""
+
+    def __init__(self, clock, name='td_shim', folder='.'):
+        self._clock = clock
+        self.name = name
+        self.folder = folder
+
+    @property
+    def cookRate(self):
+        return self._clock.fps
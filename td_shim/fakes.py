@@ -0,0 +1,451 @@
+"""
+In-memory stand-ins for the TouchDesigner operators the scripts touch.
+
+Only the API the repo's scripts use is implemented:
+
+  Table DAT      [r, c].val, row(r), numRows/numCols, text, totalCooks,
+                 clear(), appendRow(), setSize(), [r, c] = v
+  CHOP           [i] / ['name'] -> Channel (.eval(), .vals, [i], float()),
+                 numChans, numSamples, chans(), cook(force)
+  Constant CHOP  par.value0..N / par.name0..N, read back as channels
+  Script CHOP    clear(), numSamples, appendChan(), inputs, cook() runs the
+                 callbacks' cook(scriptOp)
+  TOP            numpyArray() over a NumPy array (no copy), width/height
+  Script TOP     copyNumpyArray(), then numpyArray() like any TOP
+  Web Render TOP executeJavaScript() (recorded)
+  MIDI Out CHOP  SendMIDI() (recorded)
+"""
+
+import numpy as np
+
+
+class Cell:
+    __slots__ = ('val',)
+
+    def __init__(self, val):
+        self.val = val
+
+    def __str__(self):
+        return self.val
+
+
+class Par:
+    """One parameter: .val / .eval(); plain assignment goes through Pars."""
+
+    def __init__(self, name, val=0.0):
+        self.name = name
+        self.val = val
+
+    def eval(self):
+        return self.val
+
+    def __float__(self):
+        return float(self.val)
+
+    def __int__(self):
+        return int(self.val)
+
+    def __eq__(self, other):
+        return self.val == (other.val if isinstance(other, Par) else other)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+
+class Pars:
+    """op.par: `op.par.x = 3` sets the value, `op.par.x` returns the Par."""
+
+    def __init__(self, owner=None, **values):
+        object.__setattr__(self, '_owner', owner)
+        object.__setattr__(self, '_pars', {})
+        for name, val in values.items():
+            self._pars[name] = Par(name, val)
+
+    def __getattr__(self, name):
+        pars = object.__getattribute__(self, '_pars')
+        if name not in pars:
+            pars[name] = Par(name, 0.0)
+        return pars[name]
+
+    def __setattr__(self, name, val):
+        pars = self._pars
+        par = pars.get(name)
+        if par is None:
+            par = pars[name] = Par(name, 0.0)
+        par.val = val.val if isinstance(val, Par) else val
+        if self._owner is not None:
+            self._owner._par_changed(name)
+
+    def names(self):
+        return list(self._pars)
+
+
+class Operator:
+    """Common part: name, path, valid, storage, cook counter, par."""
+
+    family = 'OP'
+
+    def __init__(self, name, path=None):
+        self.name = name
+        self.path = path or '/project1/' + name
+        self.valid = True
+        self.storage = {}
+        self.totalCooks = 0
+        self.par = Pars(self)
+
+    def _par_changed(self, name):
+        pass
+
+    def cook(self, force=False):
+        self.totalCooks += 1
+
+    def destroy(self):
+        self.valid = False
+
+    def __repr__(self):
+        return '<%s %s>' % (type(self).__name__, self.path)
+
+
+# =============================================================================
+# DAT
+# =============================================================================
+
+class Table(Operator):
+    """Table DAT (cells are strings)."""
+
+    family = 'DAT'
+
+    def __init__(self, name, rows=None, path=None):
+        Operator.__init__(self, name, path)
+        self._rows = []
+        self._watchers = []
+        if rows is not None:
+            self.load(rows)
+
+    def load(self, rows):
+        """Replace the whole content, as an upstream re-cook would."""
+        self._rows = [[str(c) for c in r] for r in rows]
+        self.totalCooks += 1
+        for watcher in list(self._watchers):
+            watcher(self)
+
+    def watch(self, callback):
+        """DAT Execute DAT: callback(dat) after each load()."""
+        self._watchers.append(callback)
+
+    @property
+    def text(self):
+        return '\n'.join('\t'.join(r) for r in self._rows)
+
+    @property
+    def numRows(self):
+        return len(self._rows)
+
+    @property
+    def numCols(self):
+        return max((len(r) for r in self._rows), default=0)
+
+    def row(self, r):
+        return [Cell(c) for c in self._rows[r]]
+
+    def rows(self):
+        return [list(r) for r in self._rows]
+
+    def __getitem__(self, rc):
+        r, c = rc
+        row = self._rows[r]
+        return Cell(row[c] if c < len(row) else '')
+
+    def __setitem__(self, rc, val):
+        r, c = rc
+        row = self._rows[r]
+        if c >= len(row):
+            row.extend([''] * (c + 1 - len(row)))
+        row[c] = str(val)
+
+    def clear(self):
+        self._rows = []
+
+    def appendRow(self, row):
+        self._rows.append([str(c) for c in row])
+
+    def setSize(self, rows, cols):
+        self._rows = [(r + [''] * cols)[:cols] for r in self._rows[:rows]]
+        self._rows += [[''] * cols for _ in range(rows - len(self._rows))]
+
+
+class ScriptDAT(Operator):
+    """DAT holding a loaded script: op(name).module gives its namespace."""
+
+    family = 'DAT'
+
+    def __init__(self, name, module=None, path=None):
+        Operator.__init__(self, name, path)
+        self.module = module
+
+
+# =============================================================================
+# CHOP
+# =============================================================================
+
+class Channel:
+    """One CHOP channel: eval() = sample 0, vals, [i], float()."""
+
+    def __init__(self, name, vals):
+        self.name = name
+        self._vals = np.atleast_1d(np.asarray(vals, dtype=np.float64)).copy()
+
+    @property
+    def vals(self):
+        return self._vals.tolist()
+
+    @vals.setter
+    def vals(self, values):
+        self._vals = np.atleast_1d(np.asarray(values, dtype=np.float64)).copy()
+
+    def numpyArray(self):
+        return self._vals
+
+    def eval(self):
+        return float(self._vals[0]) if len(self._vals) else 0.0
+
+    def __getitem__(self, i):
+        return float(self._vals[i])
+
+    def __setitem__(self, i, v):
+        self._vals[i] = float(v)
+
+    def __float__(self):
+        return self.eval()
+
+    def __int__(self):
+        return int(self.eval())
+
+    def __len__(self):
+        return len(self._vals)
+
+
+class CHOP(Operator):
+    """Generic CHOP with named channels (e.g. a Null CHOP fed by the test)."""
+
+    family = 'CHOP'
+
+    def __init__(self, name, channels=None, path=None):
+        Operator.__init__(self, name, path)
+        self._chans = []
+        self._watchers = []
+        if channels:
+            for cname, vals in channels.items():
+                self._chans.append(Channel(cname, vals))
+
+    def _channels(self):
+        return self._chans
+
+    @property
+    def numChans(self):
+        return len(self._channels())
+
+    @property
+    def numSamples(self):
+        chans = self._channels()
+        return len(chans[0]) if chans else 0
+
+    def chans(self, pattern='*'):
+        return list(self._channels())
+
+    def chan(self, name):
+        for c in self._channels():
+            if c.name == name:
+                return c
+        return None
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self._channels()[key]
+        c = self.chan(key)
+        if c is None:
+            raise KeyError(key)
+        return c
+
+    def set(self, **values):
+        """
+        Set channel values (sample 0 or a whole list); channels are created as
+        needed. CHOP Execute watchers get onValueChange for each changed channel.
+        """
+        changed = []
+        for cname, val in values.items():
+            c = self.chan(cname)
+            vals = np.atleast_1d(np.asarray(val, dtype=np.float64))
+            if c is None:
+                c = Channel(cname, np.zeros_like(vals))
+                self._chans.append(c)
+            prev = c.eval()
+            if not np.array_equal(c.numpyArray(), vals):
+                c.vals = vals
+                changed.append((c, prev))
+        if changed:
+            self.totalCooks += 1
+            for watcher in list(self._watchers):
+                for c, prev in changed:
+                    watcher(c, 0, c.eval(), prev)
+        return [c.name for c, _ in changed]
+
+    def watch(self, callback):
+        """CHOP Execute DAT: callback(channel, sampleIndex, val, prev)."""
+        self._watchers.append(callback)
+
+
+class ConstantCHOP(CHOP):
+    """
+    Constant CHOP: par.name<i> / par.value<i>, exposed as channels. Channels
+    are rebuilt on the next read after a parameter change, not on every write.
+    """
+
+    def __init__(self, name, values=None, n=8, path=None):
+        CHOP.__init__(self, name, path=path)
+        values = dict(values or {})
+        pars = self.par._pars
+        for i in range(max(n, len(values))):
+            pars['name%d' % i] = Par('name%d' % i, 'chan%d' % (i + 1))
+            pars['value%d' % i] = Par('value%d' % i, 0.0)
+        for i, (cname, val) in enumerate(values.items()):
+            pars['name%d' % i].val = cname
+            pars['value%d' % i].val = float(val)
+        self._dirty = True
+
+    def _par_changed(self, name):
+        self.totalCooks += 1
+        self._dirty = True
+
+    def _channels(self):
+        if self._dirty:
+            pars = self.par._pars
+            self._chans = []
+            i = 0
+            while 'value%d' % i in pars:
+                cname = str(pars['name%d' % i].val) if 'name%d' % i in pars else 'chan%d' % (i + 1)
+                self._chans.append(Channel(cname, [float(pars['value%d' % i].val)]))
+                i += 1
+            self._dirty = False
+        return self._chans
+
+    def values(self, n):
+        return [self.par._pars['value%d' % i].val for i in range(n)]
+
+
+class ScriptCHOP(CHOP):
+    """
+    Script CHOP. cook() runs the callbacks' cook(scriptOp) when a callbacks
+    script is attached (td_shim.Env.load(..., kind='chop')); otherwise it only
+    counts cooks (a force-cooked target).
+    """
+
+    def __init__(self, name, callbacks=None, inputs=None, path=None):
+        CHOP.__init__(self, name, path=path)
+        self.callbacks = callbacks
+        self.inputs = list(inputs or [])
+        self.cooks = 0
+        self._num_samples = 1
+
+    @property
+    def numSamples(self):
+        return self._num_samples
+
+    @numSamples.setter
+    def numSamples(self, n):
+        self._num_samples = int(n)
+        for c in self._chans:
+            c.vals = (list(c.vals) + [0.0] * n)[:n]
+
+    def clear(self):
+        self._chans = []
+
+    def appendChan(self, name):
+        c = Channel(name, np.zeros(self._num_samples))
+        self._chans.append(c)
+        return c
+
+    def cook(self, force=False):
+        self.cooks += 1
+        self.totalCooks += 1
+        cook = self.callbacks.get('cook') if self.callbacks is not None else None
+        if cook is not None:
+            cook(self)
+
+
+class MidiOutCHOP(CHOP):
+    """MIDI Out CHOP: SendMIDI(kind, *args) calls are recorded in .sent."""
+
+    def __init__(self, name, path=None):
+        CHOP.__init__(self, name, path=path)
+        self.sent = []
+
+    def SendMIDI(self, *args):
+        self.sent.append(args)
+
+
+# =============================================================================
+# TOP
+# =============================================================================
+
+class TOP(Operator):
+    """
+    TOP backed by a NumPy array, (h, w) or (h, w, c) float32, row 0 at the
+    bottom like TouchDesigner. numpyArray() returns the array itself (no copy).
+    """
+
+    family = 'TOP'
+
+    def __init__(self, name, array=None, path=None):
+        Operator.__init__(self, name, path)
+        self._array = None
+        if array is not None:
+            self.set(array)
+
+    def set(self, array):
+        """New image content (a new cook); the array is kept, not copied."""
+        self._array = array
+        self.totalCooks += 1
+
+    def numpyArray(self, delayed=False, writable=False):
+        return self._array
+
+    @property
+    def width(self):
+        return 0 if self._array is None else self._array.shape[1]
+
+    @property
+    def height(self):
+        return 0 if self._array is None else self._array.shape[0]
+
+
+class ScriptTOP(TOP):
+    """Script TOP: cook() runs the callbacks' cook(scriptOp); copyNumpyArray stores a copy."""
+
+    def __init__(self, name, callbacks=None, path=None):
+        TOP.__init__(self, name, path=path)
+        self.callbacks = callbacks
+        self.cooks = 0
+
+    def copyNumpyArray(self, array):
+        self._array = np.array(array, dtype=np.float32, copy=True)
+
+    def cook(self, force=False):
+        self.cooks += 1
+        self.totalCooks += 1
+        cook = self.callbacks.get('cook') if self.callbacks is not None else None
+        if cook is not None:
+            cook(self)
+
+
+class WebRender(TOP):
+    """Web Render TOP: executeJavaScript() calls are recorded in .js."""
+
+    def __init__(self, name, path=None):
+        TOP.__init__(self, name, path=path)
+        self.js = []
+
+    def executeJavaScript(self, script):
+        self.js.append(script)
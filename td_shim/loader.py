@@ -0,0 +1,241 @@
+"""
+Headless environment: op() registry, per-script `me`, absTime / project,
+and a loader that executes the repo's script files unmodified in it.
+
+    env = td_shim.Env(fps=60)
+    env.top('null_Kinect', depth)                       # in-memory TOPs
+    env.top('cache_null', reference)
+    env.top('null_dust', dust)
+    env.chop('distance_mini', {'v': [150]})
+    env.load('bump_detection.py', kind='chop', inputs=['distance_mini'])
+    env.load('bump_validation.py')                      # Execute DAT
+    env.run(100)                                        # 100 deterministic frames
+    env.op('bump_detection')['bump1_x'].eval()
+
+Each script gets its own namespace (exposed as op(name).module, like a DAT's
+.module) with `op`, `me`, `absTime`, `project` and `debug` injected. Shared
+modules (render_sync, frame_pipeline, ...) are imported from the repo root as
+plain Python modules, as TouchDesigner resolves them from Text DATs.
+
+Frame order of Env.step() / Env.cook_frame(), as TouchDesigner cooks a frame:
+  1. clock + 1
+  2. onFrameStart(frame) of every Execute DAT, in load order
+  3. cook() of every Script CHOP / TOP, in load order
+  4. onFrameEnd(frame) of every Execute DAT, in load order
+"""
+
+import importlib
+import os
+import sys
+import types
+
+from .clock import FrameClock, Project
+from .fakes import (CHOP, ConstantCHOP, MidiOutCHOP, ScriptCHOP, ScriptDAT,
+                    ScriptTOP, Table, TOP, WebRender)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Shared modules with per-project state (caches, registries, installed pipeline)
+SHARED_MODULES = ('ball_layout', 'blob_snapshot', 'frame_pipeline', 'layout_store',
+                  'midi_queue', 'op_cache', 'rate_log', 'render_sync')
+
+KINDS = ('execute', 'chop', 'top', 'chop_execute', 'dat_execute', 'text')
+
+
+class Env:
+    """
+    Args:
+        fps: clock rate (absTime.seconds = frame / fps, project.cookRate)
+        start: first frame number
+        root: directory of the scripts and shared modules
+        quiet: drop debug() output (kept in .messages either way)
+    """
+
+    def __init__(self, fps=60.0, start=1, root=ROOT, quiet=True):
+        self.root = root
+        if root not in sys.path:
+            sys.path.insert(0, root)
+        self.absTime = FrameClock(fps, start)
+        self.project = Project(self.absTime, folder=root)
+        self.quiet = quiet
+        self.messages = []
+        self.ops = {}            # name -> operator
+        self.paths = {}          # path -> operator
+        self.execute = []        # Execute DAT modules, load order
+        self.cooking = []        # Script CHOP / TOP, load order
+
+    # --- op() -------------------------------------------------------------
+
+    def add(self, operator):
+        self.ops[operator.name] = operator
+        self.paths[operator.path] = operator
+        return operator
+
+    def op(self, path):
+        if path is None:
+            return None
+        found = self.ops.get(path) or self.paths.get(path)
+        if found is None and '/' in path:
+            found = self.ops.get(path.rstrip('/').rsplit('/', 1)[-1])
+        if found is not None and not found.valid:
+            return None
+        return found
+
+    def remove(self, name):
+        """Deletes an operator: handles cached by scripts become invalid."""
+        found = self.ops.pop(name, None)
+        if found is not None:
+            self.paths.pop(found.path, None)
+            found.destroy()
+
+    # --- operator helpers -------------------------------------------------
+
+    def table(self, name, rows=None):
+        return self.add(Table(name, rows))
+
+    def chop(self, name, channels=None):
+        return self.add(CHOP(name, channels))
+
+    def constant(self, name, values=None, n=8):
+        return self.add(ConstantCHOP(name, values, n))
+
+    def script_chop(self, name, inputs=None):
+        """Force-cooked target without callbacks (e.g. bump_out)."""
+        return self.add(ScriptCHOP(name, inputs=self._inputs(inputs)))
+
+    def top(self, name, array=None):
+        return self.add(TOP(name, array))
+
+    def web_render(self, name='webrender1'):
+        return self.add(WebRender(name))
+
+    def midi_out(self, name):
+        return self.add(MidiOutCHOP(name))
+
+    def _inputs(self, inputs):
+        return [self.op(i) if isinstance(i, str) else i for i in (inputs or [])]
+
+    def debug(self, *args):
+        msg = ' '.join(str(a) for a in args)
+        self.messages.append(msg)
+        if not self.quiet:
+            print(msg)
+
+    # --- script loading ---------------------------------------------------
+
+    def globals(self, me):
+        return {'op': self.op, 'me': me, 'absTime': self.absTime,
+                'project': self.project, 'debug': self.debug}
+
+    def load(self, path, kind='execute', name=None, inputs=None, watch=None):
+        """
+        Executes a script file into its own namespace and registers its DAT.
+
+        Args:
+            path: script file (relative to root or absolute)
+            kind: 'execute'      Execute DAT, stepped by step()
+                  'chop' / 'top' Script CHOP / TOP callbacks; the operator is
+                                 registered under name and cooked by step()
+                  'chop_execute' CHOP Execute DAT on watch (onValueChange)
+                  'dat_execute'  DAT Execute DAT on watch (onTableChange)
+                  'text'         plain Text DAT (module only)
+            name: operator name (default: file name without .py)
+            inputs: Script CHOP inputs (names or operators)
+            watch: operator watched by a CHOP / DAT Execute DAT
+
+        Returns the script's module (callbacks and globals as attributes).
+        """
+        if kind not in KINDS:
+            raise ValueError('unknown script kind: %s' % kind)
+        if not os.path.isabs(path):
+            path = os.path.join(self.root, path)
+        base = os.path.splitext(os.path.basename(path))[0]
+        name = name or base
+
+        dat_name = name if kind not in ('chop', 'top') else name + '_callbacks'
+        dat = ScriptDAT(dat_name)
+        module = types.ModuleType('td_shim_' + dat_name)
+        module.__file__ = path
+        module.__dict__.update(self.globals(dat))
+        dat.module = module
+        self.add(dat)
+
+        target = None
+        if kind == 'chop':
+            target = self.add(ScriptCHOP(name, callbacks=module.__dict__, inputs=self._inputs(inputs)))
+        elif kind == 'top':
+            target = self.add(ScriptTOP(name, callbacks=module.__dict__))
+
+        with open(path, encoding='utf-8-sig') as fh:
+            code = compile(fh.read(), path, 'exec')
+        exec(code, module.__dict__)
+
+        if kind == 'execute':
+            self.execute.append(module)
+        elif target is not None:
+            self.cooking.append(target)
+        elif kind in ('chop_execute', 'dat_execute'):
+            watched = self.op(watch) if isinstance(watch, str) else watch
+            if watched is None:
+                raise ValueError('%s: watched operator not found: %s' % (name, watch))
+            if kind == 'chop_execute':
+                watched.watch(lambda *args: _call(module, 'onValueChange', *args))
+            else:
+                watched.watch(lambda dat: _call(module, 'onTableChange', dat))
+        return module
+
+    # --- frames -----------------------------------------------------------
+
+    def start(self):
+        """onStart() of every Execute DAT (project start)."""
+        for module in self.execute:
+            _call(module, 'onStart')
+
+    def step(self, n=1, each=None):
+        """
+        Cooks n frames. each(env, frame) runs before each frame's callbacks,
+        to feed the inputs (TOP arrays, tables, CHOP values) of that frame.
+        """
+        for _ in range(n):
+            self.cook_frame(self.absTime.frame + 1, each)
+        return self.absTime.frame
+
+    run = step
+
+    def cook_frame(self, frame, each=None):
+        """
+        Cooks one frame at an explicit frame number (recorded streams keep
+        their own numbering, gaps included).
+        """
+        self.absTime.set(frame)
+        if each is not None:
+            each(self, frame)
+        for module in self.execute:
+            _call(module, 'onFrameStart', frame)
+        for target in self.cooking:
+            target.cook()
+        for module in self.execute:
+            _call(module, 'onFrameEnd', frame)
+        return frame
+
+    def close(self):
+        """onExit() of every Execute DAT (releases ports, uninstalls the pipeline)."""
+        for module in self.execute:
+            _call(module, 'onExit')
+
+
+def _call(module, callback, *args):
+    fn = getattr(module, callback, None)
+    if callable(fn):
+        return fn(*args)
+    return None
+
+
+def reset_modules(names=SHARED_MODULES):
+    """
+    Reloads the shared modules so a new Env starts from fresh caches and
+    registries (as a reopened project would). Call before loading scripts.
+    """
+    for name in names:
+        if name in sys.modules:
+            importlib.reload(sys.modules[name])
@@ -0,0 +1,603 @@
+"""
+Behaviour checks of the per-frame scripts, run headless on td_shim.
+
+    python -m pytest -q tests
+
+Each check drives the repo's scripts unmodified (td_shim.Env) or the
+shared modules directly, and asserts on what they publish. Self-checks
+inside the modules (python <module>.py) stay as quick smoke tests; the
+behaviour that a change must not break lives here.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import pytest
+
+import td_shim
+
+DATA = os.path.join(ROOT, 'tests', 'data')
+
+
+@pytest.fixture(autouse=True)
+def fresh_modules():
+    """Shared modules start from empty caches / registries, as a reopened project."""
+    td_shim.reset_modules()
+    yield
+
+
+# =============================================================================
+# bump_validation / exec_blob_guard : recorded stream against golden outputs
+# =============================================================================
+
+@pytest.mark.parametrize('script, golden', [
+    ('bump_validation.py', 'blob_stream_golden.csv'),
+    ('exec_blob_guardexec_blob_guard', 'blob_stream_guard_golden.csv'),
+])
+def test_replay_matches_golden(script, golden):
+    import replay_validation
+    frames, order = replay_validation.load_stream(os.path.join(DATA, 'blob_stream.csv'))
+    outputs, _, _, _ = replay_validation.replay(os.path.join(ROOT, script), frames, order, timed=False)
+    problems = replay_validation.compare_golden(os.path.join(DATA, golden), outputs)
+    assert not problems, '\n'.join(problems)
+
+
+def test_replay_stage_timing_restores_modules():
+    import blob_snapshot
+    import replay_validation
+    get, cls = blob_snapshot.get, blob_snapshot.BlobSnapshot
+    frames, order = replay_validation.load_stream(os.path.join(DATA, 'blob_stream.csv'))
+    _, _, stages, _ = replay_validation.replay(replay_validation.DEFAULT_SCRIPT, frames, order[:10])
+    assert stages.get('parse', 0) > 0
+    assert blob_snapshot.get is get and blob_snapshot.BlobSnapshot is cls
+
+
+def _validation_env(legacy):
+    env = td_shim.Env()
+    env.table('info_bumpblob', [BLOB_HEADER, BUMP_ROW])
+    env.table('info_dustblob', [BLOB_HEADER])
+    env.script_chop('bump_out')
+    for name in ('bump_x', 'bump_y', 'dust_x', 'dust_y'):
+        env.constant(name)
+    module = env.load('bump_validation.py')
+    module.LEGACY_CONSTANTS = legacy
+    env.step(20)                                       # past MIN_BUMP_AGE + debounce
+    return env
+
+
+def test_legacy_constants_still_written_next_to_bump_out():
+    env = _validation_env(True)
+    out = env.op('bump_validation').storage['out']
+    assert out[0, 0] == pytest.approx(0.5)
+    assert env.op('bump_x').par.value0 == pytest.approx(0.5)
+    assert env.op('bump_x').par.value1 == -1.0         # empty slot
+    assert env.op('dust_x').par.value0 == -1.0
+
+
+def test_legacy_constants_skipped_with_one_debug():
+    env = _validation_env(False)
+    assert env.op('bump_validation').storage['out'][0, 0] == pytest.approx(0.5)
+    assert env.op('bump_x').par.value0 == 0.0          # untouched
+    assert len([m for m in env.messages if 'LEGACY_CONSTANTS' in m]) == 1
+
+
+# =============================================================================
+# blob_snapshot : one parse per frame, re-parse when an Info DAT re-cooks
+# =============================================================================
+
+BLOB_HEADER = ['id', 'x', 'y', 'w', 'h']
+
+
+def test_snapshot_shared_within_a_frame():
+    import blob_snapshot
+    env = td_shim.Env()
+    bump = env.table('info_bumpblob', [BLOB_HEADER, ['0', '0.5', '0.5', '0.05', '0.05']])
+    dust = env.table('info_dustblob', [BLOB_HEADER])
+    first = blob_snapshot.get(bump, dust, 10)
+    assert blob_snapshot.get(bump, dust, 10) is first
+    assert first.has_bump and not first.has_dust
+
+
+def test_snapshot_reparses_a_same_frame_recook():
+    import blob_snapshot
+    env = td_shim.Env()
+    bump = env.table('info_bumpblob', [BLOB_HEADER, ['0', '0.5', '0.5', '0.05', '0.05']])
+    dust = env.table('info_dustblob', [BLOB_HEADER])
+    start = blob_snapshot.get(bump, dust, 10)          # onFrameStart (bump_validation)
+    bump.load([BLOB_HEADER])                           # Info DAT re-cooks mid-frame
+    end = blob_snapshot.get(bump, dust, 10)            # onFrameEnd (bump_stop)
+    assert end.version == start.version + 1
+    assert not end.has_bump
+    # re-cook with identical text: same parse, same version
+    bump.load([BLOB_HEADER])
+    assert blob_snapshot.get(bump, dust, 10).version == end.version
+
+
+# =============================================================================
+# note_mapper : LUT against the exact per-position formula
+# =============================================================================
+
+def _exact_note(x, y, max_x, max_y, scale, base=36, top=96, octaves=3):
+    """The per-position formula the LUT replaced (old quantize_to_uniform_pentatonic)."""
+    nx = max(0.0, min(127.0, x / max_x * 127))
+    ny = max(0.0, min(127.0, y / max_y * 127))
+    semitone = int(round(base + nx / 127.0 * (top - base))) - base
+    closest = min(scale, key=lambda n: abs(n - semitone % 12))
+    return max(base, min(top, base + closest + 12 * int(ny / 127.0 * octaves)))
+
+
+@pytest.mark.parametrize('res, scale, bound', [
+    ((1920, 1080), 'pentatonic', 0.01),
+    ((1080, 1080), 'pentatonic', 0.01),
+    ((1080, 1080), 'major', 0.03),
+])
+def test_note_lut_differs_only_at_bin_edges(res, scale, bound):
+    import numpy as np
+    import note_mapper
+    w, h = res
+    degrees = note_mapper.SCALES[scale]
+    mapper = note_mapper.get_mapper(w, h, scale)
+    rng = np.random.default_rng(1)
+    xs, ys = rng.uniform(0, w, 5000), rng.uniform(0, h, 5000)
+    got = mapper.map(xs, ys)
+    exact = np.array([_exact_note(x, y, w, h, degrees) for x, y in zip(xs, ys)])
+    wrong = np.flatnonzero(got != exact)
+    assert len(wrong) / len(xs) < bound
+    bx, by = w / mapper.bins_x, h / mapper.bins_y
+    for i in wrong:
+        near = {_exact_note(xs[i] + dx, ys[i] + dy, w, h, degrees)
+                for dx in (-bx, 0, bx) for dy in (-by, 0, by)}
+        assert got[i] in near
+
+
+# =============================================================================
+# midi_output : hold times and the suppressed counter
+# =============================================================================
+
+def _midi_output(min_note_frames):
+    import midi_output
+    sent = []
+    out = midi_output.MidiOutput(lambda device, events: sent.extend(events),
+                                 min_note_frames=min_note_frames)
+    return out, sent
+
+
+def test_held_note_off_counted_once():
+    out, sent = _midi_output(6)
+    out.update(1, [0], [60])
+    for frame in range(2, 6):                  # bridge gone, note still held
+        out.update(frame, [], [])
+    assert out.stats['suppressed'] == 1
+    assert sent == [(60, 80)]
+    out.update(7, [], [])                      # hold over: released once
+    assert sent == [(60, 80), (60, 0)]
+    assert out.stats['suppressed'] == 1
+
+
+def test_deferred_note_change_counted_once_per_target():
+    out, sent = _midi_output(6)
+    out.update(1, [0], [60])
+    for frame in range(2, 5):
+        out.update(frame, [0], [62])
+    assert out.stats['suppressed'] == 2        # one note-off + note-on pair deferred
+    out.update(5, [0], [64])                   # new target: a new deferral
+    assert out.stats['suppressed'] == 4
+    out.update(7, [0], [64])
+    assert sent[-2:] == [(60, 0), (64, 80)]
+
+
+# =============================================================================
+# midi_queue : sender thread
+# =============================================================================
+
+class _GuardedHeap(list):
+    """Heap list recording every Python-level read made without the queue lock."""
+
+    def __init__(self, cond):
+        super().__init__()
+        self.cond = cond
+        self.unlocked = 0
+
+    def _check(self):
+        if not self.cond._is_owned():
+            self.unlocked += 1
+
+    def __getitem__(self, i):
+        self._check()
+        return super().__getitem__(i)
+
+    def __len__(self):
+        self._check()
+        return super().__len__()
+
+
+def test_sender_thread_reads_the_heap_under_the_lock():
+    import time
+    import midi_queue
+    sink = midi_queue.LoopbackSink()
+    q = midi_queue.MidiQueue(sink)
+    q._heap = heap = _GuardedHeap(q._cond)
+    q.start()
+    t0 = q.clock() + 0.005
+    for k in range(200):
+        q.put(k % 5, 60, 80, t0 + k * 0.0002)       # events land during the spin
+    time.sleep(0.08)
+    q.stop()
+    assert len(sink.received) == 200
+    assert heap.unlocked == 0
+
+
+# =============================================================================
+# proximity_calculator : pairs table written in place
+# =============================================================================
+
+def test_pairs_table_written_in_place():
+    env = td_shim.Env()
+    hero = env.chop('hero_control', {'x': [0.0], 'y': [0.0]})
+    env.table('balls_positions_table', [['ball_id', 'x', 'y'], [0, 540, 135], [1, 925, 415]])
+    env.table('proximity_dat')
+    pairs = env.table('proximity_pairs')
+    calls = []
+    pairs.clear = lambda: calls.append('clear')
+    pairs.appendRow = lambda row: calls.append('appendRow')
+    env.load('proximity_calculator.py')
+    env.load('proximity_chop.py', kind='chop')
+    env.run(1)
+    seen = []
+    for x, y in ((300, 100), (320, 110), (700, 300), (0, 0)):
+        hero.set(x=x, y=y)
+        env.run(1)
+        seen.append([r[:2] for r in pairs.rows()])
+        if (x, y) == (320, 110):
+            assert pairs[1, 2].val == '{:.2f}'.format(((540 - x) ** 2 + (135 - y) ** 2) ** 0.5)
+    assert calls == []
+    assert pairs.rows()[0] == ['hero_id', 'ball_id', 'distance', 'angle']
+    assert seen[0] == seen[1] == [['hero_id', 'ball_id'], ['0', '0']]
+    assert seen[2] == [['hero_id', 'ball_id'], ['0', '0'], ['0', '1']]
+    assert seen[3] == [['hero_id', 'ball_id']]
+    assert pairs.rows()[-1] == ['hero_id', 'ball_id', 'distance', 'angle']
+
+
+# =============================================================================
+# bump_stop (execute_freeze_manager) : hysteresis and churn
+# =============================================================================
+
+BUMP_ROW = ['0', '0.5', '0.5', '0.05', '0.05']
+
+
+def _freeze_env():
+    env = td_shim.Env()
+    env.table('info_bumpblob', [BLOB_HEADER])
+    env.table('info_dustblob', [BLOB_HEADER])
+    env.chop('bump_stop', {'v': [1]})           # bump mode
+    env.chop('dust_stop', {'v': [0]})
+    env.chop('double_stop', {'v': [0]})
+    for name in ('cache_capture_bump', 'cache_capture_dust'):
+        env.top(name).par.active = 1
+    env.constant('freeze_diag')
+    module = env.load('bump_stop.py', name='execute_freeze_manager')
+    return env, module
+
+
+def _run_presence(env, presence):
+    """One frame per entry of presence; returns the frozen state after each frame."""
+    bump = env.op('info_bumpblob')
+    frozen = []
+    for present in presence:
+        rows = [BLOB_HEADER, BUMP_ROW] if present else [BLOB_HEADER]
+        if bump.rows() != rows:
+            bump.load(rows)
+        env.step()
+        frozen.append(int(env.op('cache_capture_bump').par.active) == 0)
+    return frozen
+
+
+def _runs(states):
+    """[(state, length)] of consecutive equal states."""
+    runs = []
+    for s in states:
+        if runs and runs[-1][0] == s:
+            runs[-1][1] += 1
+        else:
+            runs.append([s, 1])
+    return [tuple(r) for r in runs]
+
+
+def test_freeze_debounced_and_held():
+    env, fsm = _freeze_env()
+    debounce = fsm.PRESENCE_DEBOUNCE_FRAMES
+    presence = [False] * 20 + [True] * 5 + [False] + [True] * 3 + [False] * 40
+    frozen = _run_presence(env, presence)
+    assert not any(frozen[:20])
+    assert frozen.index(True) == 20 + debounce - 1        # presence debounced
+    assert all(frozen[20 + debounce - 1:30])               # 1-frame dropout ignored
+    unfreeze = frozen.index(False, 20 + debounce - 1)
+    assert unfreeze - (20 + debounce - 1) >= fsm.MIN_FREEZE_FRAMES
+    assert not any(frozen[unfreeze:])
+    assert env.op('freeze_diag').par.value0 == 2          # freeze + unfreeze
+
+
+def test_flickering_presence_does_not_churn():
+    import numpy as np
+    env, fsm = _freeze_env()
+    rng = np.random.default_rng(3)
+    presence = [False] * 15 + list(rng.random(400) < 0.5)
+    frozen = _run_presence(env, presence)
+    runs = _runs(frozen)
+    # every completed state lasted at least its minimum hold
+    for state, length in runs[1:-1]:
+        assert length >= (fsm.MIN_FREEZE_FRAMES if state else fsm.MIN_UNFREEZE_FRAMES)
+    transitions = env.op('execute_freeze_manager').storage['fsm']['transitions']
+    assert transitions == len(runs) - 1
+    assert transitions <= len(presence) // fsm.MIN_UNFREEZE_FRAMES
+
+
+def test_freeze_manager_keeps_its_callback_until_the_pipeline_runs():
+    import frame_pipeline
+    env, fsm = _freeze_env()
+    pipeline = frame_pipeline.install(frame_pipeline.Pipeline())
+    pipeline.add('bump_stop', fsm.run_stage)
+    # installed, never run (frame_pipeline_exec Frame End off): not driven
+    frozen = _run_presence(env, [True] * 5)
+    assert frozen[-1]
+    assert not frame_pipeline.drives('bump_stop', env.absTime.frame)
+    pipeline.run(env.absTime.frame)
+    assert frame_pipeline.drives('bump_stop', env.absTime.frame + 1)
+    assert not frame_pipeline.drives('bump_stop', env.absTime.frame + 2)
+
+
+# =============================================================================
+# bump_stop : event-driven (user-029)
+# =============================================================================
+
+def _count_calls(module, name, calls):
+    fn = getattr(module, name)
+
+    def counted(*args):
+        calls[name] = calls.get(name, 0) + 1
+        return fn(*args)
+    setattr(module, name, counted)
+
+
+def test_freeze_manager_idle_in_steady_state():
+    env, fsm = _freeze_env()
+    _run_presence(env, [False] * 20)
+    calls = {}
+    for name in ('_debounced', '_gate_on', '_set_caches_active'):
+        _count_calls(fsm, name, calls)
+    _run_presence(env, [False] * 30)
+    assert calls == {}                                     # nothing changed upstream
+
+
+def test_freeze_manager_wakes_on_upstream_changes():
+    env, fsm = _freeze_env()
+    _run_presence(env, [False] * 20)
+    calls = {}
+    for name in ('_debounced', '_gate_on'):
+        _count_calls(fsm, name, calls)
+    env.op('dust_stop').set(v=1)                           # gate CHOP re-cooks
+    _run_presence(env, [False])
+    assert calls == {'_debounced': 2, '_gate_on': 1}       # only that gate re-evaluated
+    # a pending hold completes without any further upstream change
+    frozen = _run_presence(env, [True] * 3 + [False] * 40)
+    assert frozen[-1] is False and any(frozen)
+
+
+# =============================================================================
+# proximity_engine.BallGrid : same pairs as the dense (M, N) matrices
+# =============================================================================
+
+def _random_layout(rng, n, m, span=3000.0):
+    balls = rng.uniform(-span / 4, span, (n, 2))
+    balls[: n // 10] = balls[0]                            # stacked balls
+    heroes = rng.uniform(-span / 2, span * 1.2, (m, 2))
+    valid = rng.random(n) > 0.1
+    return balls, heroes, valid
+
+
+@pytest.mark.parametrize('seed, n, m', [(0, 300, 1), (1, 1000, 4), (2, 50, 8), (3, 2000, 0)])
+def test_grid_pairs_match_dense(seed, n, m):
+    import numpy as np
+    import proximity_engine as pe
+    rng = np.random.default_rng(seed)
+    balls, heroes, valid = _random_layout(rng, n, m)
+    radius = pe.CONNECT_DISTANCE
+    dist, angle, active = pe.compute(balls, heroes, radius)
+    active &= valid[None, :]
+    hi, bi, d, a = pe.BallGrid(balls, radius, valid=valid).query_pairs(heroes, radius)
+    assert sorted(zip(hi.tolist(), bi.tolist())) == sorted(zip(*np.nonzero(active)))
+    assert np.allclose(d, dist[hi, bi]) and np.allclose(a, angle[hi, bi])
+    dense = pe.nearest_hero(dist, angle, active)
+    sparse = pe.nearest_hero_sparse(n, hi, bi, d, a)
+    assert np.array_equal(dense[2], sparse[2])
+    assert np.allclose(dense[1], sparse[1]) and np.allclose(dense[3], sparse[3])
+
+
+def test_calculator_grid_path_matches_dense_path():
+    import numpy as np
+    rng = np.random.default_rng(5)
+    balls = rng.uniform(0, 4000, (400, 2))
+    rows = [['ball_id', 'x', 'y']] + [[i, '%.1f' % x, '%.1f' % y] for i, (x, y) in enumerate(balls)]
+    heroes = rng.uniform(0, 4000, (25, 2))
+
+    def run(grid_min):
+        td_shim.reset_modules()
+        env = td_shim.Env()
+        hero = env.chop('hero_control', {'x': [0.0], 'y': [0.0]})
+        env.table('balls_positions_table', rows)
+        calc = env.load('proximity_calculator.py')
+        calc.GRID_MIN_BALLS = grid_min
+        env.load('proximity_chop.py', kind='chop')
+        prox = env.op('proximity_chop')
+        seen = []
+        for x, y in heroes:
+            hero.set(x=x, y=y)
+            env.run(1)
+            seen.append((np.array([c.vals for c in prox.chans()]), sum(prox['bridge_active'].vals)))
+        return seen
+
+    grid, dense = run(1), run(10 ** 9)
+    for (g, bridges), (d, _) in zip(grid, dense):
+        assert g.shape == d.shape and np.allclose(g, d)
+    assert sum(bridges for _, bridges in grid) > len(heroes)
+
+
+# =============================================================================
+# ball_layout : parsed table, version, derived data
+# =============================================================================
+
+LAYOUT_ROWS = [['ball_id', 'x', 'y'], [4, 100, 100], [7, 300, 100], ['bad', 'x', ''], [9, 100, 400]]
+
+
+def test_layout_parse():
+    import numpy as np
+    import ball_layout
+    env = td_shim.Env()
+    layout = ball_layout.get(env.table('balls_positions_table', LAYOUT_ROWS))
+    assert layout.ids == [4, 7, 2, 9]                      # unreadable row keeps its index
+    assert layout.ok.tolist() == [True, True, False, True]
+    assert np.array_equal(layout.positions, [[100, 100], [300, 100], [0, 0], [100, 400]])
+    assert len(layout) == 4
+
+
+def test_layout_version_moves_only_on_content_change():
+    import ball_layout
+    env = td_shim.Env()
+    table = env.table('balls_positions_table', LAYOUT_ROWS)
+    env.load('balls_layout_watch.py', kind='dat_execute', watch=table)
+    first = ball_layout.get(table)
+    assert ball_layout.get(table) is first                 # no re-cook: cached
+    table.load(LAYOUT_ROWS)                                # re-cook, same content
+    assert ball_layout.get(table) is first
+    table.load(LAYOUT_ROWS[:2])
+    second = ball_layout.get(table)
+    assert second.version == first.version + 1 and second.ids == [4]
+    # edited without a re-cook: only invalidate() (balls_layout_watch) re-parses
+    table[1, 1] = 150
+    assert ball_layout.get(table) is second
+    ball_layout.invalidate()
+    assert ball_layout.get(table).positions[0, 0] == 150
+
+
+def test_layout_derived_values():
+    import numpy as np
+    import ball_layout
+    env = td_shim.Env()
+    layout = ball_layout.get(env.table('balls_positions_table', LAYOUT_ROWS))
+    assert np.allclose(layout.centroid(), [500 / 3, 200])  # unreadable row ignored
+    pos = layout.positions
+    brute = [[np.hypot(*(a - b)) for b in pos] for a in pos]
+    assert np.allclose(layout.pairwise(), brute)
+    # weights 1 - d / r: ball 4 at d=0 (w=1), ball 7 at d=200 (w=0.5), ball 9 at d=300 (w=0.25)
+    assert np.allclose(layout.weighted_target(100, 100, 400),
+                       [(100 + 0.5 * 300 + 0.25 * 100) / 1.75, (100 + 0.5 * 100 + 0.25 * 400) / 1.75])
+    assert np.allclose(layout.weighted_target(100, 100, 250), [(100 + 0.2 * 300) / 1.2, 100])
+    assert layout.weighted_target(2000, 2000, 400) == (540.0, 540.0)
+    assert layout.grid(480) is layout.grid(480)
+
+
+# =============================================================================
+# render_sync.flush : executeJavaScript fallback for undelivered parts only
+# =============================================================================
+
+class _PartialServer:
+    """WebSocket stand-in: text / binary frames reach `text` / `binary` clients."""
+
+    def __init__(self, text, binary):
+        self.text, self.binary = text, binary
+        self.sent = []
+
+    def has_clients(self):
+        return True
+
+    def take_joined(self):
+        return 0
+
+    def broadcast_text(self, data):
+        self.sent.append(('text', data))
+        return self.text
+
+    def broadcast_binary(self, data):
+        self.sent.append(('binary', data))
+        return self.binary
+
+
+def _applied(web):
+    import json
+    prefix = 'if(window.applyState) window.applyState('
+    return [json.loads(js[len(prefix):-2]) for js in web.js]
+
+
+@pytest.mark.parametrize('text, binary, fallback', [
+    (1, 1, []),
+    (1, 0, [['hero']]),                    # events reached the pages: not replayed
+    (0, 1, [['events']]),
+    (0, 0, [['events', 'hero']]),
+])
+def test_flush_falls_back_with_undelivered_parts(text, binary, fallback):
+    import render_sync
+    env = td_shim.Env()
+    web = env.web_render()
+    render_sync.call('showHero')
+    render_sync.set_hero(10, 20)
+    assert render_sync.flush(web, _PartialServer(text, binary)) is True
+    assert [sorted(d) for d in _applied(web)] == fallback
+    # everything counts as delivered: the next frame sends nothing
+    assert render_sync.build() is None
+
+
+def test_flush_without_renderer_keeps_only_undelivered_parts():
+    import render_sync
+    render_sync.call('showHero')
+    render_sync.set_hero(10, 20)
+    assert render_sync.flush(None, _PartialServer(1, 0)) is False
+    assert sorted(render_sync.build()) == ['hero']        # events not queued twice
+
+
+# =============================================================================
+# balls_position_updater / layout_store : resync on pulse, removed balls
+# =============================================================================
+
+BALL_ROWS = [['ball_id', 'x', 'y'], [0, 540, 135], [1, 925, 415], [2, 778, 868],
+             [3, 302, 868], [4, 155, 415]]
+
+
+def _updater_env():
+    env = td_shim.Env()
+    env.table('balls_positions_table', BALL_ROWS)
+    trigger = env.chop('balls_trigger', {'v': [0]})
+    env.load('balls_position_updater.py', kind='chop_execute', watch=trigger)
+    return env, trigger, env.web_render()
+
+
+def _pulse(env, trigger):
+    trigger.set(v=trigger['v'].eval() + 1)
+
+
+def test_pulse_resends_every_ball_on_the_js_path():
+    import render_sync
+    env, trigger, web = _updater_env()
+    _pulse(env, trigger)
+    render_sync.flush(web)
+    _pulse(env, trigger)                                   # unchanged table, page reloaded
+    render_sync.flush(web)
+    applied = _applied(web)
+    assert len(applied) == 2
+    assert sorted(applied[1]['balls']) == ['0', '1', '2', '3', '4']
+
+
+def test_removed_balls_dropped_from_the_store():
+    import render_sync
+    env, trigger, web = _updater_env()
+    _pulse(env, trigger)
+    render_sync.flush(web)
+    version = render_sync.layout.version
+    env.op('balls_positions_table').load(BALL_ROWS[:4])
+    _pulse(env, trigger)
+    assert render_sync.snapshot()['balls'] == [[540, 135], [925, 415], [778, 868]]
+    assert render_sync.layout.version == version + 1
+    assert render_sync.layout.stats['removed'] == 2
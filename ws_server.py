@@ -0,0 +1,554 @@
+# =============================================================================
+# WS SERVER - Serveur WebSocket local (bibliothèque standard uniquement)
+# =============================================================================
+# Module partagé (Text DAT 'ws_server'), démarré par render_sync_flush.py
+#
+# metaball.html se connecte à ws://127.0.0.1:PORT et reçoit l'état du rendu
+# en frames binaires (voir render_sync.pack_state) au lieu de chaînes
+# executeJavaScript à parser / évaluer. Plusieurs renderers peuvent
+# s'abonner au même flux.
+#
+#   import ws_server
+#   server = ws_server.WsServer(port=9980)
+#   server.start()                       # thread d'acceptation + lecture
+#   server.broadcast_binary(data)        # bytes -> tous les clients
+#   server.broadcast_text('{"events": []}')
+#   for msg in server.poll(): ...        # messages texte reçus (thread principal)
+#   server.stop()
+#
+# Sécurité (port local, mais n'importe quelle page du navigateur peut s'y
+# connecter) :
+#   - Origin acceptée : 'null' / file:// (page locale, Web Render TOP),
+#     http(s)://127.0.0.1 ou localhost ; absente = outil hors navigateur
+#   - frames client masquées, non fragmentées, <= MAX_PAYLOAD octets,
+#     sinon fermeture (1002 / 1009)
+#   - messages entrants : au plus INBOX_MAX gardés (les plus anciens tombent)
+#     tant que poll() ne les vide pas
+#
+# Auto-test hors TouchDesigner (client de remplacement sans navigateur) :
+#   python ws_server.py
+# C'est le test du module : handshake, origine refusée, aller-retour
+# pack/unpack, boules NaN, frames fragmentées / trop grandes, inbox bornée,
+# accusés layoutAck des boules, repli executeJavaScript de render_sync.flush.
+# =============================================================================
+
+import base64
+import collections
+import hashlib
+import os
+import socket
+import struct
+import threading
+import time
+
+DEFAULT_PORT = 9980
+_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+# Opcodes WebSocket (RFC 6455)
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+# Envoi bloqué plus longtemps que ça -> client lent, déconnecté
+SEND_TIMEOUT = 0.05
+
+# Taille maximale d'une frame reçue (la page n'envoie que de petits événements JSON)
+MAX_PAYLOAD = 64 * 1024
+# Messages entrants gardés au plus entre deux poll()
+INBOX_MAX = 256
+# Origines de navigateur acceptées (en plus de http(s)://127.0.0.1 / localhost)
+ALLOWED_ORIGINS = ('null', 'file://')
+LOCAL_HOSTS = ('127.0.0.1', 'localhost', '[::1]')
+
+# Codes de fermeture
+CLOSE_PROTOCOL = 1002
+CLOSE_TOO_BIG = 1009
+
+
+class FrameError(ValueError):
+    """Frame refusée ; code = code de fermeture WebSocket à renvoyer."""
+
+    def __init__(self, message, code=CLOSE_PROTOCOL):
+        ValueError.__init__(self, message)
+        self.code = code
+
+
+def encode_frame(opcode, payload, mask=False):
+    """Frame WebSocket complète (FIN) ; mask=True pour un client."""
+    head = bytearray([0x80 | opcode])
+    n = len(payload)
+    mbit = 0x80 if mask else 0
+    if n < 126:
+        head.append(mbit | n)
+    elif n < 65536:
+        head.append(mbit | 126)
+        head += struct.pack('>H', n)
+    else:
+        head.append(mbit | 127)
+        head += struct.pack('>Q', n)
+    if mask:
+        key = os.urandom(4)
+        head += key
+        payload = _apply_mask(payload, key)
+    return bytes(head) + payload
+
+
+def _apply_mask(data, key):
+    return bytes(b ^ key[i % 4] for i, b in enumerate(data))
+
+
+def _recv_exact(sock, n):
+    buf = b''
+    while len(buf) < n:
+        try:
+            chunk = sock.recv(n - len(buf))
+        except socket.timeout:
+            # timeout court réservé aux envois : la lecture attend
+            continue
+        if not chunk:
+            raise ConnectionError('socket fermée')
+        buf += chunk
+    return buf
+
+
+def read_frame(sock, require_mask=False, max_payload=MAX_PAYLOAD):
+    """
+    (opcode, payload) de la prochaine frame (démasquée).
+
+    FrameError si la frame est fragmentée (FIN absent / continuation),
+    non masquée alors que require_mask (côté serveur), ou plus grande que
+    max_payload (vérifié AVANT de lire le contenu).
+    """
+    b0, b1 = _recv_exact(sock, 2)
+    opcode = b0 & 0x0F
+    if not b0 & 0x80 or opcode == 0:
+        raise FrameError('frames fragmentées non supportées')
+    if require_mask and not b1 & 0x80:
+        raise FrameError('frame client non masquée')
+    n = b1 & 0x7F
+    if n == 126:
+        n = struct.unpack('>H', _recv_exact(sock, 2))[0]
+    elif n == 127:
+        n = struct.unpack('>Q', _recv_exact(sock, 8))[0]
+    if n > max_payload:
+        raise FrameError('frame de %d octets (max %d)' % (n, max_payload), CLOSE_TOO_BIG)
+    key = _recv_exact(sock, 4) if b1 & 0x80 else None
+    payload = _recv_exact(sock, n) if n else b''
+    if key:
+        payload = _apply_mask(payload, key)
+    return opcode, payload
+
+
+def accept_key(key):
+    return base64.b64encode(hashlib.sha1(key.encode('ascii') + _GUID).digest()).decode('ascii')
+
+
+def origin_allowed(origin):
+    """Origin du handshake : page locale seulement (None = client hors navigateur)."""
+    if origin is None:
+        return True
+    origin = origin.strip().lower()
+    if origin in ALLOWED_ORIGINS or origin.startswith('file://'):
+        return True
+    for scheme in ('http://', 'https://'):
+        if origin.startswith(scheme):
+            host = origin[len(scheme):].split('/', 1)[0]
+            if host.startswith('['):
+                host = host.split(']', 1)[0] + ']'
+            else:
+                host = host.split(':', 1)[0]
+            return host in LOCAL_HOSTS
+    return False
+
+
+class _Client:
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.lock = threading.Lock()
+        self.alive = True
+
+    def send(self, opcode, payload):
+        frame = encode_frame(opcode, payload)
+        with self.lock:
+            self.sock.sendall(frame)
+
+    def close(self):
+        self.alive = False
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class WsServer:
+    """
+    Serveur WebSocket minimal : handshake, broadcast, messages texte entrants.
+
+    Args:
+        host, port: adresse d'écoute (local par défaut ; port 0 = automatique)
+    """
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self.clients = []
+        self.joined = 0        # clients connectés depuis le dernier take_joined()
+        self.stats = {'frames': 0, 'bytes': 0, 'dropped': 0, 'received': 0,
+                      'rejected': 0, 'inbox_overflow': 0}
+        # borné : sans poll(), les plus anciens messages tombent
+        self._inbox = collections.deque(maxlen=INBOX_MAX)
+        self._lock = threading.Lock()
+        self._sock = None
+        self._thread = None
+        self._running = False
+
+    # --- Cycle de vie ---
+    def start(self):
+        if self._running:
+            return
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((self.host, self.port))
+        self._sock.listen(4)
+        self._sock.settimeout(0.2)
+        self.port = self._sock.getsockname()[1]
+        self._running = True
+        self._thread = threading.Thread(target=self._accept_loop, name='ws_server', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        for client in self._snapshot():
+            try:
+                client.send(OP_CLOSE, b'')
+            except OSError:
+                pass
+            client.close()
+        with self._lock:
+            self.clients = []
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+
+    def has_clients(self):
+        return bool(self.clients)
+
+    def take_joined(self):
+        """Nombre de nouveaux clients depuis le dernier appel (état complet à leur renvoyer)."""
+        with self._lock:
+            n, self.joined = self.joined, 0
+        return n
+
+    # --- Envoi (thread principal) ---
+    def _snapshot(self):
+        with self._lock:
+            return list(self.clients)
+
+    def _broadcast(self, opcode, payload):
+        sent = 0
+        for client in self._snapshot():
+            try:
+                client.send(opcode, payload)
+                sent += 1
+            except OSError:
+                self._drop(client)
+        if sent:
+            self.stats['frames'] += 1
+            self.stats['bytes'] += len(payload) * sent
+        return sent
+
+    def broadcast_binary(self, data):
+        return self._broadcast(OP_BINARY, bytes(data))
+
+    def broadcast_text(self, text):
+        return self._broadcast(OP_TEXT, text.encode('utf-8'))
+
+    def poll(self):
+        """Messages texte reçus depuis le dernier appel."""
+        out = []
+        while self._inbox:
+            out.append(self._inbox.popleft())
+        return out
+
+    # --- Threads ---
+    def _drop(self, client):
+        client.close()
+        with self._lock:
+            if client in self.clients:
+                self.clients.remove(client)
+                self.stats['dropped'] += 1
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                sock, addr = self._sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(sock, addr), daemon=True).start()
+
+    def _handshake(self, sock):
+        data = b''
+        while b'\r\n\r\n' not in data:
+            chunk = sock.recv(1024)
+            if not chunk or len(data) > 8192:
+                return False
+            data += chunk
+        headers = {}
+        for line in data.decode('latin-1').split('\r\n')[1:]:
+            if ':' in line:
+                k, v = line.split(':', 1)
+                headers[k.strip().lower()] = v.strip()
+        key = headers.get('sec-websocket-key')
+        if not key:
+            return False
+        if not origin_allowed(headers.get('origin')):
+            sock.sendall(b'HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\n\r\n')
+            self.stats['rejected'] += 1
+            return False
+        sock.sendall(('HTTP/1.1 101 Switching Protocols\r\n'
+                      'Upgrade: websocket\r\nConnection: Upgrade\r\n'
+                      'Sec-WebSocket-Accept: %s\r\n\r\n' % accept_key(key)).encode('ascii'))
+        return True
+
+    def _serve(self, sock, addr):
+        try:
+            sock.settimeout(2.0)
+            if not self._handshake(sock):
+                sock.close()
+                return
+        except OSError:
+            sock.close()
+            return
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # un envoi bloqué ne doit pas geler TouchDesigner : client lent -> déconnecté
+        sock.settimeout(SEND_TIMEOUT)
+        client = _Client(sock, addr)
+        with self._lock:
+            self.clients.append(client)
+            self.joined += 1
+        try:
+            while self._running and client.alive:
+                opcode, payload = read_frame(sock, require_mask=True)
+                if opcode == OP_TEXT:
+                    if len(self._inbox) == INBOX_MAX:
+                        self.stats['inbox_overflow'] += 1
+                    self._inbox.append(payload.decode('utf-8', 'replace'))
+                    self.stats['received'] += 1
+                elif opcode == OP_PING:
+                    client.send(OP_PONG, payload)
+                elif opcode == OP_CLOSE:
+                    break
+        except FrameError as e:
+            self.stats['rejected'] += 1
+            try:
+                client.send(OP_CLOSE, struct.pack('>H', e.code))
+            except OSError:
+                pass
+        except (OSError, ConnectionError, ValueError):
+            pass
+        self._drop(client)
+
+
+# =============================================================================
+# CLIENT DE REMPLACEMENT (auto-test, sans navigateur)
+# =============================================================================
+
+class StandInClient:
+    """Client WebSocket minimal (bibliothèque standard), pour les essais locaux."""
+
+    def __init__(self, host, port, origin='null'):
+        self.sock = socket.create_connection((host, port), timeout=2.0)
+        key = base64.b64encode(os.urandom(16)).decode('ascii')
+        extra = 'Origin: %s\r\n' % origin if origin is not None else ''
+        self.sock.sendall(('GET / HTTP/1.1\r\nHost: %s:%d\r\nUpgrade: websocket\r\n'
+                           'Connection: Upgrade\r\nSec-WebSocket-Key: %s\r\n'
+                           'Sec-WebSocket-Version: 13\r\n%s\r\n' % (host, port, key, extra)).encode('ascii'))
+        data = b''
+        while b'\r\n\r\n' not in data:
+            chunk = self.sock.recv(1024)
+            if not chunk:
+                break
+            data += chunk
+        if accept_key(key) not in data.decode('latin-1'):
+            raise ConnectionError('handshake refusé')
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def recv(self):
+        return read_frame(self.sock)
+
+    def send_text(self, text):
+        self.sock.sendall(encode_frame(OP_TEXT, text.encode('utf-8'), mask=True))
+
+    def send_raw(self, data):
+        self.sock.sendall(data)
+
+    def close(self):
+        self.sock.close()
+
+
+def _wait(cond, timeout=2.0):
+    deadline = time.time() + timeout
+    while not cond() and time.time() < deadline:
+        time.sleep(0.005)
+    return cond()
+
+
+def _refused(client, raw):
+    """Envoie une frame invalide ; code de fermeture renvoyé par le serveur (ou None)."""
+    client.send_raw(raw)
+    try:
+        opcode, payload = client.recv()
+    except (OSError, ConnectionError):
+        return None
+    return struct.unpack('>H', payload[:2])[0] if opcode == OP_CLOSE and len(payload) >= 2 else None
+
+
+def _selfcheck(frames=2000):
+    import json
+    import math
+    import render_sync
+
+    checks = []
+
+    def check(name, ok):
+        checks.append(ok)
+        print('%-42s %s' % (name, 'ok' if ok else 'FAIL'))
+
+    server = WsServer(port=0)
+    server.start()
+
+    # Handshake : origine étrangère refusée, page locale / outil sans Origin acceptés
+    try:
+        StandInClient('127.0.0.1', server.port, origin='http://example.com').close()
+        check('origin http://example.com refused', False)
+    except (OSError, ConnectionError):
+        check('origin http://example.com refused', True)
+    check('origin_allowed local pages', all(origin_allowed(o) for o in
+          ('null', 'file://', 'http://127.0.0.1:8000', 'http://localhost', None))
+          and not origin_allowed('http://127.0.0.1.example.com'))
+    clients = [StandInClient('127.0.0.1', server.port, origin='null'),
+               StandInClient('127.0.0.1', server.port, origin=None)]
+    check('handshake (2 clients)', _wait(lambda: len(server.clients) == 2))
+
+    # Aller-retour pack_state -> WebSocket -> unpack_state
+    ok = True
+    lat = []
+    for f in range(frames):
+        delta = {'hero': [100.0 + f, 200.5], 'hand': True, 'connect': 480.0,
+                 'balls': {'0': [540.0, 135.0], '1': [925.0, 415.0]}, 'bridges': [1, 0]}
+        data = render_sync.pack_state(delta, f)
+        t0 = time.perf_counter()
+        server.broadcast_binary(data)
+        for c in clients:
+            opcode, payload = c.recv()
+            got = render_sync.unpack_state(payload)
+            ok &= (opcode == OP_BINARY and got['seq'] == f and got['hero'] == delta['hero']
+                   and got['hand'] and got['connect'] == 480.0 and got['bridges'] == [1, 0]
+                   and got['balls'] == [[540.0, 135.0], [925.0, 415.0]])
+        lat.append(time.perf_counter() - t0)
+    check('pack/unpack round-trip', ok)
+
+    # Boules jamais envoyées -> NaN (ignorées par la page)
+    got = render_sync.unpack_state(render_sync.pack_state({'balls': {'2': [1.0, 2.0]}}))
+    check('unknown balls are NaN', len(got['balls']) == 3 and got['balls'][2] == [1.0, 2.0]
+          and all(math.isnan(v) for b in got['balls'][:2] for v in b))
+
+    # Messages retour + inbox bornée
+    extra = 20
+    for k in range(INBOX_MAX + extra):
+        clients[0].send_text(json.dumps({'event': 'heroAnimDone', 'id': k}))
+    _wait(lambda: server.stats['received'] >= INBOX_MAX + extra)
+    msgs = server.poll()
+    check('inbox bounded to INBOX_MAX', len(msgs) == INBOX_MAX
+          and json.loads(msgs[-1])['id'] == INBOX_MAX + extra - 1
+          and server.stats['inbox_overflow'] == extra and server.poll() == [])
+
+    # Boules versionnées : accusé layoutAck, seules les boules modifiées, renvoi sans accusé
+    def _frame(now):
+        render_sync.flush(None, server, now)
+        got = [render_sync.unpack_state(c.recv()[1]) for c in clients]
+        render_sync.dispatch(server.poll())
+        return got[0]
+
+    layout = [[540.0, 135.0], [925.0, 415.0], [778.0, 868.0]]
+    render_sync.set_balls(layout)
+    first = _frame(0.0)
+    clients[0].send_text(json.dumps({'event': 'layoutAck', 'version': first['layout']}))
+    _wait(lambda: server.stats['received'] >= INBOX_MAX + extra + 1)
+    render_sync.dispatch(server.poll())
+    acked = render_sync.layout.acked == first['layout'] and not render_sync.layout.unacked()
+    layout[1] = [900.0, 400.0]
+    render_sync.set_balls(layout)
+    moved = _frame(0.1)
+    only = moved['balls'][1] == layout[1] and all(math.isnan(v) for v in moved['balls'][0])
+    render_sync.set_balls(layout)
+    idle = render_sync.flush(None, server, 0.2) is False
+    resent = _frame(0.1 + render_sync.layout_store.RESEND_AFTER + 0.01)
+    check('layoutAck: changed balls only, resend', first['balls'] == layout[:1] + [[925.0, 415.0]] + layout[2:]
+          and acked and only and idle and resent['balls'][1] == layout[1])
+    render_sync.reset()
+
+    # Frames refusées : fragmentée, non masquée, trop grande
+    bad = StandInClient('127.0.0.1', server.port)
+    check('fragmented frame closed (1002)',
+          _refused(bad, b'\x01\x85' + b'\0\0\0\0' + b'hello') == CLOSE_PROTOCOL)
+    bad = StandInClient('127.0.0.1', server.port)
+    check('unmasked frame closed (1002)', _refused(bad, encode_frame(OP_TEXT, b'hi')) == CLOSE_PROTOCOL)
+    bad = StandInClient('127.0.0.1', server.port)
+    check('oversize frame closed (1009)',
+          _refused(bad, b'\x81\xff' + struct.pack('>Q', 1 << 40) + b'\0\0\0\0') == CLOSE_TOO_BIG)
+
+    # render_sync.flush : aucun client atteint -> repli executeJavaScript ; sans renderer, état gardé
+    class _Gone:
+        def has_clients(self):
+            return True
+
+        def take_joined(self):
+            return 0
+
+        def broadcast_text(self, text):
+            return 0
+
+        def broadcast_binary(self, data):
+            return 0
+
+    class _Web:
+        def __init__(self):
+            self.js = []
+
+        def executeJavaScript(self, js):
+            self.js.append(js)
+
+    web = _Web()
+    render_sync.set_hero(10, 20)
+    render_sync.flush(web, _Gone())
+    ok = len(web.js) == 1 and '"hero":[10.0,20.0]' in web.js[0]
+    render_sync.set_hero(30, 40)
+    ok &= render_sync.flush(None, _Gone()) is False
+    render_sync.flush(web, None)
+    check('flush falls back when 0 clients reached', ok and len(web.js) == 2 and '"hero":[30.0,40.0]' in web.js[1])
+
+    js = 'if(window.applyState) window.applyState({});'.format(json.dumps(delta, separators=(',', ':')))
+    lat.sort()
+    print('clients %d  frames %d  bytes/frame %d (JS fallback %d chars)'
+          % (len(clients), frames, len(data), len(js)))
+    print('send->2 clients decoded: median %.3f ms  p95 %.3f ms  max %.3f ms'
+          % (lat[len(lat) // 2] * 1e3, lat[int(0.95 * len(lat))] * 1e3, lat[-1] * 1e3))
+    for c in clients:
+        c.close()
+    server.stop()
+    ok = all(checks)
+    print('OK' if ok else 'FAIL')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(_selfcheck())